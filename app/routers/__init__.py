@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+
+# Substitui, num router, as rotas que têm versão equivalente (mesmo path e métodos)
+# em outro router. A ordem original é mantida, então rotas fixas como
+# "/transacoes/export" continuam sendo avaliadas antes de "/transacoes/{id}",
+# e as rotas sem versão alternativa seguem funcionando normalmente.
+def override_routes(base: APIRouter, override: APIRouter) -> APIRouter:
+    overrides = {
+        (route.path, frozenset(route.methods)): route
+        for route in override.routes
+    }
+    router = APIRouter()
+    for route in base.routes:
+        router.routes.append(overrides.get((route.path, frozenset(route.methods)), route))
+    return router
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
-from core.db import get_db, DataBase
+from core.busca import padrao_contem
+from core.db import get_db, get_read_db, DataBase
+from core.pagination import Page, page_params
+from core.referencias import invalidar
+from core.serializacao import lista_json
 from modules.categoria.schemas import CategoriaCreate, CategoriaUpdate, Categoria
 
 router = APIRouter(prefix="/categorias", tags=["categorias"])
@@ -11,17 +15,19 @@ router = APIRouter(prefix="/categorias", tags=["categorias"])
 # ============================================================
 @router.get("/", response_model=List[Categoria])
 def list_categorias(
+    response: Response,
     nome: Optional[str] = Query(None, description="Filtrar por nome"),
     tipo: Optional[str] = Query(None, description="Filtrar por tipo (receita/despesa)"),
     ativo: Optional[bool] = Query(None, description="Filtrar por status ativo"),
-    db: DataBase = Depends(get_db),
+    page: Page = Depends(page_params),
+    db: DataBase = Depends(get_read_db),
 ):
     query = "SELECT id, nome, tipo, ativo FROM categoria WHERE 1=1"
     params = []
 
     if nome:
         query += " AND nome ILIKE %s"
-        params.append(f"%{nome}%")
+        params.append(padrao_contem(nome))
 
     if tipo:
         if tipo not in ("receita", "despesa"):
@@ -33,23 +39,28 @@ def list_categorias(
         query += " AND ativo = %s"
         params.append(ativo)
 
-    query += " ORDER BY id"
+    if page.after_id is not None:
+        query += " AND id > %s"
+        params.append(page.after_id)
+
+    query += " ORDER BY id LIMIT %s"
+    params.append(page.fetch_limit)
 
     cursor = db.cursor()
-    cursor.execute(query, tuple(params) if params else None)
-    rows = cursor.fetchall()
+    cursor.execute(query, tuple(params))
+    rows = page.finish(cursor.fetchall(), response)
     cursor.close()
 
-    return rows
+    return lista_json(Categoria, rows, response)
 
 
 # ============================================================
 # GET POR ID
 # ============================================================
 @router.get("/{id}", response_model=Categoria)
-def get_categoria(id: int, db: DataBase = Depends(get_db)):
+def get_categoria(id: int, db: DataBase = Depends(get_read_db)):
     cursor = db.cursor()
-    cursor.execute(
+    cursor.execute_prepared(
         "SELECT id, nome, tipo, ativo FROM categoria WHERE id = %s",
         (id,),
     )
@@ -135,6 +146,7 @@ def update_categoria(id: int, payload: CategoriaUpdate, db: DataBase = Depends(g
     cursor.execute(query, tuple(params))
     row = cursor.fetchone()
     db.commit()
+    invalidar("categoria", id)
     cursor.close()
 
     return row
@@ -152,6 +164,7 @@ def desativar_categoria(id: int, db: DataBase = Depends(get_db)):
     )
     row = cursor.fetchone()
     db.commit()
+    invalidar("categoria", id)
     cursor.close()
 
     if not row:
@@ -172,6 +185,7 @@ def delete_categoria(id: int, db: DataBase = Depends(get_db)):
     )
     row = cursor.fetchone()
     db.commit()
+    invalidar("categoria", id)
     cursor.close()
 
     if not row:
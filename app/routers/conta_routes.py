@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
-from core.db import get_db, DataBase
+from core.busca import padrao_contem
+from core.db import get_db, get_read_db, DataBase
+from core.pagination import Page, page_params
+from core.referencias import invalidar
+from core.serializacao import lista_json
 from modules.conta.schemas import ContaCreate, ContaUpdate, Conta
 
 router = APIRouter(prefix="/contas", tags=["contas"])
@@ -11,37 +15,44 @@ router = APIRouter(prefix="/contas", tags=["contas"])
 # -----------------------------
 @router.get('/', response_model=List[Conta])
 def list_contas(
+    response: Response,
     nome: Optional[str] = Query(None, description="Filtrar por nome"),
     ativo: Optional[bool] = Query(None, description="Filtrar por status ativo"),
-    db: DataBase = Depends(get_db)
+    page: Page = Depends(page_params),
+    db: DataBase = Depends(get_read_db)
 ):
     query = "SELECT id, nome, saldo_inicial, ativo FROM conta WHERE 1=1"
     params = []
     
     if nome:
         query += " AND nome ILIKE %s"
-        params.append(f"%{nome}%")
+        params.append(padrao_contem(nome))
     
     if ativo is not None:
         query += " AND ativo = %s"
         params.append(ativo)
 
-    query += " ORDER BY id"
+    if page.after_id is not None:
+        query += " AND id > %s"
+        params.append(page.after_id)
+
+    query += " ORDER BY id LIMIT %s"
+    params.append(page.fetch_limit)
     
     cursor = db.cursor()
-    cursor.execute(query, tuple(params) if params else None)
-    rows = cursor.fetchall()
+    cursor.execute(query, tuple(params))
+    rows = page.finish(cursor.fetchall(), response)
     cursor.close()
-    return rows
+    return lista_json(Conta, rows, response)
 
 
 # -----------------------------
 # OBTER CONTA POR ID
 # -----------------------------
 @router.get('/{id}', response_model=Conta)
-def get_conta(id: int, db: DataBase = Depends(get_db)):
+def get_conta(id: int, db: DataBase = Depends(get_read_db)):
     cursor = db.cursor()
-    cursor.execute(
+    cursor.execute_prepared(
         "SELECT id, nome, saldo_inicial, ativo FROM conta WHERE id = %s",
         (id,)
     )
@@ -119,6 +130,7 @@ def update_conta(id: int, payload: ContaUpdate, db: DataBase = Depends(get_db)):
     cursor.execute(query, tuple(params))
     row = cursor.fetchone()
     db.commit()
+    invalidar("conta", id)
     cursor.close()
 
     return row
@@ -136,6 +148,7 @@ def desativar_conta(id: int, db: DataBase = Depends(get_db)):
     )
     row = cursor.fetchone()
     db.commit()
+    invalidar("conta", id)
     cursor.close()
 
     if not row:
@@ -153,6 +166,7 @@ def delete_conta(id: int, db: DataBase = Depends(get_db)):
     cursor.execute("DELETE FROM conta WHERE id = %s RETURNING id", (id,))
     row = cursor.fetchone()
     db.commit()
+    invalidar("conta", id)
     cursor.close()
 
     if not row:
@@ -0,0 +1,205 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+import time
+from typing import List, Optional
+from core.async_db import get_async_db, get_async_read_db, fetch_all, fetch_one
+from core.pagination import Page, page_params
+from core import settings
+from core.serializacao import build_pagina_json_query, lista_json, pagina_json
+from modules.pagamento.schemas import (
+    PagamentoCreate, PagamentoUpdate, Pagamento, PagamentoBatchStatus, PagamentoBatchResultado
+)
+from core.particionamento import pagamento_por_id, transacao_por_id
+from app.routers.pagamento_routes import (
+    SELECT_PAGAMENTO_JSON,
+    build_list_pagamentos_query,
+    build_batch_status_query,
+    check_batch_status,
+    check_data_pagamento,
+    format_batch_status,
+    format_pagamento,
+    select_pagamento_por_id,
+)
+
+# Versões assíncronas das rotas de pagamento_routes.py (ativadas com settings.DB_ASYNC)
+router = APIRouter(prefix="/pagamentos", tags=["pagamentos"])
+
+
+# =====================================================
+# LISTAR PAGAMENTOS COM FILTROS (dd/mm/aaaa)
+# =====================================================
+@router.get("/", response_model=List[Pagamento])
+async def list_pagamentos(
+    response: Response,
+    transacao_id: Optional[int] = Query(None),
+    status: Optional[str] = Query(None, description="pago / pendente / cancelado"),
+    data_ini: Optional[str] = Query(None, description="Formato dd/mm/aaaa"),
+    data_fim: Optional[str] = Query(None, description="Formato dd/mm/aaaa"),
+    ativo: Optional[bool] = Query(None),
+    page: Page = Depends(page_params),
+    db=Depends(get_async_read_db)
+):
+    if settings.DB_JSON_LISTS:
+        query, params = build_list_pagamentos_query(transacao_id, status, data_ini, data_fim, ativo,
+                                                    page.after_id, page.fetch_limit, SELECT_PAGAMENTO_JSON)
+        query, params = build_pagina_json_query(query, params, page.limit)
+        return pagina_json(await fetch_one(db, query, params), page, response)
+
+    query, params = build_list_pagamentos_query(transacao_id, status, data_ini, data_fim, ativo,
+                                                page.after_id, page.fetch_limit)
+    rows = page.finish(await fetch_all(db, query, params), response)
+
+    return lista_json(Pagamento, [format_pagamento(row) for row in rows], response)
+
+
+# =====================================================
+# GET POR ID
+# =====================================================
+@router.get("/{id}", response_model=Pagamento)
+async def get_pagamento(id: int, db=Depends(get_async_read_db)):
+    query, params = select_pagamento_por_id(id)
+    row = await fetch_one(db, query, params, prepare=True)
+
+    if not row:
+        raise HTTPException(404, "Pagamento não encontrado")
+
+    return format_pagamento(row)
+
+
+# =====================================================
+# CRIAR PAGAMENTO
+# =====================================================
+@router.post("/", response_model=Pagamento, status_code=201)
+async def create_pagamento(payload: PagamentoCreate, db=Depends(get_async_db)):
+
+    if payload.status not in ("pago", "pendente", "cancelado"):
+        raise HTTPException(400, "Status inválido")
+
+    filtro, params = transacao_por_id(payload.transacao_id)
+    transacao = await fetch_one(db, "SELECT id, ativo, data FROM transacao t WHERE " + filtro, params)
+
+    if not transacao:
+        raise HTTPException(404, "Transação não encontrada")
+
+    if not transacao["ativo"]:
+        raise HTTPException(400, "Transação desativada")
+
+    if payload.data_pagamento:
+        check_data_pagamento(payload.data_pagamento, transacao["data"])
+
+    row = await fetch_one(
+        db,
+        """
+        INSERT INTO pagamento (transacao_id, status, data_pagamento, ativo)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id
+        """,
+        (payload.transacao_id, payload.status, payload.data_pagamento, True)
+    )
+    if not row:
+        raise HTTPException(500, "Erro ao criar pagamento")
+    await db.commit()
+
+    # Buscar dados completos
+    query, params = select_pagamento_por_id(row["id"])
+    row = await fetch_one(db, query, params, prepare=True)
+
+    return format_pagamento(row)
+
+
+# =====================================================
+# STATUS EM LOTE (ids ou filtro)
+# =====================================================
+@router.post("/batch-status", response_model=PagamentoBatchResultado)
+async def batch_status_pagamentos(
+    payload: PagamentoBatchStatus,
+    tudo_ou_nada: bool = Query(False, description="Se houver qualquer rejeição, nada é alterado"),
+    db=Depends(get_async_db)
+):
+    inicio = time.perf_counter()
+    check_batch_status(payload)
+
+    query, params = build_batch_status_query(payload, tudo_ou_nada)
+    resultado = format_batch_status(await fetch_all(db, query, params), inicio)
+    await db.commit()
+
+    return resultado
+
+
+# =====================================================
+# UPDATE PAGAMENTO
+# =====================================================
+@router.put("/{id}", response_model=Pagamento)
+async def update_pagamento(id: int, payload: PagamentoUpdate, db=Depends(get_async_db)):
+
+    por_id, por_id_params = pagamento_por_id(id)
+    pagamento = await fetch_one(db, "SELECT * FROM pagamento p WHERE " + por_id, por_id_params)
+
+    if not pagamento:
+        raise HTTPException(404, "Pagamento não encontrado")
+
+    updates = []
+    params = []
+
+    if payload.transacao_id is not None:
+        filtro, filtro_params = transacao_por_id(payload.transacao_id)
+        transacao = await fetch_one(db, "SELECT id, ativo, data FROM transacao t WHERE " + filtro, filtro_params)
+
+        if not transacao:
+            raise HTTPException(404, "Transação não encontrada")
+
+        if not transacao["ativo"]:
+            raise HTTPException(400, "Transação desativada")
+
+        updates.append("transacao_id = %s")
+        params.append(payload.transacao_id)
+
+    if payload.status is not None:
+        if payload.status not in ("pago", "pendente", "cancelado"):
+            raise HTTPException(400, "Status inválido")
+
+        updates.append("status = %s")
+        params.append(payload.status)
+
+    if payload.data_pagamento is not None:
+        transacao_id = payload.transacao_id or pagamento["transacao_id"]
+        filtro, filtro_params = transacao_por_id(transacao_id)
+        transacao = await fetch_one(db, "SELECT t.data FROM transacao t WHERE " + filtro, filtro_params)
+
+        if transacao:
+            check_data_pagamento(payload.data_pagamento, transacao["data"])
+
+        updates.append("data_pagamento = %s")
+        params.append(payload.data_pagamento)
+
+    if not updates:
+        return dict(pagamento)
+
+    params.extend(por_id_params)
+    query = f"UPDATE pagamento p SET {', '.join(updates)} WHERE " + por_id
+    async with db.cursor() as cursor:
+        await cursor.execute(query, tuple(params))
+    await db.commit()
+
+    query, params = select_pagamento_por_id(id)
+    row = await fetch_one(db, query, params, prepare=True)
+
+    return format_pagamento(row)
+
+
+# =====================================================
+# DESATIVAR PAGAMENTO
+# =====================================================
+@router.patch("/{id}/desativar", status_code=204)
+async def desativar_pagamento(id: int, db=Depends(get_async_db)):
+    filtro, params = pagamento_por_id(id)
+    row = await fetch_one(
+        db,
+        "UPDATE pagamento p SET ativo = %s WHERE " + filtro + " RETURNING id",
+        (False, *params)
+    )
+
+    if not row:
+        raise HTTPException(404, "Pagamento não encontrado")
+
+    await db.commit()
+    return None
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
+import time
 from datetime import datetime
-from core.db import get_db, DataBase
-from modules.pagamento.schemas import PagamentoCreate, PagamentoUpdate, Pagamento
+from core import settings
+from core.db import get_db, get_read_db, DataBase
+from core.pagination import Page, page_params
+from core.serializacao import build_pagina_json_query, json_timestamp, lista_json, pagina_json
+from core.particionamento import join_transacao, pagamento_por_id, transacao_por_id
+from modules.pagamento.schemas import (
+    PagamentoCreate, PagamentoUpdate, Pagamento, PagamentoBatchStatus, PagamentoBatchResultado
+)
 
 router = APIRouter(prefix="/pagamentos", tags=["pagamentos"])
 
@@ -37,39 +44,58 @@ def format_pagamento(row):
 
 
 # =====================================================
-# LISTAR PAGAMENTOS COM FILTROS (dd/mm/aaaa)
+# SQL compartilhado (também usado pelas rotas assíncronas)
 # =====================================================
-@router.get("/", response_model=List[Pagamento])
-def list_pagamentos(
-    transacao_id: Optional[int] = Query(None),
-    status: Optional[str] = Query(None, description="pago / pendente / cancelado"),
-    data_ini: Optional[str] = Query(None, description="Formato dd/mm/aaaa"),
-    data_fim: Optional[str] = Query(None, description="Formato dd/mm/aaaa"),
-    ativo: Optional[bool] = Query(None),
-    db: DataBase = Depends(get_db)
-):
-    query = """
-        SELECT
-            p.id, p.transacao_id, p.status, p.data_pagamento, p.ativo,
-            t.data as transacao_data, t.valor as transacao_valor, t.ativo as transacao_ativo,
-            t.descricao as transacao_descricao, t.pessoa_id as transacao_pessoa_id,
-            pe.id as pessoa_id, pe.nome as pessoa_nome,
-            pe.tipo as pessoa_tipo, pe.ativo as pessoa_ativo
-        FROM pagamento p
-        LEFT JOIN transacao t ON p.transacao_id = t.id
-        LEFT JOIN pessoa pe ON t.pessoa_id = pe.id
-        WHERE 1=1
-    """
+# Com as tabelas particionadas o JOIN com transacao passa pela chave de
+# partição (core/particionamento.py); por isso o SQL é montado a cada chamada
+def select_pagamento():
+    return f"""
+    SELECT
+        p.id, p.transacao_id, p.status, p.data_pagamento, p.ativo,
+        t.data as transacao_data, t.valor as transacao_valor, t.ativo as transacao_ativo,
+        t.descricao as transacao_descricao, t.pessoa_id as transacao_pessoa_id,
+        pe.id as pessoa_id, pe.nome as pessoa_nome,
+        pe.tipo as pessoa_tipo, pe.ativo as pessoa_ativo
+    FROM pagamento p
+    {join_transacao()}
+    LEFT JOIN pessoa pe ON t.pessoa_id = pe.id
+"""
+
+
+# GET por id: (SQL, parâmetros)
+def select_pagamento_por_id(id):
+    filtro, params = pagamento_por_id(id)
+    return select_pagamento() + " WHERE " + filtro, params
+
+# Objeto de cada pagamento montado pelo PostgreSQL (settings.DB_JSON_LISTS),
+# com os campos do schema Pagamento; ele não inclui a transação, então aqui
+# não há JOIN
+SELECT_PAGAMENTO_JSON = f"""
+    SELECT
+        p.id,
+        (
+            SELECT row_to_json(j) FROM (
+                SELECT p.transacao_id, p.status, {json_timestamp('p.data_pagamento')} AS data_pagamento, p.ativo, p.id
+            ) j
+        )::text AS json
+    FROM pagamento p
+"""
+
+
+def build_list_pagamentos_query(transacao_id=None, status=None, data_ini=None,
+                                data_fim=None, ativo=None, after_id=None, limit=None,
+                                select=None):
+    query = (select or select_pagamento()) + " WHERE 1=1"
     params = []
 
     if transacao_id:
-        query += " AND transacao_id = %s"
+        query += " AND p.transacao_id = %s"
         params.append(transacao_id)
 
     if status:
         if status not in ("pago", "pendente", "cancelado"):
             raise HTTPException(400, "Status inválido")
-        query += " AND status = %s"
+        query += " AND p.status = %s"
         params.append(status)
 
     # Converter datas no formato dd/mm/aaaa
@@ -78,7 +104,7 @@ def list_pagamentos(
             data_ini_dt = datetime.strptime(data_ini, "%d/%m/%Y")
         except ValueError:
             raise HTTPException(400, "data_ini inválida. Use dd/mm/aaaa")
-        query += " AND data_pagamento >= %s"
+        query += " AND p.data_pagamento >= %s"
         params.append(data_ini_dt)
 
     if data_fim:
@@ -86,41 +112,182 @@ def list_pagamentos(
             data_fim_dt = datetime.strptime(data_fim, "%d/%m/%Y")
         except ValueError:
             raise HTTPException(400, "data_fim inválida. Use dd/mm/aaaa")
-        query += " AND data_pagamento <= %s"
+        query += " AND p.data_pagamento <= %s"
         params.append(data_fim_dt)
 
     if ativo is not None:
-        query += " AND ativo = %s"
+        query += " AND p.ativo = %s"
         params.append(ativo)
 
-    query += " ORDER BY id"
+    if after_id is not None:
+        query += " AND p.id > %s"
+        params.append(after_id)
+
+    query += " ORDER BY p.id"
+
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return query, tuple(params) if params else None
+
+
+def check_data_pagamento(data_pagamento, data_transacao):
+    data_pagamento_naive = data_pagamento.replace(tzinfo=None) if data_pagamento.tzinfo else data_pagamento
+    data_transacao_naive = data_transacao.replace(tzinfo=None) if data_transacao.tzinfo else data_transacao
+
+    if data_pagamento_naive < data_transacao_naive:
+        raise HTTPException(400, "data_pagamento não pode ser anterior à data da transação")
+
+
+# Atualização de status em lote: os pagamentos são avaliados e alterados num
+# único comando. Cada selecionado sai com o motivo da rejeição (NULL = ok) e
+# se foi de fato atualizado; com tudo_ou_nada, qualquer rejeição impede todas
+# as alterações.
+def build_batch_status_query(payload, tudo_ou_nada):
+    params = {
+        "status": payload.status,
+        "data_pagamento": payload.data_pagamento,
+        "tudo_ou_nada": tudo_ou_nada,
+        "max": settings.PAGAMENTO_BATCH_MAX,
+    }
+
+    if payload.ids is not None:
+        selecionados = f"""
+            SELECT s.id, p.id IS NOT NULL AS existe, p.ativo, t.data AS transacao_data
+            FROM (SELECT DISTINCT unnest(%(ids)s::int[]) AS id) s
+            LEFT JOIN pagamento p ON p.id = s.id
+            {join_transacao()}
+        """
+        params["ids"] = payload.ids
+    else:
+        filtro = payload.filtro
+        # JOIN direto mesmo particionada: o filtro por t.data já limita as
+        # partições de transacao lidas, e a chave seria uma junção a mais
+        selecionados = """
+            SELECT p.id, TRUE AS existe, p.ativo, t.data AS transacao_data
+            FROM pagamento p
+            INNER JOIN transacao t ON t.id = p.transacao_id
+            WHERE p.ativo = TRUE
+        """
+        if filtro.status:
+            selecionados += " AND p.status = %(filtro_status)s"
+            params["filtro_status"] = filtro.status
+        if filtro.transacao_data_ini:
+            selecionados += " AND t.data >= %(transacao_data_ini)s"
+            params["transacao_data_ini"] = filtro.transacao_data_ini
+        if filtro.transacao_data_fim:
+            selecionados += " AND t.data <= %(transacao_data_fim)s"
+            params["transacao_data_fim"] = filtro.transacao_data_fim
+        # um a mais para saber se passou do limite
+        selecionados += " ORDER BY p.id LIMIT %(max)s + 1"
+
+    query = f"""
+        WITH selecionados AS ({selecionados}),
+        avaliados AS (
+            SELECT
+                id,
+                CASE
+                    WHEN NOT existe THEN 'nao_encontrado'
+                    WHEN NOT ativo THEN 'desativado'
+                    WHEN %(data_pagamento)s::timestamp < transacao_data THEN 'data_invalida'
+                END AS erro
+            FROM selecionados
+        ),
+        alterados AS (
+            UPDATE pagamento p
+            SET status = %(status)s,
+                data_pagamento = COALESCE(%(data_pagamento)s::timestamp, p.data_pagamento)
+            FROM avaliados a
+            WHERE p.id = a.id
+                AND a.erro IS NULL
+                AND (SELECT COUNT(*) FROM avaliados) <= %(max)s
+                AND NOT (%(tudo_ou_nada)s AND EXISTS (SELECT 1 FROM avaliados WHERE erro IS NOT NULL))
+            RETURNING p.id
+        )
+        SELECT a.id, a.erro, al.id IS NOT NULL AS atualizado
+        FROM avaliados a
+        LEFT JOIN alterados al ON al.id = a.id
+        ORDER BY a.id
+    """
+
+    return query, params
+
+
+def check_batch_status(payload):
+    if (payload.ids is None) == (payload.filtro is None):
+        raise HTTPException(400, "Informe ids ou filtro (apenas um)")
+
+    if payload.ids is not None and len(payload.ids) > settings.PAGAMENTO_BATCH_MAX:
+        raise HTTPException(413, f"Máximo de {settings.PAGAMENTO_BATCH_MAX} pagamentos por requisição")
+
+
+def format_batch_status(rows, inicio):
+    if len(rows) > settings.PAGAMENTO_BATCH_MAX:
+        raise HTTPException(413, f"O filtro seleciona mais de {settings.PAGAMENTO_BATCH_MAX} pagamentos")
+
+    ids_atualizados = []
+    erros = {}
+    for row in rows:
+        if row["atualizado"]:
+            ids_atualizados.append(row["id"])
+        elif row["erro"]:
+            erros.setdefault(row["erro"], []).append(row["id"])
+
+    return {
+        "selecionados": len(rows),
+        "atualizados": len(ids_atualizados),
+        "rejeitados": len(rows) - len(ids_atualizados),
+        "ids_atualizados": ids_atualizados,
+        "erros": erros,
+        "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+    }
+
+
+# =====================================================
+# LISTAR PAGAMENTOS COM FILTROS (dd/mm/aaaa)
+# =====================================================
+@router.get("/", response_model=List[Pagamento])
+def list_pagamentos(
+    response: Response,
+    transacao_id: Optional[int] = Query(None),
+    status: Optional[str] = Query(None, description="pago / pendente / cancelado"),
+    data_ini: Optional[str] = Query(None, description="Formato dd/mm/aaaa"),
+    data_fim: Optional[str] = Query(None, description="Formato dd/mm/aaaa"),
+    ativo: Optional[bool] = Query(None),
+    page: Page = Depends(page_params),
+    db: DataBase = Depends(get_read_db)
+):
+    if settings.DB_JSON_LISTS:
+        query, params = build_list_pagamentos_query(transacao_id, status, data_ini, data_fim, ativo,
+                                                    page.after_id, page.fetch_limit, SELECT_PAGAMENTO_JSON)
+        query, params = build_pagina_json_query(query, params, page.limit)
+
+        cursor = db.cursor()
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        cursor.close()
+
+        return pagina_json(row, page, response)
+
+    query, params = build_list_pagamentos_query(transacao_id, status, data_ini, data_fim, ativo,
+                                                page.after_id, page.fetch_limit)
 
     cursor = db.cursor()
-    cursor.execute(query, tuple(params) if params else None)
-    rows = cursor.fetchall()
+    cursor.execute(query, params)
+    rows = page.finish(cursor.fetchall(), response)
     cursor.close()
 
-    return [format_pagamento(row) for row in rows]
+    return lista_json(Pagamento, [format_pagamento(row) for row in rows], response)
 
 
 # =====================================================
 # GET POR ID
 # =====================================================
 @router.get("/{id}", response_model=Pagamento)
-def get_pagamento(id: int, db: DataBase = Depends(get_db)):
+def get_pagamento(id: int, db: DataBase = Depends(get_read_db)):
     cursor = db.cursor()
-    cursor.execute("""
-        SELECT
-            p.id, p.transacao_id, p.status, p.data_pagamento, p.ativo,
-            t.data as transacao_data, t.valor as transacao_valor, t.ativo as transacao_ativo,
-            t.descricao as transacao_descricao, t.pessoa_id as transacao_pessoa_id,
-            pe.id as pessoa_id, pe.nome as pessoa_nome,
-            pe.tipo as pessoa_tipo, pe.ativo as pessoa_ativo
-        FROM pagamento p
-        LEFT JOIN transacao t ON t.id = p.transacao_id
-        LEFT JOIN pessoa pe ON t.pessoa_id = pe.id
-        WHERE p.id = %s
-    """, (id,))
+    cursor.execute_prepared(*select_pagamento_por_id(id))
 
     row = cursor.fetchone()
     cursor.close()
@@ -141,7 +308,8 @@ def create_pagamento(payload: PagamentoCreate, db: DataBase = Depends(get_db)):
         raise HTTPException(400, "Status inválido")
 
     cursor = db.cursor()
-    cursor.execute("SELECT id, ativo, data FROM transacao WHERE id = %s", (payload.transacao_id,))
+    filtro, params = transacao_por_id(payload.transacao_id)
+    cursor.execute("SELECT id, ativo, data FROM transacao t WHERE " + filtro, params)
     transacao = cursor.fetchone()
 
     if not transacao:
@@ -153,12 +321,11 @@ def create_pagamento(payload: PagamentoCreate, db: DataBase = Depends(get_db)):
         raise HTTPException(400, "Transação desativada")
 
     if payload.data_pagamento:
-        data_pagamento_naive = payload.data_pagamento.replace(tzinfo=None) if payload.data_pagamento.tzinfo else payload.data_pagamento
-        data_transacao_naive = transacao["data"].replace(tzinfo=None) if transacao["data"].tzinfo else transacao["data"]
-
-        if data_pagamento_naive < data_transacao_naive:
+        try:
+            check_data_pagamento(payload.data_pagamento, transacao["data"])
+        except HTTPException:
             cursor.close()
-            raise HTTPException(400, "data_pagamento não pode ser anterior à data da transação")
+            raise
 
     cursor.execute(
         """
@@ -176,18 +343,7 @@ def create_pagamento(payload: PagamentoCreate, db: DataBase = Depends(get_db)):
     db.commit()
 
     # Buscar dados completos
-    cursor.execute("""
-        SELECT
-            p.id, p.transacao_id, p.status, p.data_pagamento, p.ativo,
-            t.data as transacao_data, t.valor as transacao_valor, t.ativo as transacao_ativo,
-            t.descricao as transacao_descricao, t.pessoa_id as transacao_pessoa_id,
-            pe.id as pessoa_id, pe.nome as pessoa_nome,
-            pe.tipo as pessoa_tipo, pe.ativo as pessoa_ativo
-        FROM pagamento p
-        LEFT JOIN transacao t ON t.id = p.transacao_id
-        LEFT JOIN pessoa pe ON t.pessoa_id = pe.id
-        WHERE p.id = %s
-    """, (pagamento_id,))
+    cursor.execute_prepared(*select_pagamento_por_id(pagamento_id))
 
     row = cursor.fetchone()
     cursor.close()
@@ -195,6 +351,30 @@ def create_pagamento(payload: PagamentoCreate, db: DataBase = Depends(get_db)):
     return format_pagamento(row)
 
 
+# =====================================================
+# STATUS EM LOTE (ids ou filtro)
+# =====================================================
+@router.post("/batch-status", response_model=PagamentoBatchResultado)
+def batch_status_pagamentos(
+    payload: PagamentoBatchStatus,
+    tudo_ou_nada: bool = Query(False, description="Se houver qualquer rejeição, nada é alterado"),
+    db: DataBase = Depends(get_db)
+):
+    inicio = time.perf_counter()
+    check_batch_status(payload)
+
+    query, params = build_batch_status_query(payload, tudo_ou_nada)
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    resultado = format_batch_status(rows, inicio)
+    db.commit()
+
+    return resultado
+
+
 # =====================================================
 # UPDATE PAGAMENTO
 # =====================================================
@@ -202,7 +382,8 @@ def create_pagamento(payload: PagamentoCreate, db: DataBase = Depends(get_db)):
 def update_pagamento(id: int, payload: PagamentoUpdate, db: DataBase = Depends(get_db)):
 
     cursor = db.cursor()
-    cursor.execute("SELECT * FROM pagamento WHERE id = %s", (id,))
+    por_id, por_id_params = pagamento_por_id(id)
+    cursor.execute("SELECT * FROM pagamento p WHERE " + por_id, por_id_params)
     pagamento = cursor.fetchone()
 
     if not pagamento:
@@ -213,7 +394,8 @@ def update_pagamento(id: int, payload: PagamentoUpdate, db: DataBase = Depends(g
     params = []
 
     if payload.transacao_id is not None:
-        cursor.execute("SELECT id, ativo, data FROM transacao WHERE id = %s", (payload.transacao_id,))
+        filtro, filtro_params = transacao_por_id(payload.transacao_id)
+        cursor.execute("SELECT id, ativo, data FROM transacao t WHERE " + filtro, filtro_params)
         transacao = cursor.fetchone()
 
         if not transacao:
@@ -237,16 +419,16 @@ def update_pagamento(id: int, payload: PagamentoUpdate, db: DataBase = Depends(g
 
     if payload.data_pagamento is not None:
         transacao_id = payload.transacao_id or pagamento["transacao_id"]
-        cursor.execute("SELECT data FROM transacao WHERE id = %s", (transacao_id,))
+        filtro, filtro_params = transacao_por_id(transacao_id)
+        cursor.execute("SELECT t.data FROM transacao t WHERE " + filtro, filtro_params)
         transacao = cursor.fetchone()
 
         if transacao:
-            data_pagamento_naive = payload.data_pagamento.replace(tzinfo=None) if payload.data_pagamento.tzinfo else payload.data_pagamento
-            data_transacao_naive = transacao["data"].replace(tzinfo=None) if transacao["data"].tzinfo else transacao["data"]
-
-            if data_pagamento_naive < data_transacao_naive:
+            try:
+                check_data_pagamento(payload.data_pagamento, transacao["data"])
+            except HTTPException:
                 cursor.close()
-                raise HTTPException(400, "data_pagamento não pode ser anterior à data da transação")
+                raise
 
         updates.append("data_pagamento = %s")
         params.append(payload.data_pagamento)
@@ -255,23 +437,12 @@ def update_pagamento(id: int, payload: PagamentoUpdate, db: DataBase = Depends(g
         cursor.close()
         return dict(pagamento)
 
-    params.append(id)
-    query = f"UPDATE pagamento SET {', '.join(updates)} WHERE id = %s"
+    params.extend(por_id_params)
+    query = f"UPDATE pagamento p SET {', '.join(updates)} WHERE " + por_id
     cursor.execute(query, tuple(params))
     db.commit()
 
-    cursor.execute("""
-        SELECT
-            p.id, p.transacao_id, p.status, p.data_pagamento, p.ativo,
-            t.data as transacao_data, t.valor as transacao_valor, t.ativo as transacao_ativo,
-            t.descricao as transacao_descricao, t.pessoa_id as transacao_pessoa_id,
-            pe.id as pessoa_id, pe.nome as pessoa_nome,
-            pe.tipo as pessoa_tipo, pe.ativo as pessoa_ativo
-        FROM pagamento p
-        LEFT JOIN transacao t ON t.id = p.transacao_id
-        LEFT JOIN pessoa pe ON t.pessoa_id = pe.id
-        WHERE p.id = %s
-    """, (id,))
+    cursor.execute_prepared(*select_pagamento_por_id(id))
 
     row = cursor.fetchone()
     cursor.close()
@@ -285,9 +456,10 @@ def update_pagamento(id: int, payload: PagamentoUpdate, db: DataBase = Depends(g
 @router.patch("/{id}/desativar", status_code=204)
 def desativar_pagamento(id: int, db: DataBase = Depends(get_db)):
     cursor = db.cursor()
+    filtro, params = pagamento_por_id(id)
     cursor.execute(
-        "UPDATE pagamento SET ativo = %s WHERE id = %s RETURNING id",
-        (False, id)
+        "UPDATE pagamento p SET ativo = %s WHERE " + filtro + " RETURNING id",
+        (False, *params)
     )
     row = cursor.fetchone()
 
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
-from core.db import get_db, DataBase
+from core.busca import padrao_contem
+from core.db import get_db, get_read_db, DataBase
+from core.pagination import Page, page_params
+from core.referencias import invalidar
+from core.serializacao import lista_json
 from modules.pessoa.schemas import PessoaCreate, PessoaUpdate, Pessoa
 
 router = APIRouter(prefix="/pessoas", tags=["pessoas"])
@@ -11,10 +15,12 @@ router = APIRouter(prefix="/pessoas", tags=["pessoas"])
 # =====================================================
 @router.get("/", response_model=List[Pessoa])
 def list_pessoas(
+    response: Response,
     nome: Optional[str] = Query(None, description="Filtrar por nome"),
     tipo: Optional[str] = Query(None, description="cliente / fornecedor"),
     ativo: Optional[bool] = Query(None, description="Filtrar por ativo"),
-    db: DataBase = Depends(get_db)
+    page: Page = Depends(page_params),
+    db: DataBase = Depends(get_read_db)
 ):
     query = """
         SELECT id, nome, tipo, ativo
@@ -25,7 +31,7 @@ def list_pessoas(
 
     if nome:
         query += " AND nome ILIKE %s"
-        params.append(f"%{nome}%")
+        params.append(padrao_contem(nome))
 
     if tipo:
         if tipo not in ("cliente", "fornecedor"):
@@ -37,23 +43,28 @@ def list_pessoas(
         query += " AND ativo = %s"
         params.append(ativo)
 
-    query += " ORDER BY id"
+    if page.after_id is not None:
+        query += " AND id > %s"
+        params.append(page.after_id)
+
+    query += " ORDER BY id LIMIT %s"
+    params.append(page.fetch_limit)
 
     cur = db.cursor()
-    cur.execute(query, tuple(params) if params else None)
-    rows = cur.fetchall()
+    cur.execute(query, tuple(params))
+    rows = page.finish(cur.fetchall(), response)
     cur.close()
 
-    return [dict(r) for r in rows]
+    return lista_json(Pessoa, rows, response)
 
 
 # =====================================================
 # GET POR ID
 # =====================================================
 @router.get("/{id}", response_model=Pessoa)
-def get_pessoa(id: int, db: DataBase = Depends(get_db)):
+def get_pessoa(id: int, db: DataBase = Depends(get_read_db)):
     cur = db.cursor()
-    cur.execute(
+    cur.execute_prepared(
         "SELECT id, nome, tipo, ativo FROM pessoa WHERE id = %s",
         (id,)
     )
@@ -135,6 +146,7 @@ def update_pessoa(id: int, payload: PessoaUpdate, db: DataBase = Depends(get_db)
     cur.execute(query, tuple(params))
     row = cur.fetchone()
     db.commit()
+    invalidar("pessoa", id)
     cur.close()
 
     return dict(row)
@@ -157,6 +169,7 @@ def desativar_pessoa(id: int, db: DataBase = Depends(get_db)):
         raise HTTPException(404, "Pessoa não encontrada")
 
     db.commit()
+    invalidar("pessoa", id)
     cur.close()
     return None
 
@@ -175,5 +188,6 @@ def delete_pessoa(id: int, db: DataBase = Depends(get_db)):
         raise HTTPException(404, "Pessoa não encontrada")
 
     db.commit()
+    invalidar("pessoa", id)
     cur.close()
     return None
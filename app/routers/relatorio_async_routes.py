@@ -0,0 +1,149 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Response
+from typing import List, Literal, Optional
+from core import settings
+from core.async_db import get_async_read_db, limite_consulta_async, fetch_all
+from core.pagination import Page, page_params
+from app.routers.relatorio_routes import (
+    ResumoFinanceiro,
+    TransacaoCategoria,
+    PagamentoPendente,
+    ContaSaldo,
+    FluxoCaixaPonto,
+    AgingPagamentos,
+    AgingPagamentoDetalhe,
+    parse_date,
+    build_resumo_financeiro_query,
+    format_resumo_financeiro,
+    build_transacoes_categoria_query,
+    format_transacoes_categoria,
+    build_pagamentos_pendentes_query,
+    format_pagamentos_pendentes,
+    build_contas_saldo_query,
+    format_contas_saldo,
+    build_fluxo_caixa_query,
+    format_fluxo_caixa,
+    build_aging_pagamentos_query,
+    format_aging_pagamentos,
+    build_aging_detalhe_query,
+    format_aging_detalhe,
+)
+
+# Versões assíncronas das rotas de relatorio_routes.py (ativadas com settings.DB_ASYNC)
+router = APIRouter(
+    prefix='/relatorios',
+    tags=['relatorios'],
+    dependencies=[Depends(limite_consulta_async(settings.RELATORIO_STATEMENT_TIMEOUT_MS), scope="function")],
+)
+
+
+@router.get('/resumo-financeiro', response_model=ResumoFinanceiro)
+async def get_resumo_financeiro(
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    db=Depends(get_async_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_resumo_financeiro_query(data_ini_dt, data_fim_dt, conta_id)
+    rows = await fetch_all(db, query, params)
+
+    return format_resumo_financeiro(rows, data_ini, data_fim)
+
+
+@router.get('/transacoes-categoria', response_model=List[TransacaoCategoria])
+async def get_transacoes_categoria(
+    categoria_id: Optional[int] = Query(None, description="Filtrar por categoria"),
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    db=Depends(get_async_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_transacoes_categoria_query(categoria_id, data_ini_dt, data_fim_dt)
+    rows = await fetch_all(db, query, params)
+
+    return format_transacoes_categoria(rows)
+
+
+@router.get('/pagamentos-pendentes', response_model=List[PagamentoPendente])
+async def get_pagamentos_pendentes(
+    response: Response,
+    page: Page = Depends(page_params),
+    db=Depends(get_async_read_db)
+):
+    query, params = build_pagamentos_pendentes_query(page.after_id, page.fetch_limit)
+    rows = page.finish(await fetch_all(db, query, params), response)
+
+    return format_pagamentos_pendentes(rows)
+
+
+@router.get('/contas-saldo', response_model=List[ContaSaldo])
+async def get_contas_saldo(
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    db=Depends(get_async_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_contas_saldo_query(data_ini_dt, data_fim_dt)
+    rows = await fetch_all(db, query, params)
+
+    return format_contas_saldo(rows)
+
+
+@router.get('/fluxo-caixa', response_model=List[FluxoCaixaPonto])
+async def get_fluxo_caixa(
+    granularidade: Literal["dia", "semana", "mes"] = Query("dia", description="Tamanho de cada período"),
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    por_conta: bool = Query(False, description="Uma série por conta em vez do total"),
+    db=Depends(get_async_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_fluxo_caixa_query(granularidade, data_ini_dt, data_fim_dt, conta_id, por_conta)
+    rows = await fetch_all(db, query, params)
+
+    return format_fluxo_caixa(rows, por_conta)
+
+
+@router.get('/aging-pagamentos', response_model=AgingPagamentos)
+async def get_aging_pagamentos(
+    data_base: Optional[str] = Query(None, description="Data de referência (dd/mm/aaaa, padrão: hoje)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    pessoa_id: Optional[int] = Query(None, description="Filtrar por pessoa"),
+    db=Depends(get_async_read_db)
+):
+    data_base_dt = (parse_date(data_base, "data_base") or datetime.now()).date()
+
+    query, params = build_aging_pagamentos_query(data_base_dt, conta_id, pessoa_id)
+    rows = await fetch_all(db, query, params)
+
+    return format_aging_pagamentos(rows, data_base_dt)
+
+
+@router.get('/aging-pagamentos/detalhe', response_model=List[AgingPagamentoDetalhe])
+async def get_aging_detalhe(
+    response: Response,
+    faixa: Optional[Literal["0-30", "31-60", "61-90", "90+"]] = Query(None, description="Faixa de dias em aberto"),
+    data_base: Optional[str] = Query(None, description="Data de referência (dd/mm/aaaa, padrão: hoje)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    pessoa_id: Optional[int] = Query(None, description="Filtrar por pessoa"),
+    page: Page = Depends(page_params),
+    db=Depends(get_async_read_db)
+):
+    data_base_dt = (parse_date(data_base, "data_base") or datetime.now()).date()
+
+    query, params = build_aging_detalhe_query(
+        data_base_dt, faixa, conta_id, pessoa_id, page.after_id, page.fetch_limit
+    )
+    rows = page.finish(await fetch_all(db, query, params), response)
+
+    return format_aging_detalhe(rows)
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Literal, Optional
+from datetime import date, datetime
 from pydantic import BaseModel
-from core.db import get_db, DataBase
+from core import settings
+from core.db import get_read_db, limite_consulta, DataBase
+from core.pagination import Page, page_params
 
-router = APIRouter(prefix='/relatorios', tags=['relatorios'])
+# Relatórios varrem o histórico: timeout próprio e consulta cancelada se o
+# cliente desconectar (core/cancelamento.py)
+router = APIRouter(
+    prefix='/relatorios',
+    tags=['relatorios'],
+    dependencies=[Depends(limite_consulta(settings.RELATORIO_STATEMENT_TIMEOUT_MS), scope="function")],
+)
 
 
 # Schemas para respostas dos relatórios
@@ -41,6 +49,52 @@ class ContaSaldo(BaseModel):
     saldo: float
 
 
+class AgingFaixas(BaseModel):
+    quantidade: int
+    ate_30: float
+    de_31_a_60: float
+    de_61_a_90: float
+    acima_90: float
+    total: float
+
+
+class AgingConta(AgingFaixas):
+    conta_id: int
+    nome: Optional[str] = None
+
+
+class AgingPessoa(AgingFaixas):
+    pessoa_id: Optional[int] = None
+    nome: Optional[str] = None
+
+
+class AgingPagamentos(BaseModel):
+    data_base: str
+    total: AgingFaixas
+    por_conta: List[AgingConta]
+    por_pessoa: List[AgingPessoa]
+
+
+class AgingPagamentoDetalhe(BaseModel):
+    id: int
+    transacao_id: int
+    conta_id: int
+    pessoa_id: Optional[int] = None
+    valor: float
+    transacao_data: datetime
+    data_pagamento: Optional[datetime] = None
+    dias_em_aberto: int
+
+
+class FluxoCaixaPonto(BaseModel):
+    periodo: date
+    conta_id: Optional[int] = None
+    receitas: float
+    despesas: float
+    saldo_periodo: float
+    saldo_acumulado: float
+
+
 # Função auxiliar para converter datas
 def parse_date(date_str: Optional[str], field_name: str) -> Optional[datetime]:
     if not date_str:
@@ -51,45 +105,41 @@ def parse_date(date_str: Optional[str], field_name: str) -> Optional[datetime]:
         raise HTTPException(400, f"{field_name} inválida. Use dd/mm/aaaa")
 
 
-@router.get('/resumo-financeiro', response_model=ResumoFinanceiro)
-def get_resumo_financeiro(
-    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
-    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
-    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
-    db: DataBase = Depends(get_db)
-):
-    data_ini_dt = parse_date(data_ini, "data_ini")
-    data_fim_dt = parse_date(data_fim, "data_fim")
-
+# =====================================================
+# Montagem das consultas / respostas (compartilhadas com as rotas assíncronas)
+# =====================================================
+# Os relatórios de totais leem saldo_diario (database/schema.sql), mantida por
+# triggers em transacao: a consulta soma poucas linhas por dia em vez de
+# varrer todas as transações do período.
+def build_resumo_financeiro_query(data_ini_dt, data_fim_dt, conta_id):
     query = """
         SELECT 
             c.tipo,
-            COALESCE(SUM(t.valor), 0) as total
-        FROM transacao t
-        INNER JOIN categoria c ON t.categoria_id = c.id
-        WHERE t.ativo = TRUE AND c.ativo = TRUE
+            COALESCE(SUM(s.total), 0) as total
+        FROM saldo_diario s
+        INNER JOIN categoria c ON s.categoria_id = c.id
+        WHERE c.ativo = TRUE
     """
     params = []
 
     if data_ini_dt:
-        query += " AND t.data >= %s"
-        params.append(data_ini_dt)
+        query += " AND s.dia >= %s"
+        params.append(data_ini_dt.date())
 
     if data_fim_dt:
-        query += " AND t.data <= %s"
-        params.append(data_fim_dt)
+        query += " AND s.dia <= %s"
+        params.append(data_fim_dt.date())
 
     if conta_id:
-        query += " AND t.conta_id = %s"
+        query += " AND s.conta_id = %s"
         params.append(conta_id)
 
     query += " GROUP BY c.tipo"
 
-    cursor = db.cursor()
-    cursor.execute(query, tuple(params) if params else None)
-    rows = cursor.fetchall()
-    cursor.close()
+    return query, tuple(params) if params else None
+
 
+def format_resumo_financeiro(rows, data_ini, data_fim):
     total_receitas = 0.0
     total_despesas = 0.0
 
@@ -112,23 +162,14 @@ def get_resumo_financeiro(
     }
 
 
-@router.get('/transacoes-categoria', response_model=List[TransacaoCategoria])
-def get_transacoes_categoria(
-    categoria_id: Optional[int] = Query(None, description="Filtrar por categoria"),
-    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
-    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
-    db: DataBase = Depends(get_db)
-):
-    data_ini_dt = parse_date(data_ini, "data_ini")
-    data_fim_dt = parse_date(data_fim, "data_fim")
-
+def build_transacoes_categoria_query(categoria_id, data_ini_dt, data_fim_dt):
     query = """
         SELECT 
             c.id as categoria_id,
             c.nome,
-            COALESCE(SUM(t.valor), 0) as total
+            COALESCE(SUM(s.total), 0) as total
         FROM categoria c
-        LEFT JOIN transacao t ON c.id = t.categoria_id AND t.ativo = TRUE
+        INNER JOIN saldo_diario s ON s.categoria_id = c.id
         WHERE c.ativo = TRUE
     """
     params = []
@@ -138,20 +179,19 @@ def get_transacoes_categoria(
         params.append(categoria_id)
 
     if data_ini_dt:
-        query += " AND (t.data IS NULL OR t.data >= %s)"
-        params.append(data_ini_dt)
+        query += " AND s.dia >= %s"
+        params.append(data_ini_dt.date())
 
     if data_fim_dt:
-        query += " AND (t.data IS NULL OR t.data <= %s)"
-        params.append(data_fim_dt)
+        query += " AND s.dia <= %s"
+        params.append(data_fim_dt.date())
 
-    query += " GROUP BY c.id, c.nome HAVING COALESCE(SUM(t.valor), 0) > 0 ORDER BY total DESC"
+    query += " GROUP BY c.id, c.nome HAVING COALESCE(SUM(s.total), 0) > 0 ORDER BY total DESC"
+
+    return query, tuple(params) if params else None
 
-    cursor = db.cursor()
-    cursor.execute(query, tuple(params) if params else None)
-    rows = cursor.fetchall()
-    cursor.close()
 
+def format_transacoes_categoria(rows):
     return [
         {
             "categoria_id": row['categoria_id'],
@@ -162,8 +202,10 @@ def get_transacoes_categoria(
     ]
 
 
-@router.get('/pagamentos-pendentes', response_model=List[PagamentoPendente])
-def get_pagamentos_pendentes(db: DataBase = Depends(get_db)):
+# JOIN direto com transacao mesmo com as tabelas particionadas: o relatório
+# percorre todos os pendentes, e passar por transacao_chave (core/particionamento.py)
+# seria uma junção a mais por linha sem descartar partição nenhuma
+def build_pagamentos_pendentes_query(after_id=None, limit=None):
     query = """
         SELECT 
             p.id,
@@ -175,13 +217,23 @@ def get_pagamentos_pendentes(db: DataBase = Depends(get_db)):
         WHERE p.status = 'pendente' 
             AND p.ativo = TRUE 
             AND t.ativo = TRUE
-        ORDER BY p.id
     """
-    cursor = db.cursor()
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    cursor.close()
+    params = []
+
+    if after_id is not None:
+        query += " AND p.id > %s"
+        params.append(after_id)
+
+    query += " ORDER BY p.id"
+
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
 
+    return query, tuple(params) if params else None
+
+
+def format_pagamentos_pendentes(rows):
     return [
         {
             "id": row['id'],
@@ -193,44 +245,39 @@ def get_pagamentos_pendentes(db: DataBase = Depends(get_db)):
     ]
 
 
-@router.get('/contas-saldo', response_model=List[ContaSaldo])
-def get_contas_saldo(
-    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
-    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
-    db: DataBase = Depends(get_db)
-):
-    data_ini_dt = parse_date(data_ini, "data_ini")
-    data_fim_dt = parse_date(data_fim, "data_fim")
+def build_contas_saldo_query(data_ini_dt, data_fim_dt):
+    periodo = ""
+    params = []
 
-    query = """
+    if data_ini_dt:
+        periodo += " AND s.dia >= %s"
+        params.append(data_ini_dt.date())
+
+    if data_fim_dt:
+        periodo += " AND s.dia <= %s"
+        params.append(data_fim_dt.date())
+
+    query = f"""
         SELECT 
             c.id as conta_id,
             c.nome,
             c.saldo_inicial,
-            COALESCE(SUM(CASE WHEN cat.tipo = 'receita' THEN t.valor ELSE 0 END), 0) as receitas,
-            COALESCE(SUM(CASE WHEN cat.tipo = 'despesa' THEN t.valor ELSE 0 END), 0) as despesas
+            COALESCE(SUM(CASE WHEN cat.tipo = 'receita' THEN s.total ELSE 0 END), 0) as receitas,
+            COALESCE(SUM(CASE WHEN cat.tipo = 'despesa' THEN s.total ELSE 0 END), 0) as despesas
         FROM conta c
-        LEFT JOIN transacao t ON c.id = t.conta_id AND t.ativo = TRUE
-        LEFT JOIN categoria cat ON t.categoria_id = cat.id AND cat.ativo = TRUE
+        LEFT JOIN (
+            saldo_diario s
+            INNER JOIN categoria cat ON s.categoria_id = cat.id AND cat.ativo = TRUE
+        ) ON s.conta_id = c.id{periodo}
         WHERE c.ativo = TRUE
+        GROUP BY c.id, c.nome, c.saldo_inicial
+        ORDER BY c.id
     """
-    params = []
 
-    if data_ini_dt:
-        query += " AND (t.data IS NULL OR t.data >= %s)"
-        params.append(data_ini_dt)
+    return query, tuple(params) if params else None
 
-    if data_fim_dt:
-        query += " AND (t.data IS NULL OR t.data <= %s)"
-        params.append(data_fim_dt)
-
-    query += " GROUP BY c.id, c.nome, c.saldo_inicial ORDER BY c.id"
-
-    cursor = db.cursor()
-    cursor.execute(query, tuple(params) if params else None)
-    rows = cursor.fetchall()
-    cursor.close()
 
+def format_contas_saldo(rows):
     return [
         {
             "conta_id": row['conta_id'],
@@ -241,3 +288,390 @@ def get_contas_saldo(
         }
         for row in rows
     ]
+
+
+# Fluxo de caixa: receitas/despesas de saldo_diario agrupadas com date_trunc
+# e saldo acumulado por window function, partindo de conta.saldo_inicial mais
+# o movimento anterior ao primeiro período. Períodos sem movimento também
+# aparecem (generate_series), para o gráfico não ter buracos. Sem datas, o
+# intervalo vai do primeiro ao último dia com movimento.
+GRANULARIDADES = {
+    "dia": ("day", "1 day"),
+    "semana": ("week", "1 week"),
+    "mes": ("month", "1 month"),
+}
+
+
+def build_fluxo_caixa_query(granularidade, data_ini_dt, data_fim_dt, conta_id=None, por_conta=False):
+    unidade, passo = GRANULARIDADES[granularidade]
+    # Sem quebra por conta, tudo cai numa conta "0" (o total das contas ativas)
+    chave_conta = "c.id" if por_conta else "0"
+    chave_saldo = "s.conta_id" if por_conta else "0"
+    filtro_conta = " AND c.id = %(conta_id)s" if conta_id else ""
+
+    query = f"""
+        WITH limites AS (
+            SELECT
+                date_trunc(%(unidade)s, COALESCE(%(data_ini)s::date, (SELECT MIN(dia) FROM saldo_diario))::timestamp) AS ini,
+                COALESCE(%(data_fim)s::date, (SELECT MAX(dia) FROM saldo_diario))::timestamp AS fim
+        ),
+        contas AS (
+            SELECT {chave_conta} AS conta_id, SUM(c.saldo_inicial) AS saldo_inicial
+            FROM conta c
+            WHERE c.ativo = TRUE{filtro_conta}
+            GROUP BY 1
+        ),
+        movimento AS (
+            SELECT
+                {chave_saldo} AS conta_id,
+                s.dia < l.ini AS anterior,
+                CASE WHEN s.dia >= l.ini THEN date_trunc(%(unidade)s, s.dia::timestamp) END AS periodo,
+                COALESCE(SUM(s.total) FILTER (WHERE cat.tipo = 'receita'), 0) AS receitas,
+                COALESCE(SUM(s.total) FILTER (WHERE cat.tipo = 'despesa'), 0) AS despesas
+            FROM saldo_diario s
+            CROSS JOIN limites l
+            INNER JOIN categoria cat ON s.categoria_id = cat.id AND cat.ativo = TRUE
+            INNER JOIN conta c ON s.conta_id = c.id AND c.ativo = TRUE{filtro_conta}
+            WHERE s.dia <= l.fim
+            GROUP BY 1, 2, 3
+        ),
+        abertura AS (
+            SELECT conta_id, SUM(receitas - despesas) AS saldo
+            FROM movimento
+            WHERE anterior
+            GROUP BY conta_id
+        ),
+        periodos AS (
+            SELECT generate_series(l.ini, l.fim, %(passo)s::interval) AS periodo
+            FROM limites l
+        )
+        SELECT
+            p.periodo::date AS periodo,
+            ct.conta_id,
+            COALESCE(m.receitas, 0) AS receitas,
+            COALESCE(m.despesas, 0) AS despesas,
+            COALESCE(m.receitas, 0) - COALESCE(m.despesas, 0) AS saldo_periodo,
+            ct.saldo_inicial
+                + COALESCE(a.saldo, 0)
+                + SUM(COALESCE(m.receitas, 0) - COALESCE(m.despesas, 0))
+                    OVER (PARTITION BY ct.conta_id ORDER BY p.periodo) AS saldo_acumulado
+        FROM contas ct
+        CROSS JOIN periodos p
+        LEFT JOIN abertura a ON a.conta_id = ct.conta_id
+        LEFT JOIN movimento m
+            ON m.conta_id = ct.conta_id AND NOT m.anterior AND m.periodo = p.periodo
+        ORDER BY ct.conta_id, p.periodo
+        LIMIT %(max_pontos)s + 1
+    """
+    params = {
+        "max_pontos": settings.FLUXO_CAIXA_MAX_PONTOS,
+        "unidade": unidade,
+        "passo": passo,
+        "data_ini": data_ini_dt.date() if data_ini_dt else None,
+        "data_fim": data_fim_dt.date() if data_fim_dt else None,
+        "conta_id": conta_id,
+    }
+
+    return query, params
+
+
+def format_fluxo_caixa(rows, por_conta=False):
+    if len(rows) > settings.FLUXO_CAIXA_MAX_PONTOS:
+        raise HTTPException(
+            413,
+            f"A consulta gera mais de {settings.FLUXO_CAIXA_MAX_PONTOS} pontos; "
+            "reduza o período, use uma granularidade maior ou filtre por conta"
+        )
+
+    return [
+        {
+            "periodo": row['periodo'],
+            "conta_id": row['conta_id'] if por_conta else None,
+            "receitas": float(row['receitas']),
+            "despesas": float(row['despesas']),
+            "saldo_periodo": float(row['saldo_periodo']),
+            "saldo_acumulado": float(row['saldo_acumulado'])
+        }
+        for row in rows
+    ]
+
+
+# Aging dos pagamentos pendentes: idade = data base - data da transação, em
+# dias. Tudo é agregado no banco em uma passada só (GROUPING SETS por conta,
+# por pessoa e o total geral); a lista de pendentes só sai pelo detalhe, que é
+# paginado. Transações com data futura entram na faixa 0-30.
+FAIXAS_AGING = {
+    "0-30": (None, 30),
+    "31-60": (31, 60),
+    "61-90": (61, 90),
+    "90+": (91, None),
+}
+
+# JOIN direto, como em build_pagamentos_pendentes_query
+AGING_PENDENTES = """
+        SELECT
+            p.id,
+            p.transacao_id,
+            t.conta_id,
+            t.pessoa_id,
+            t.valor,
+            t.data AS transacao_data,
+            p.data_pagamento,
+            %(data_base)s::date - t.data::date AS dias_em_aberto
+        FROM pagamento p
+        INNER JOIN transacao t ON p.transacao_id = t.id
+        WHERE p.status = 'pendente'
+            AND p.ativo = TRUE
+            AND t.ativo = TRUE
+"""
+
+
+def aging_filtros(conta_id, pessoa_id):
+    filtros = ""
+    if conta_id:
+        filtros += " AND t.conta_id = %(conta_id)s"
+    if pessoa_id:
+        filtros += " AND t.pessoa_id = %(pessoa_id)s"
+    return filtros
+
+
+def build_aging_pagamentos_query(data_base, conta_id=None, pessoa_id=None):
+    query = f"""
+        WITH pendentes AS ({AGING_PENDENTES}{aging_filtros(conta_id, pessoa_id)}
+        ),
+        agrupado AS (
+            SELECT
+                GROUPING(conta_id, pessoa_id) AS nivel,
+                conta_id,
+                pessoa_id,
+                COUNT(*) AS quantidade,
+                COALESCE(SUM(valor) FILTER (WHERE dias_em_aberto <= 30), 0) AS ate_30,
+                COALESCE(SUM(valor) FILTER (WHERE dias_em_aberto BETWEEN 31 AND 60), 0) AS de_31_a_60,
+                COALESCE(SUM(valor) FILTER (WHERE dias_em_aberto BETWEEN 61 AND 90), 0) AS de_61_a_90,
+                COALESCE(SUM(valor) FILTER (WHERE dias_em_aberto > 90), 0) AS acima_90,
+                COALESCE(SUM(valor), 0) AS total
+            FROM pendentes
+            GROUP BY GROUPING SETS ((conta_id), (pessoa_id), ())
+        )
+        SELECT g.*, c.nome AS conta_nome, pe.nome AS pessoa_nome
+        FROM agrupado g
+        LEFT JOIN conta c ON c.id = g.conta_id
+        LEFT JOIN pessoa pe ON pe.id = g.pessoa_id
+        ORDER BY g.nivel, g.total DESC, g.conta_id, g.pessoa_id
+    """
+    params = {"data_base": data_base, "conta_id": conta_id, "pessoa_id": pessoa_id}
+
+    return query, params
+
+
+def _faixas(row):
+    return {
+        "quantidade": row['quantidade'],
+        "ate_30": float(row['ate_30']),
+        "de_31_a_60": float(row['de_31_a_60']),
+        "de_61_a_90": float(row['de_61_a_90']),
+        "acima_90": float(row['acima_90']),
+        "total": float(row['total'])
+    }
+
+
+# nivel = GROUPING(conta_id, pessoa_id): 1 agrupa por conta, 2 por pessoa, 3 é o total
+def format_aging_pagamentos(rows, data_base):
+    resultado = {
+        "data_base": data_base.strftime("%d/%m/%Y"),
+        "total": None,
+        "por_conta": [],
+        "por_pessoa": []
+    }
+
+    for row in rows:
+        if row['nivel'] == 1:
+            resultado["por_conta"].append({"conta_id": row['conta_id'], "nome": row['conta_nome'], **_faixas(row)})
+        elif row['nivel'] == 2:
+            resultado["por_pessoa"].append({"pessoa_id": row['pessoa_id'], "nome": row['pessoa_nome'], **_faixas(row)})
+        else:
+            resultado["total"] = _faixas(row)
+
+    return resultado
+
+
+def build_aging_detalhe_query(data_base, faixa=None, conta_id=None, pessoa_id=None, after_id=None, limit=None):
+    query = AGING_PENDENTES + aging_filtros(conta_id, pessoa_id)
+    params = {"data_base": data_base, "conta_id": conta_id, "pessoa_id": pessoa_id,
+              "after_id": after_id, "limit": limit}
+
+    if faixa:
+        minimo, maximo = FAIXAS_AGING[faixa]
+        if minimo is not None:
+            query += f" AND %(data_base)s::date - t.data::date >= {minimo}"
+        if maximo is not None:
+            query += f" AND %(data_base)s::date - t.data::date <= {maximo}"
+
+    if after_id is not None:
+        query += " AND p.id > %(after_id)s"
+
+    query += " ORDER BY p.id"
+
+    if limit is not None:
+        query += " LIMIT %(limit)s"
+
+    return query, params
+
+
+def format_aging_detalhe(rows):
+    return [
+        {
+            "id": row['id'],
+            "transacao_id": row['transacao_id'],
+            "conta_id": row['conta_id'],
+            "pessoa_id": row['pessoa_id'],
+            "valor": float(row['valor']),
+            "transacao_data": row['transacao_data'],
+            "data_pagamento": row['data_pagamento'],
+            "dias_em_aberto": row['dias_em_aberto']
+        }
+        for row in rows
+    ]
+
+
+# =====================================================
+# ROTAS
+# =====================================================
+@router.get('/resumo-financeiro', response_model=ResumoFinanceiro)
+def get_resumo_financeiro(
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    db: DataBase = Depends(get_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_resumo_financeiro_query(data_ini_dt, data_fim_dt, conta_id)
+
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    return format_resumo_financeiro(rows, data_ini, data_fim)
+
+
+@router.get('/transacoes-categoria', response_model=List[TransacaoCategoria])
+def get_transacoes_categoria(
+    categoria_id: Optional[int] = Query(None, description="Filtrar por categoria"),
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    db: DataBase = Depends(get_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_transacoes_categoria_query(categoria_id, data_ini_dt, data_fim_dt)
+
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    return format_transacoes_categoria(rows)
+
+
+@router.get('/pagamentos-pendentes', response_model=List[PagamentoPendente])
+def get_pagamentos_pendentes(
+    response: Response,
+    page: Page = Depends(page_params),
+    db: DataBase = Depends(get_read_db)
+):
+    query, params = build_pagamentos_pendentes_query(page.after_id, page.fetch_limit)
+
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = page.finish(cursor.fetchall(), response)
+    cursor.close()
+
+    return format_pagamentos_pendentes(rows)
+
+
+@router.get('/contas-saldo', response_model=List[ContaSaldo])
+def get_contas_saldo(
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    db: DataBase = Depends(get_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_contas_saldo_query(data_ini_dt, data_fim_dt)
+
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    return format_contas_saldo(rows)
+
+
+@router.get('/fluxo-caixa', response_model=List[FluxoCaixaPonto])
+def get_fluxo_caixa(
+    granularidade: Literal["dia", "semana", "mes"] = Query("dia", description="Tamanho de cada período"),
+    data_ini: Optional[str] = Query(None, description="Data inicial (dd/mm/aaaa)"),
+    data_fim: Optional[str] = Query(None, description="Data final (dd/mm/aaaa)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    por_conta: bool = Query(False, description="Uma série por conta em vez do total"),
+    db: DataBase = Depends(get_read_db)
+):
+    data_ini_dt = parse_date(data_ini, "data_ini")
+    data_fim_dt = parse_date(data_fim, "data_fim")
+
+    query, params = build_fluxo_caixa_query(granularidade, data_ini_dt, data_fim_dt, conta_id, por_conta)
+
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    return format_fluxo_caixa(rows, por_conta)
+
+
+@router.get('/aging-pagamentos', response_model=AgingPagamentos)
+def get_aging_pagamentos(
+    data_base: Optional[str] = Query(None, description="Data de referência (dd/mm/aaaa, padrão: hoje)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    pessoa_id: Optional[int] = Query(None, description="Filtrar por pessoa"),
+    db: DataBase = Depends(get_read_db)
+):
+    data_base_dt = (parse_date(data_base, "data_base") or datetime.now()).date()
+
+    query, params = build_aging_pagamentos_query(data_base_dt, conta_id, pessoa_id)
+
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    return format_aging_pagamentos(rows, data_base_dt)
+
+
+@router.get('/aging-pagamentos/detalhe', response_model=List[AgingPagamentoDetalhe])
+def get_aging_detalhe(
+    response: Response,
+    faixa: Optional[Literal["0-30", "31-60", "61-90", "90+"]] = Query(None, description="Faixa de dias em aberto"),
+    data_base: Optional[str] = Query(None, description="Data de referência (dd/mm/aaaa, padrão: hoje)"),
+    conta_id: Optional[int] = Query(None, description="Filtrar por conta"),
+    pessoa_id: Optional[int] = Query(None, description="Filtrar por pessoa"),
+    page: Page = Depends(page_params),
+    db: DataBase = Depends(get_read_db)
+):
+    data_base_dt = (parse_date(data_base, "data_base") or datetime.now()).date()
+
+    query, params = build_aging_detalhe_query(
+        data_base_dt, faixa, conta_id, pessoa_id, page.after_id, page.fetch_limit
+    )
+
+    cursor = db.cursor()
+    cursor.execute(query, params)
+    rows = page.finish(cursor.fetchall(), response)
+    cursor.close()
+
+    return format_aging_detalhe(rows)
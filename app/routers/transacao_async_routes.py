@@ -0,0 +1,168 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from psycopg.errors import ForeignKeyViolation
+from typing import List, Optional
+from core.async_db import get_async_db, get_async_read_db, limite_consulta_async, fetch_all, fetch_one
+from core.pagination import Page, page_params
+from core.particionamento import transacao_por_id
+from core import settings
+from core.serializacao import build_pagina_json_query, lista_json, pagina_json
+from modules.transacao.schemas import TransacaoCreate, TransacaoUpdate, Transacao, TransacaoBusca
+from app.routers.transacao_routes import (
+    SELECT_TRANSACAO_JSON,
+    REFERENCIAS_CREATE,
+    REFERENCIAS_UPDATE,
+    build_list_transacoes_query,
+    build_busca_transacoes_query,
+    busca_chave,
+    format_busca,
+    build_create_transacao_query,
+    build_update_transacao_query,
+    check_referencias,
+    descartar_referencias,
+    format_transacao,
+    guardar_referencias,
+    referencias_em_cache,
+    select_transacao_por_id,
+)
+
+# Versões assíncronas das rotas de transacao_routes.py (ativadas com settings.DB_ASYNC)
+router = APIRouter(prefix="/transacoes", tags=["transacoes"])
+
+
+# =======================================================
+# LISTAR TRANSAÇÕES (com filtros)
+# =======================================================
+@router.get("/", response_model=List[Transacao])
+async def list_transacoes(
+    response: Response,
+    conta_id: Optional[int] = Query(None),
+    categoria_id: Optional[int] = Query(None),
+    data_ini: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    ativo: Optional[bool] = Query(None),
+    page: Page = Depends(page_params),
+    db=Depends(get_async_read_db)
+):
+    if settings.DB_JSON_LISTS:
+        query, params = build_list_transacoes_query(conta_id, categoria_id, data_ini, data_fim, ativo,
+                                                    page.after_id, page.fetch_limit, SELECT_TRANSACAO_JSON)
+        query, params = build_pagina_json_query(query, params, page.limit)
+        return pagina_json(await fetch_one(db, query, params), page, response)
+
+    query, params = build_list_transacoes_query(conta_id, categoria_id, data_ini, data_fim, ativo,
+                                                page.after_id, page.fetch_limit)
+    rows = page.finish(await fetch_all(db, query, params), response)
+
+    return lista_json(Transacao, [format_transacao(row) for row in rows], response)
+
+
+# =======================================================
+# BUSCA TEXTUAL (declarada antes de /{id})
+# =======================================================
+@router.get(
+    "/search",
+    response_model=List[TransacaoBusca],
+    dependencies=[Depends(limite_consulta_async(settings.BUSCA_STATEMENT_TIMEOUT_MS), scope="function")],
+)
+async def search_transacoes(
+    response: Response,
+    q: str = Query(..., min_length=1, description='Termos da busca na descrição ("frase exata", or, -excluir)'),
+    conta_id: Optional[int] = Query(None),
+    categoria_id: Optional[int] = Query(None),
+    data_ini: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    ativo: Optional[bool] = Query(None),
+    page: Page = Depends(page_params),
+    db=Depends(get_async_read_db)
+):
+    after_rank, after_id = busca_chave(page)
+    query, params = build_busca_transacoes_query(q, conta_id, categoria_id, data_ini, data_fim, ativo,
+                                                 after_rank, after_id, page.fetch_limit)
+    rows = page.finish(await fetch_all(db, query, params), response, chave=("rank",))
+
+    return lista_json(TransacaoBusca, [format_busca(row) for row in rows], response)
+
+
+# =======================================================
+# GET POR ID
+# =======================================================
+@router.get("/{id}", response_model=Transacao)
+async def get_transacao(id: int, db=Depends(get_async_read_db)):
+    query, params = select_transacao_por_id(id)
+    row = await fetch_one(db, query, params, prepare=True)
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Transação não encontrada")
+
+    return format_transacao(row)
+
+
+# Mesmo caminho do executar_escrita síncrono: sem os CTEs de validação quando
+# as referências estão ativas no cache, instrução completa nos demais casos
+async def executar_escrita(db, montar, payload, referencias):
+    if referencias_em_cache(payload, referencias):
+        query, params = montar(False)
+        try:
+            return await fetch_one(db, query, params)
+        except ForeignKeyViolation:
+            await db.rollback()
+            descartar_referencias(payload, referencias)
+
+    query, params = montar(True)
+    row = await fetch_one(db, query, params)
+    guardar_referencias(row, payload, referencias)
+    return row
+
+
+# =======================================================
+# CRIAR TRANSAÇÃO
+# =======================================================
+@router.post("/", response_model=Transacao, status_code=201)
+async def create_transacao(payload: TransacaoCreate, db=Depends(get_async_db)):
+    row = await executar_escrita(
+        db, lambda validar: build_create_transacao_query(payload, validar), payload, REFERENCIAS_CREATE
+    )
+
+    # Se alguma referência falhou, nada foi inserido
+    check_referencias(row, payload, REFERENCIAS_CREATE)
+    await db.commit()
+
+    return format_transacao(row)
+
+
+# =======================================================
+# UPDATE
+# =======================================================
+@router.put("/{id}", response_model=Transacao)
+async def update_transacao(id: int, payload: TransacaoUpdate, db=Depends(get_async_db)):
+    # Nada para alterar: só lê a transação
+    if not payload.model_dump(exclude_none=True):
+        return await get_transacao(id, db)
+
+    row = await executar_escrita(
+        db, lambda validar: build_update_transacao_query(id, payload, validar), payload, REFERENCIAS_UPDATE
+    )
+
+    if not row["ref_transacao"]:
+        raise HTTPException(status_code=404, detail="Transação não encontrada")
+
+    # Se alguma referência falhou, nada foi alterado
+    check_referencias(row, payload, REFERENCIAS_UPDATE)
+    await db.commit()
+
+    return format_transacao(row)
+
+
+# =======================================================
+# DESATIVAR
+# =======================================================
+@router.patch("/{id}/desativar", status_code=204)
+async def desativar_transacao(id: int, db=Depends(get_async_db)):
+    filtro, params = transacao_por_id(id)
+    row = await fetch_one(db, "UPDATE transacao t SET ativo = FALSE WHERE " + filtro + " RETURNING id", params)
+    await db.commit()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Transação não encontrada")
+
+    return None
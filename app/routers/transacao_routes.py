@@ -1,8 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
-from datetime import datetime
-from core.db import get_db
-from modules.transacao.schemas import TransacaoCreate, TransacaoUpdate, Transacao
+import csv
+import io
+import json
+from decimal import Decimal
+import time
+import psycopg2
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import List, Literal, Optional
+from datetime import date, datetime
+from core import referencias as cache_referencias, settings
+from core.db import definir_timeout, get_db, get_pool, get_read_db, limite_consulta, read_connection
+from core.instrumentacao import InstrumentedCursor
+from core.pagination import Page, page_params
+from core.particionamento import transacao_por_id
+from core.serializacao import build_pagina_json_query, json_timestamp, lista_json, pagina_json
+from modules.transacao.schemas import (
+    TransacaoCreate, TransacaoUpdate, Transacao, TransacaoBulkResultado, TransacaoBusca
+)
 
 router = APIRouter(prefix="/transacoes", tags=["transacoes"])
 
@@ -33,32 +49,64 @@ def format_transacao(row):
     }
 
 # =======================================================
-# LISTAR TRANSAÇÕES (com filtros)
+# SQL compartilhado (também usado pelas rotas assíncronas)
 # =======================================================
-@router.get("/", response_model=List[Transacao])
-def list_transacoes(
-    conta_id: Optional[int] = Query(None),
-    categoria_id: Optional[int] = Query(None),
-    data_ini: Optional[str] = Query(None),
-    data_fim: Optional[str] = Query(None),
-    ativo: Optional[bool] = Query(None),
-    db=Depends(get_db)
-):
-    cursor = db.cursor()
-
-    query = """
-        SELECT
-            t.id, t.conta_id, t.pessoa_id, t.valor, t.data, t.descricao, t.ativo,
-            c.id AS categoria_id, c.nome AS categoria_nome,
-            c.tipo AS categoria_tipo, c.ativo AS categoria_ativo,
-            p.id AS pessoa_id, p.nome AS pessoa_nome,
-            p.tipo AS pessoa_tipo, p.ativo AS pessoa_ativo
-        FROM transacao t
-        LEFT JOIN categoria c ON c.id = t.categoria_id
-        LEFT JOIN pessoa p ON p.id = t.pessoa_id
-        WHERE 1=1
-    """
-
+SELECT_TRANSACAO = """
+    SELECT
+        t.id, t.conta_id, t.pessoa_id, t.valor, t.data, t.descricao, t.ativo,
+        c.id AS categoria_id, c.nome AS categoria_nome,
+        c.tipo AS categoria_tipo, c.ativo AS categoria_ativo,
+        p.id AS pessoa_id, p.nome AS pessoa_nome,
+        p.tipo AS pessoa_tipo, p.ativo AS pessoa_ativo
+    FROM transacao t
+    LEFT JOIN categoria c ON c.id = t.categoria_id
+    LEFT JOIN pessoa p ON p.id = t.pessoa_id
+"""
+
+# Mesmo FROM, com o objeto de cada transação (schema Transacao, na mesma ordem
+# de campos) montado pelo PostgreSQL; usado com settings.DB_JSON_LISTS
+SELECT_TRANSACAO_JSON = f"""
+    SELECT
+        t.id,
+        (
+            SELECT row_to_json(j) FROM (
+                SELECT
+                    t.valor::float8 AS valor, {json_timestamp('t.data')} AS data, t.descricao, t.id, t.conta_id,
+                    p.id AS pessoa_id, t.ativo,
+                    (SELECT row_to_json(cj) FROM (SELECT c.nome, c.tipo, c.id, c.ativo) cj) AS categoria,
+                    (SELECT row_to_json(pj) FROM (SELECT p.nome, p.tipo, p.id, p.ativo) pj
+                     WHERE p.id IS NOT NULL) AS pessoa
+            ) j
+        )::text AS json
+    FROM transacao t
+    LEFT JOIN categoria c ON c.id = t.categoria_id
+    LEFT JOIN pessoa p ON p.id = t.pessoa_id
+"""
+
+# GET por id (core/particionamento.py). Particionada, a transação vem de uma
+# subconsulta com LIMIT 1: com a data desconhecida no planejamento, o
+# PostgreSQL estimaria uma linha por partição e juntaria pessoa por varredura
+# sequencial em vez do índice
+def select_transacao_por_id(id):
+    filtro, params = transacao_por_id(id)
+    if settings.DB_PARTICIONADO:
+        return SELECT_TRANSACAO.replace(
+            "FROM transacao t", f"FROM (SELECT * FROM transacao t WHERE {filtro} LIMIT 1) t"
+        ), params
+    return SELECT_TRANSACAO + " WHERE " + filtro, params
+
+
+def parse_data_filtro(value):
+    try:
+        return datetime.strptime(value, "%d/%m/%Y").date()
+    except ValueError:
+        return datetime.strptime(value, "%d-%m-%Y").date()
+
+
+# Filtros comuns à listagem, à exportação e à busca
+def build_filtros_transacao(conta_id=None, categoria_id=None, data_ini=None,
+                            data_fim=None, ativo=None):
+    query = ""
     params = []
 
     if conta_id:
@@ -70,247 +118,729 @@ def list_transacoes(
         params.append(categoria_id)
 
     if data_ini:
-        try:
-            data_ini_obj = datetime.strptime(data_ini, "%d/%m/%Y").date()
-        except ValueError:
-            data_ini_obj = datetime.strptime(data_ini, "%d-%m-%Y").date()
         query += " AND t.data >= %s"
-        params.append(data_ini_obj)
+        params.append(parse_data_filtro(data_ini))
 
     if data_fim:
-        try:
-            data_fim_obj = datetime.strptime(data_fim, "%d/%m/%Y").date()
-        except ValueError:
-            data_fim_obj = datetime.strptime(data_fim, "%d-%m-%Y").date()
         query += " AND t.data <= %s"
-        params.append(data_fim_obj)
+        params.append(parse_data_filtro(data_fim))
 
     if ativo is not None:
         query += " AND t.ativo = %s"
         params.append(ativo)
 
+    return query, params
+
+
+def build_list_transacoes_query(conta_id=None, categoria_id=None, data_ini=None,
+                                data_fim=None, ativo=None, after_id=None, limit=None,
+                                select=SELECT_TRANSACAO):
+    filtros, params = build_filtros_transacao(conta_id, categoria_id, data_ini, data_fim, ativo)
+    query = select + " WHERE 1=1" + filtros
+
+    if after_id is not None:
+        query += " AND t.id > %s"
+        params.append(after_id)
+
     query += " ORDER BY t.id"
 
-    cursor.execute(query, tuple(params))
-    rows = cursor.fetchall()
-    cursor.close()
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return query, tuple(params)
+
+
+# Busca textual em descricao_busca (tsvector gerado a partir de descricao,
+# database/schema.sql): ordem por relevância (rank decrescente, depois id),
+# paginada pela chave (rank, id) do último item. O rank é calculado só para as
+# linhas que casam com a consulta, e categoria / pessoa são lidas só para as
+# linhas da página.
+def build_busca_transacoes_query(q, conta_id=None, categoria_id=None, data_ini=None,
+                                 data_fim=None, ativo=None, after_rank=None, after_id=None,
+                                 limit=None):
+    filtros, params = build_filtros_transacao(conta_id, categoria_id, data_ini, data_fim, ativo)
+    params = [q, *params]
+
+    query = f"""
+        SELECT {COLUNAS_ESCRITA}, t.rank
+        FROM (
+            SELECT * FROM (
+                SELECT
+                    t.id, t.conta_id, t.categoria_id, t.pessoa_id, t.valor, t.data, t.descricao, t.ativo,
+                    ts_rank_cd(t.descricao_busca, busca.consulta)::float8 AS rank
+                FROM transacao t, websearch_to_tsquery('portuguese', %s) AS busca(consulta)
+                WHERE t.descricao_busca @@ busca.consulta{filtros}
+            ) t
+    """
+
+    if after_id is not None:
+        query += " WHERE t.rank < %s OR (t.rank = %s AND t.id > %s)"
+        params.extend((after_rank, after_rank, after_id))
+
+    query += " ORDER BY t.rank DESC, t.id"
+
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    query += """
+        ) t
+        LEFT JOIN categoria c ON c.id = t.categoria_id
+        LEFT JOIN pessoa p ON p.id = t.pessoa_id
+        ORDER BY t.rank DESC, t.id
+    """
+
+    return query, tuple(params)
+
+
+# O cursor da busca carrega o rank do último item; after_id sozinho não basta
+def busca_chave(page):
+    if page.after_id is None:
+        return None, None
+    rank = page.chave.get("rank")
+    if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+        raise HTTPException(status_code=400, detail="Use o cursor de X-Next-Cursor para paginar a busca")
+    return rank, page.after_id
+
+
+def format_busca(row):
+    return {**format_transacao(row), "rank": row["rank"]}
 
-    return [format_transacao(row) for row in rows]
 
 # =======================================================
-# GET POR ID
+# Escrita em uma única instrução (também usada pelas rotas assíncronas)
 # =======================================================
-@router.get("/{id}", response_model=Transacao)
-def get_transacao(id: int, db=Depends(get_db)):
-    cursor = db.cursor()
-
-    cursor.execute("""
+# Os CTEs leem conta / categoria / pessoa, o INSERT ou UPDATE só acontece se
+# todas as referências informadas existirem e estiverem ativas, e a linha
+# final já volta com categoria e pessoa. As colunas ref_* dizem qual
+# referência falhou: NULL = não existe, FALSE = desativada.
+#
+# Com validar=False (referências todas ativas no cache, core/referencias.py)
+# a instrução vai sem os CTEs de validação e as colunas ref_* voltam TRUE.
+COLUNAS_ESCRITA = """
+        t.id, t.conta_id, t.pessoa_id, t.valor, t.data, t.descricao, t.ativo,
+        c.id AS categoria_id, c.nome AS categoria_nome,
+        c.tipo AS categoria_tipo, c.ativo AS categoria_ativo,
+        p.nome AS pessoa_nome, p.tipo AS pessoa_tipo, p.ativo AS pessoa_ativo
+"""
+
+REFERENCIAS_CTE = """
+        conta_ref AS (SELECT ativo FROM conta WHERE id = %(conta_id)s::int),
+        categoria_ref AS (SELECT ativo FROM categoria WHERE id = %(categoria_id)s::int),
+        pessoa_ref AS (SELECT ativo FROM pessoa WHERE id = %(pessoa_id)s::int)
+"""
+
+REFERENCIAS_VALIDAS = """
+            (%(conta_id)s::int IS NULL OR (SELECT ativo FROM conta_ref))
+            AND (%(categoria_id)s::int IS NULL OR (SELECT ativo FROM categoria_ref))
+            AND (%(pessoa_id)s::int IS NULL OR (SELECT ativo FROM pessoa_ref))
+"""
+
+REFERENCIAS_COLUNAS = """
+            (SELECT ativo FROM conta_ref) AS ref_conta,
+            (SELECT ativo FROM categoria_ref) AS ref_categoria,
+            (SELECT ativo FROM pessoa_ref) AS ref_pessoa,
+"""
+
+REFERENCIAS_COLUNAS_CACHE = """
+            TRUE AS ref_conta, TRUE AS ref_categoria, TRUE AS ref_pessoa,
+"""
+
+
+# (CTEs, condição da escrita, colunas ref_*)
+def _sql_referencias(validar):
+    if validar:
+        return f"{REFERENCIAS_CTE},", REFERENCIAS_VALIDAS, REFERENCIAS_COLUNAS
+    return "", "TRUE", REFERENCIAS_COLUNAS_CACHE
+
+# (coluna, campo do payload, 404, 400) na ordem em que cada rota valida
+REFERENCIAS_CREATE = (
+    ("ref_conta", "conta_id", "Conta não encontrada", "Conta está desativada"),
+    ("ref_categoria", "categoria_id", "Categoria não encontrada", "Categoria desativada"),
+    ("ref_pessoa", "pessoa_id", "Pessoa não encontrada", "Pessoa está desativada"),
+)
+
+REFERENCIAS_UPDATE = (
+    ("ref_conta", "conta_id", "Conta não encontrada", "Conta desativada"),
+    ("ref_pessoa", "pessoa_id", "Pessoa não encontrada", "Pessoa desativada"),
+    ("ref_categoria", "categoria_id", "Categoria não encontrada", "Categoria desativada"),
+)
+
+
+def build_create_transacao_query(payload, validar=True):
+    ctes, condicao, colunas_ref = _sql_referencias(validar)
+    query = f"""
+        WITH {ctes}
+        nova AS (
+            INSERT INTO transacao (conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo)
+            SELECT %(conta_id)s::int, %(categoria_id)s::int, %(pessoa_id)s::int,
+                   %(valor)s::numeric, %(data)s::timestamp, %(descricao)s::text, TRUE
+            WHERE {condicao}
+            RETURNING *
+        )
         SELECT
-            t.id, t.conta_id, t.pessoa_id, t.valor, t.data, t.descricao, t.ativo,
-            c.id AS categoria_id, c.nome AS categoria_nome,
-            c.tipo AS categoria_tipo, c.ativo AS categoria_ativo,
-            p.id AS pessoa_id, p.nome AS pessoa_nome,
-            p.tipo AS pessoa_tipo, p.ativo AS pessoa_ativo
-        FROM transacao t
+            {colunas_ref}
+            {COLUNAS_ESCRITA}
+        FROM (SELECT 1) AS uma_linha
+        LEFT JOIN nova t ON TRUE
         LEFT JOIN categoria c ON c.id = t.categoria_id
         LEFT JOIN pessoa p ON p.id = t.pessoa_id
-        WHERE t.id = %s
-    """, (id,))
-
+    """
+    params = payload.model_dump(include={"conta_id", "categoria_id", "pessoa_id", "valor", "data", "descricao"})
+    return query, params
+
+
+# Devolve None quando não há nada para alterar
+def build_update_transacao_query(id, payload, validar=True):
+    campos = payload.model_dump(exclude_none=True)
+    if not campos:
+        return None, None
+
+    ctes, condicao, colunas_ref = _sql_referencias(validar)
+    # Particionada: a data de transacao_chave restringe a uma partição, e o
+    # LIMIT 1 pelo mesmo motivo de select_transacao_por_id
+    if settings.DB_PARTICIONADO:
+        chave = "chave AS (SELECT data FROM transacao_chave WHERE id = %(id)s),"
+        da_chave = " AND data = (SELECT data FROM chave)"
+        alterada = "(SELECT * FROM alterada LIMIT 1)"
+    else:
+        chave, da_chave, alterada = "", "", "alterada"
+    query = f"""
+        WITH {chave}
+        atual AS (SELECT id FROM transacao WHERE id = %(id)s{da_chave}),
+        {ctes}
+        alterada AS (
+            UPDATE transacao
+            SET {', '.join(f"{campo} = %({campo})s" for campo in campos)}
+            WHERE id = %(id)s{da_chave} AND {condicao}
+            RETURNING *
+        )
+        SELECT
+            EXISTS (SELECT 1 FROM atual) AS ref_transacao,
+            {colunas_ref}
+            {COLUNAS_ESCRITA}
+        FROM (SELECT 1) AS uma_linha
+        LEFT JOIN {alterada} t ON TRUE
+        LEFT JOIN categoria c ON c.id = t.categoria_id
+        LEFT JOIN pessoa p ON p.id = t.pessoa_id
+    """
+    params = {"conta_id": None, "categoria_id": None, "pessoa_id": None, **campos, "id": id}
+    return query, params
+
+
+def check_referencias(row, payload, referencias):
+    for coluna, campo, nao_encontrada, desativada in referencias:
+        if getattr(payload, campo) is None:
+            continue
+        if row[coluna] is None:
+            raise HTTPException(status_code=404, detail=nao_encontrada)
+        if not row[coluna]:
+            raise HTTPException(status_code=400, detail=desativada)
+
+
+# 🔹 Cache de referências (core/referencias.py) nas escritas
+# "conta_id" -> "conta"
+def _entidade(campo):
+    return campo[:-len("_id")]
+
+
+# True se todas as referências informadas estão no cache e ativas: a escrita
+# pode ir sem os CTEs de validação. Qualquer ausência ou referência desativada
+# fica para a instrução completa, que devolve o erro na ordem certa
+def referencias_em_cache(payload, referencias):
+    for _, campo, _, _ in referencias:
+        id = getattr(payload, campo)
+        if id is not None and cache_referencias.ativo(_entidade(campo), id) is not True:
+            return False
+    return True
+
+
+# Guarda o ativo que a instrução completa leu de cada referência existente
+def guardar_referencias(row, payload, referencias):
+    for coluna, campo, _, _ in referencias:
+        id = getattr(payload, campo)
+        if id is not None and row[coluna] is not None:
+            cache_referencias.guardar(_entidade(campo), id, row[coluna])
+
+
+# A escrita sem validação falhou na FK: a referência sumiu do banco depois de
+# entrar no cache (ex.: excluída por outro worker)
+def descartar_referencias(payload, referencias):
+    for _, campo, _, _ in referencias:
+        id = getattr(payload, campo)
+        if id is not None:
+            cache_referencias.invalidar(_entidade(campo), id)
+
+
+# Uma instrução por escrita nos dois caminhos; montar(validar) devolve
+# (query, params). Só depois de uma FK recusada a instrução completa vai
+# numa segunda ida ao banco
+def executar_escrita(db, montar, payload, referencias):
+    if referencias_em_cache(payload, referencias):
+        query, params = montar(False)
+        cursor = db.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchone()
+        except psycopg2.errors.ForeignKeyViolation:
+            db.rollback()
+            descartar_referencias(payload, referencias)
+        finally:
+            cursor.close()
+
+    query, params = montar(True)
+    cursor = db.cursor()
+    cursor.execute(query, params)
     row = cursor.fetchone()
     cursor.close()
+    guardar_referencias(row, payload, referencias)
+    return row
 
-    if not row:
-        raise HTTPException(status_code=404, detail="Transação não encontrada")
-
-    return format_transacao(row)
 
 # =======================================================
-# CRIAR TRANSAÇÃO
+# LISTAR TRANSAÇÕES (com filtros)
 # =======================================================
-@router.post("/", response_model=Transacao, status_code=201)
-def create_transacao(payload: TransacaoCreate, db=Depends(get_db)):
+@router.get("/", response_model=List[Transacao])
+def list_transacoes(
+    response: Response,
+    conta_id: Optional[int] = Query(None),
+    categoria_id: Optional[int] = Query(None),
+    data_ini: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    ativo: Optional[bool] = Query(None),
+    page: Page = Depends(page_params),
+    db=Depends(get_read_db)
+):
+    if settings.DB_JSON_LISTS:
+        query, params = build_list_transacoes_query(conta_id, categoria_id, data_ini, data_fim, ativo,
+                                                    page.after_id, page.fetch_limit, SELECT_TRANSACAO_JSON)
+        query, params = build_pagina_json_query(query, params, page.limit)
 
-    # Verifica conta
-    cursor = db.cursor()
-    cursor.execute("SELECT id, ativo FROM conta WHERE id = %s", (payload.conta_id,))
-    conta = cursor.fetchone()
-    cursor.close()
+        cursor = db.cursor()
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        cursor.close()
+
+        return pagina_json(row, page, response)
 
-    if not conta:
-        raise HTTPException(status_code=404, detail="Conta não encontrada")
-    if not conta["ativo"]:
-        raise HTTPException(status_code=400, detail="Conta está desativada")
+    query, params = build_list_transacoes_query(conta_id, categoria_id, data_ini, data_fim, ativo,
+                                                page.after_id, page.fetch_limit)
 
-    # Verifica categoria
     cursor = db.cursor()
-    cursor.execute("SELECT id, nome, tipo, ativo FROM categoria WHERE id = %s", (payload.categoria_id,))
-    categoria = cursor.fetchone()
+    cursor.execute(query, params)
+    rows = page.finish(cursor.fetchall(), response)
     cursor.close()
 
-    if not categoria:
-        raise HTTPException(status_code=404, detail="Categoria não encontrada")
-    if not categoria["ativo"]:
-        raise HTTPException(status_code=400, detail="Categoria desativada")
+    return lista_json(Transacao, [format_transacao(row) for row in rows], response)
 
-    # Verifica pessoa se fornecida
-    pessoa = None
-    if payload.pessoa_id:
-        cursor = db.cursor()
-        cursor.execute("SELECT id, nome, tipo, ativo FROM pessoa WHERE id = %s", (payload.pessoa_id,))
-        pessoa = cursor.fetchone()
-        cursor.close()
+# =======================================================
+# EXPORTAÇÃO (NDJSON / CSV em streaming)
+# =======================================================
+EXPORT_CSV_COLUMNS = [
+    "id", "conta_id", "categoria_id", "categoria_nome", "categoria_tipo",
+    "pessoa_id", "pessoa_nome", "valor", "data", "descricao", "ativo",
+]
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _stream_export(query, params, formato, request):
+    # Conexão própria (e não a do Depends), pois o corpo é gerado depois que a
+    # rota retorna; de leitura, como a dos demais GET. O cursor nomeado fica
+    # no servidor e entrega itersize linhas por vez, então a memória não
+    # cresce com o tamanho do resultado. A transação fica aberta enquanto o
+    # cliente lê, então ela tem timeouts próprios em vez dos da conexão.
+    with read_connection(request) as conn:
+        definir_timeout(conn, settings.EXPORT_STATEMENT_TIMEOUT_MS, settings.EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS)
+        cursor = conn.cursor(name="export_transacoes", cursor_factory=InstrumentedCursor)
+        cursor.itersize = settings.EXPORT_ITERSIZE
+        try:
+            cursor.execute(query, params)
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer) if formato == "csv" else None
+            if writer:
+                writer.writerow(EXPORT_CSV_COLUMNS)
+
+            pending = 0
+            for row in cursor:
+                if writer:
+                    writer.writerow([_csv_value(row[column]) for column in EXPORT_CSV_COLUMNS])
+                else:
+                    buffer.write(json.dumps(format_transacao(row), default=_json_default, ensure_ascii=False))
+                    buffer.write("\n")
+
+                pending += 1
+                if pending >= settings.EXPORT_ITERSIZE:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                    pending = 0
+
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            cursor.close()
+
+
+@router.get("/export")
+def export_transacoes(
+    request: Request,
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson ou csv"),
+    conta_id: Optional[int] = Query(None),
+    categoria_id: Optional[int] = Query(None),
+    data_ini: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    ativo: Optional[bool] = Query(None),
+):
+    query, params = build_list_transacoes_query(conta_id, categoria_id, data_ini, data_fim, ativo)
+
+    if formato == "csv":
+        media_type = "text/csv; charset=utf-8"
+        filename = "transacoes.csv"
+    else:
+        media_type = "application/x-ndjson"
+        filename = "transacoes.ndjson"
+
+    return StreamingResponse(
+        _stream_export(query, params, formato, request),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-        if not pessoa:
-            raise HTTPException(status_code=404, detail="Pessoa não encontrada")
-        if not pessoa["ativo"]:
-            raise HTTPException(status_code=400, detail="Pessoa está desativada")
+# =======================================================
+# BUSCA TEXTUAL (declarada antes de /{id})
+# =======================================================
+@router.get(
+    "/search",
+    response_model=List[TransacaoBusca],
+    dependencies=[Depends(limite_consulta(settings.BUSCA_STATEMENT_TIMEOUT_MS), scope="function")],
+)
+def search_transacoes(
+    response: Response,
+    q: str = Query(..., min_length=1, description='Termos da busca na descrição ("frase exata", or, -excluir)'),
+    conta_id: Optional[int] = Query(None),
+    categoria_id: Optional[int] = Query(None),
+    data_ini: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    ativo: Optional[bool] = Query(None),
+    page: Page = Depends(page_params),
+    db=Depends(get_read_db)
+):
+    after_rank, after_id = busca_chave(page)
+    query, params = build_busca_transacoes_query(q, conta_id, categoria_id, data_ini, data_fim, ativo,
+                                                 after_rank, after_id, page.fetch_limit)
 
-    # Inserir transação
     cursor = db.cursor()
-    cursor.execute("""
-        INSERT INTO transacao (conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo)
-        VALUES (%s, %s, %s, %s, %s, %s, TRUE)
-        RETURNING id, conta_id, pessoa_id, valor, data, descricao, ativo
-    """, (payload.conta_id, payload.categoria_id, payload.pessoa_id,
-          payload.valor, payload.data, payload.descricao))  # já é datetime
-
-    row = cursor.fetchone()
-    db.commit()
+    cursor.execute(query, params)
+    rows = page.finish(cursor.fetchall(), response, chave=("rank",))
     cursor.close()
 
-    return {
-        **row,
-        "categoria": categoria,
-        "pessoa": pessoa
-    }
+    return lista_json(TransacaoBusca, [format_busca(row) for row in rows], response)
+
 
 # =======================================================
-# UPDATE
+# GET POR ID
 # =======================================================
-@router.put("/{id}", response_model=Transacao)
-def update_transacao(id: int, payload: TransacaoUpdate, db=Depends(get_db)):
-
+@router.get("/{id}", response_model=Transacao)
+def get_transacao(id: int, db=Depends(get_read_db)):
     cursor = db.cursor()
-    cursor.execute("SELECT id FROM transacao WHERE id = %s", (id,))
-    existe = cursor.fetchone()
+
+    cursor.execute_prepared(*select_transacao_por_id(id))
+
+    row = cursor.fetchone()
     cursor.close()
 
-    if not existe:
+    if not row:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
 
-    updates = []
-    params = []
+    return format_transacao(row)
 
-    # Valida conta
-    if payload.conta_id is not None:
-        cursor = db.cursor()
-        cursor.execute("SELECT id, ativo FROM conta WHERE id = %s", (payload.conta_id,))
-        conta = cursor.fetchone()
-        cursor.close()
+# =======================================================
+# CRIAR TRANSAÇÃO
+# =======================================================
+@router.post("/", response_model=Transacao, status_code=201)
+def create_transacao(payload: TransacaoCreate, db=Depends(get_db)):
+    row = executar_escrita(
+        db, lambda validar: build_create_transacao_query(payload, validar), payload, REFERENCIAS_CREATE
+    )
 
-        if not conta:
-            raise HTTPException(status_code=404, detail="Conta não encontrada")
-        if not conta["ativo"]:
-            raise HTTPException(status_code=400, detail="Conta desativada")
+    # Se alguma referência falhou, nada foi inserido
+    check_referencias(row, payload, REFERENCIAS_CREATE)
+    db.commit()
 
-        updates.append("conta_id = %s")
-        params.append(payload.conta_id)
+    return format_transacao(row)
 
-    # Valida pessoa
-    pessoa_atualizada = None
-    if payload.pessoa_id is not None:
-        cursor = db.cursor()
-        cursor.execute("SELECT id, nome, tipo, ativo FROM pessoa WHERE id = %s", (payload.pessoa_id,))
-        pessoa = cursor.fetchone()
+# =======================================================
+# IMPORTAÇÃO EM LOTE (JSON / NDJSON / CSV + COPY)
+# =======================================================
+BULK_COLUMNS = ["conta_id", "categoria_id", "pessoa_id", "valor", "data", "descricao"]
+
+
+def _parse_bulk_body(body: bytes, content_type: str):
+    text = body.decode("utf-8-sig")
+
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        items = []
+        for numero, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise HTTPException(400, f"Linha {numero} não é um JSON válido")
+        return items
+
+    if content_type == "text/csv":
+        items = []
+        for item in csv.DictReader(io.StringIO(text)):
+            # Campos vazios no CSV equivalem a ausentes (ex.: pessoa_id)
+            items.append({key: value for key, value in item.items() if key and value != ""})
+        return items
+
+    if content_type in ("application/json", ""):
+        try:
+            items = json.loads(text)
+        except ValueError:
+            raise HTTPException(400, "Corpo não é um JSON válido")
+        if not isinstance(items, list):
+            raise HTTPException(400, "Envie uma lista de transações")
+        return items
+
+    raise HTTPException(415, "Use application/json, application/x-ndjson ou text/csv")
+
+
+# Ids já no cache de referências não vão ao banco; os demais são lidos numa
+# consulta só e entram no cache
+def _fetch_referencias(cursor, table, ids, usar_cache=True):
+    encontradas = cache_referencias.ativos(table, ids) if usar_cache else {}
+    faltando = [id for id in ids if id not in encontradas]
+    if faltando:
+        cursor.execute(f"SELECT id, ativo FROM {table} WHERE id = ANY(%s)", (faltando,))
+        for row in cursor.fetchall():
+            encontradas[row["id"]] = row["ativo"]
+            cache_referencias.guardar(table, row["id"], row["ativo"])
+        # Excluídas do banco não ficam no cache
+        for id in faltando:
+            if id not in encontradas:
+                cache_referencias.invalidar(table, id)
+    return encontradas
+
+
+# Decodificação do corpo, validação e gravação numa chamada só do threadpool:
+# com milhares de linhas, o parse também é trabalho pesado de CPU e não pode
+# rodar no event loop
+def _importar(body, content_type, tudo_ou_nada):
+    items = _parse_bulk_body(body, content_type)
+
+    if len(items) > settings.BULK_MAX_ROWS:
+        raise HTTPException(413, f"Máximo de {settings.BULK_MAX_ROWS} transações por requisição")
+
+    inseridas, erros = _bulk_insert(items, tudo_ou_nada)
+    return len(items), inseridas, erros
+
+
+def _bulk_insert(items, tudo_ou_nada):
+    erros = []
+    validas = []
+
+    # 1) Validação de formato, linha a linha (sem banco)
+    for linha, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            erros.append({"linha": linha, "erros": ["Registro deve ser um objeto"]})
+            continue
+        try:
+            payload = TransacaoCreate(**item)
+        except ValidationError as e:
+            erros.append({
+                "linha": linha,
+                "erros": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            })
+            continue
+        if payload.valor <= 0:
+            erros.append({"linha": linha, "erros": ["valor deve ser maior que zero"]})
+            continue
+        validas.append((linha, payload))
+
+    with get_pool().connection() as conn:
+        try:
+            return _inserir_validas(conn, validas, erros, tudo_ou_nada)
+        except psycopg2.errors.ForeignKeyViolation:
+            # Referência aceita pelo cache foi excluída nesse meio tempo:
+            # tudo é desfeito e as referências são lidas de novo do banco
+            conn.rollback()
+            return _inserir_validas(conn, validas, erros, tudo_ou_nada, usar_cache=False)
+
+
+def _inserir_validas(conn, validas, erros, tudo_ou_nada, usar_cache=True):
+    erros = list(erros)
+
+    # COPY e INSERT ... SELECT de até BULK_MAX_ROWS linhas: orçamento
+    # próprio em vez do statement_timeout padrão da conexão
+    definir_timeout(conn, settings.BULK_STATEMENT_TIMEOUT_MS)
+    cursor = conn.cursor()
+    try:
+        # 2) Referências validadas em conjunto: uma consulta por tabela (só
+        # para os ids que não estão no cache)
+        contas = _fetch_referencias(cursor, "conta", {p.conta_id for _, p in validas}, usar_cache)
+        categorias = _fetch_referencias(cursor, "categoria", {p.categoria_id for _, p in validas}, usar_cache)
+        pessoas = _fetch_referencias(cursor, "pessoa", {p.pessoa_id for _, p in validas if p.pessoa_id}, usar_cache)
+
+        aceitas = []
+        for linha, payload in validas:
+            problemas = []
+            if payload.conta_id not in contas:
+                problemas.append("Conta não encontrada")
+            elif not contas[payload.conta_id]:
+                problemas.append("Conta está desativada")
+            if payload.categoria_id not in categorias:
+                problemas.append("Categoria não encontrada")
+            elif not categorias[payload.categoria_id]:
+                problemas.append("Categoria desativada")
+            if payload.pessoa_id:
+                if payload.pessoa_id not in pessoas:
+                    problemas.append("Pessoa não encontrada")
+                elif not pessoas[payload.pessoa_id]:
+                    problemas.append("Pessoa está desativada")
+
+            if problemas:
+                erros.append({"linha": linha, "erros": problemas})
+            else:
+                aceitas.append((linha, payload))
+
+        if not aceitas or (tudo_ou_nada and erros):
+            return 0, sorted(erros, key=lambda e: e["linha"])
+
+        # 3) COPY para uma tabela temporária e um único INSERT ... SELECT
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for linha, payload in aceitas:
+            writer.writerow([
+                linha, payload.conta_id, payload.categoria_id,
+                payload.pessoa_id if payload.pessoa_id else "",
+                payload.valor, payload.data.isoformat(), payload.descricao,
+            ])
+        buffer.seek(0)
+
+        cursor.execute("""
+            CREATE TEMP TABLE transacao_staging (
+                linha INTEGER,
+                conta_id INTEGER,
+                categoria_id INTEGER,
+                pessoa_id INTEGER,
+                valor DECIMAL(10, 2),
+                data TIMESTAMP,
+                descricao TEXT
+            ) ON COMMIT DROP
+        """)
+        cursor.copy_expert(
+            "COPY transacao_staging (linha, " + ", ".join(BULK_COLUMNS) + ") FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute("""
+            INSERT INTO transacao (conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo)
+            SELECT conta_id, categoria_id, pessoa_id, valor, data, descricao, TRUE
+            FROM transacao_staging
+            ORDER BY linha
+        """)
+        inseridas = cursor.rowcount
+        conn.commit()
+    finally:
         cursor.close()
 
-        if not pessoa:
-            raise HTTPException(status_code=404, detail="Pessoa não encontrada")
-        if not pessoa["ativo"]:
-            raise HTTPException(status_code=400, detail="Pessoa desativada")
+    return inseridas, sorted(erros, key=lambda e: e["linha"])
 
-        pessoa_atualizada = pessoa
-        updates.append("pessoa_id = %s")
-        params.append(payload.pessoa_id)
 
-    # Valida categoria
-    categoria_atualizada = None
-    if payload.categoria_id is not None:
-        cursor = db.cursor()
-        cursor.execute("SELECT id, nome, tipo, ativo FROM categoria WHERE id = %s", (payload.categoria_id,))
-        categoria = cursor.fetchone()
-        cursor.close()
+def _limite_bulk(limite):
+    return HTTPException(413, f"Corpo maior que {limite} bytes (BULK_MAX_ROWS x BULK_MAX_BYTES_LINHA)")
+
+
+# Corpo lido aos pedaços, contando os bytes: acima do limite, 413 antes de
+# guardar (ou interpretar) o resto. O Content-Length, quando vem, já decide
+async def _ler_corpo_bulk(request: Request):
+    limite = settings.BULK_MAX_ROWS * settings.BULK_MAX_BYTES_LINHA
+    tamanho = request.headers.get("content-length", "")
+    if tamanho.isdigit() and int(tamanho) > limite:
+        raise _limite_bulk(limite)
 
-        if not categoria:
-            raise HTTPException(status_code=404, detail="Categoria não encontrada")
-        if not categoria["ativo"]:
-            raise HTTPException(status_code=400, detail="Categoria desativada")
+    partes = []
+    total = 0
+    async for parte in request.stream():
+        total += len(parte)
+        if total > limite:
+            raise _limite_bulk(limite)
+        partes.append(parte)
+    return b"".join(partes)
 
-        categoria_atualizada = categoria
-        updates.append("categoria_id = %s")
-        params.append(payload.categoria_id)
 
-    if payload.valor is not None:
-        updates.append("valor = %s")
-        params.append(payload.valor)
+@router.post("/bulk", response_model=TransacaoBulkResultado)
+async def bulk_create_transacoes(
+    request: Request,
+    tudo_ou_nada: bool = Query(False, description="Se houver qualquer erro, nada é inserido"),
+):
+    inicio = time.perf_counter()
 
-    if payload.data is not None:
-        updates.append("data = %s")
-        params.append(payload.data)
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    recebidas, inseridas, erros = await run_in_threadpool(
+        _importar, await _ler_corpo_bulk(request), content_type, tudo_ou_nada
+    )
 
-    if payload.descricao is not None:
-        updates.append("descricao = %s")
-        params.append(payload.descricao)
+    duracao = time.perf_counter() - inicio
+    return {
+        "recebidas": recebidas,
+        "inseridas": inseridas,
+        "rejeitadas": recebidas - inseridas,
+        "erros": erros,
+        "duracao_ms": round(duracao * 1000, 2),
+        "linhas_por_segundo": round(recebidas / duracao, 1) if duracao > 0 else 0.0,
+    }
 
-    if not updates:
+# =======================================================
+# UPDATE
+# =======================================================
+@router.put("/{id}", response_model=Transacao)
+def update_transacao(id: int, payload: TransacaoUpdate, db=Depends(get_db)):
+    # Nada para alterar: só lê a transação
+    if not payload.model_dump(exclude_none=True):
         return get_transacao(id, db)
 
-    params.append(id)
+    row = executar_escrita(
+        db, lambda validar: build_update_transacao_query(id, payload, validar), payload, REFERENCIAS_UPDATE
+    )
 
-    query = f"""
-        UPDATE transacao
-        SET {', '.join(updates)}
-        WHERE id = %s
-        RETURNING id, conta_id, pessoa_id, valor, data, descricao, ativo
-    """
+    if not row["ref_transacao"]:
+        raise HTTPException(status_code=404, detail="Transação não encontrada")
 
-    cursor = db.cursor()
-    cursor.execute(query, tuple(params))
-    row = cursor.fetchone()
+    # Se alguma referência falhou, nada foi alterado
+    check_referencias(row, payload, REFERENCIAS_UPDATE)
     db.commit()
-    cursor.close()
 
-    # pega pessoa final
-    if not pessoa_atualizada:
-        cursor = db.cursor()
-        cursor.execute("SELECT id, nome, tipo, ativo FROM pessoa WHERE id = (SELECT pessoa_id FROM transacao WHERE id = %s)", (id,))
-        pessoa_atualizada = cursor.fetchone()
-        cursor.close()
-
-    # pega categoria final
-    if not categoria_atualizada:
-        cursor = db.cursor()
-        cursor.execute("SELECT id, nome, tipo, ativo FROM categoria WHERE id = (SELECT categoria_id FROM transacao WHERE id = %s)", (id,))
-        categoria_atualizada = cursor.fetchone()
-        cursor.close()
+    return format_transacao(row)
 
-    return {
-        **row,
-        "categoria": categoria_atualizada,
-        "pessoa": pessoa_atualizada
-    }
 
 # =======================================================
 # DESATIVAR
 # =======================================================
 @router.patch("/{id}/desativar", status_code=204)
 def desativar_transacao(id: int, db=Depends(get_db)):
+    filtro, params = transacao_por_id(id)
     cursor = db.cursor()
-    cursor.execute(
-        "UPDATE transacao SET ativo = FALSE WHERE id = %s RETURNING id",
-        (id,)
-    )
+    cursor.execute("UPDATE transacao t SET ativo = FALSE WHERE " + filtro + " RETURNING id", params)
     row = cursor.fetchone()
     db.commit()
     cursor.close()
@@ -0,0 +1,195 @@
+"""Mede o planejamento economizado pelos prepared statements nas buscas por id.
+
+Duas medidas, sobre o banco de core/settings.py populado por benchmarks/seed.py:
+
+    python benchmarks/preparadas.py --requests 500
+    python benchmarks/preparadas.py --async --only /transacoes/{id}
+
+1. No servidor: para cada consulta, EXPLAIN (ANALYZE, SUMMARY) com o SQL
+   completo (o que o psycopg2 manda sem preparar) e com EXECUTE de uma
+   preparada já aquecida (plano genérico), comparando o "Planning Time".
+2. Na API (TestClient, sem rede): as rotas GET /<recurso>/{id} com
+   DB_PREPARED_STATEMENTS desligado e ligado, com o tempo de banco do
+   Server-Timing e o tempo total por requisição. As respostas dos dois modos
+   são comparadas antes de medir.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import settings
+from core.db import DB_CONFIG
+from core.preparadas import posicional
+from core.particionamento import SQL_PARTICIONADO
+from app.routers.pagamento_routes import select_pagamento_por_id
+from app.routers.transacao_routes import select_transacao_por_id
+
+
+# Mesmo SQL das rotas GET por id; transação e pagamento dependem de
+# settings.DB_PARTICIONADO, então o SQL é montado depois de defini-lo
+def rotas_sql():
+    return {
+        "/contas/{id}": ("conta", "SELECT id, nome, saldo_inicial, ativo FROM conta WHERE id = %s"),
+        "/categorias/{id}": ("categoria", "SELECT id, nome, tipo, ativo FROM categoria WHERE id = %s"),
+        "/pessoas/{id}": ("pessoa", "SELECT id, nome, tipo, ativo FROM pessoa WHERE id = %s"),
+        "/transacoes/{id}": ("transacao", select_transacao_por_id(None)[0]),
+        "/pagamentos/{id}": ("pagamento", select_pagamento_por_id(None)[0]),
+    }
+
+
+def _ids(cursor, tabela, quantidade, semente):
+    cursor.execute(f"SELECT min(id), max(id) FROM {tabela}")
+    minimo, maximo = cursor.fetchone()
+    if minimo is None:
+        raise SystemExit(f"Tabela {tabela} vazia: rode benchmarks/seed.py antes")
+    sorteio = random.Random(semente)
+    return [sorteio.randint(minimo, maximo) for _ in range(quantidade)]
+
+
+def _explain(cursor, alvo):
+    cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {alvo}")
+    plano = cursor.fetchone()[0][0]
+    return plano["Planning Time"], plano["Execution Time"]
+
+
+# Planejamento / execução médios (ms) no servidor, sem e com preparo
+def medir_servidor(cursor, sql, ids, warmup):
+    resultado = {}
+    # Transação e pagamento repetem o id na busca da chave de partição
+    quantos = sql.count("%s")
+    execute = "EXECUTE bench (" + ", ".join(["%s"] * quantos) + ")"
+
+    tempos = [_explain(cursor, cursor.mogrify(sql, (i,) * quantos).decode()) for i in ids]
+    resultado["sem"] = tempos
+
+    cursor.execute(f"PREPARE bench AS {posicional(sql)}")
+    try:
+        # As primeiras execuções usam planos específicos; depois delas o
+        # servidor decide pelo plano genérico
+        for i in ids[:warmup]:
+            cursor.execute(execute, (i,) * quantos)
+            cursor.fetchall()
+        resultado["com"] = [_explain(cursor, cursor.mogrify(execute, (i,) * quantos).decode()) for i in ids]
+        cursor.execute("SELECT generic_plans, custom_plans FROM pg_prepared_statements WHERE name = 'bench'")
+        genericos, especificos = cursor.fetchone()
+    finally:
+        cursor.execute("DEALLOCATE bench")
+
+    return {
+        modo: {
+            "planejamento_ms": round(statistics.mean(t[0] for t in tempos), 4),
+            "execucao_ms": round(statistics.mean(t[1] for t in tempos), 4),
+        }
+        for modo, tempos in resultado.items()
+    } | {"planos_genericos": genericos, "planos_especificos": especificos}
+
+
+def _tempo_db(resposta):
+    # Server-Timing: db;dur=1.23;desc="1 consultas", ...
+    for parte in resposta.headers.get("server-timing", "").split(","):
+        campos = parte.strip().split(";")
+        if campos[0] == "db":
+            for campo in campos[1:]:
+                if campo.startswith("dur="):
+                    return float(campo[4:])
+    return 0.0
+
+
+def medir_api(client, rota, ids, warmup, preparadas):
+    settings.DB_PREPARED_STATEMENTS = preparadas
+    for i in ids[:warmup]:
+        client.get(rota.format(id=i))
+
+    parede = []
+    db = []
+    for i in ids:
+        inicio = time.perf_counter()
+        resposta = client.get(rota.format(id=i))
+        parede.append((time.perf_counter() - inicio) * 1000)
+        db.append(_tempo_db(resposta))
+
+    return {
+        "parede_ms": round(statistics.mean(parede), 3),
+        "p95_ms": round(statistics.quantiles(parede, n=20)[-1], 3) if len(parede) > 1 else None,
+        "db_ms": round(statistics.mean(db), 3),
+    }
+
+
+def _verificar(client, rota, ids):
+    for i in ids:
+        respostas = []
+        for preparadas in (False, True):
+            settings.DB_PREPARED_STATEMENTS = preparadas
+            resposta = client.get(rota.format(id=i))
+            respostas.append((resposta.status_code, resposta.content))
+        if respostas[0] != respostas[1]:
+            raise SystemExit(f"{rota} id={i}: respostas diferentes com e sem preparo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planejamento economizado pelos prepared statements nas buscas por id")
+    parser.add_argument("--requests", type=int, default=500, help="Requisições (e EXPLAINs) por rota e modo")
+    parser.add_argument("--warmup", type=int, default=20, help="Execuções descartadas antes de medir")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do sorteio de ids")
+    parser.add_argument("--only", action="append", help="Rota a medir, ex.: /transacoes/{id} (pode repetir)")
+    parser.add_argument("--async", dest="async_", action="store_true", help="Usa as rotas assíncronas (DB_ASYNC)")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    resultado = {"async": args.async_, "requests": args.requests, "rotas": {}}
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        if settings.DB_PARTICIONADO is None:
+            cursor.execute(SQL_PARTICIONADO)
+            settings.DB_PARTICIONADO = cursor.fetchone()[0]
+        sql_rotas = rotas_sql()
+        rotas = args.only or list(sql_rotas)
+
+        ids = {}
+        for rota in rotas:
+            tabela, sql = sql_rotas[rota]
+            ids[rota] = _ids(cursor, tabela, args.requests, args.seed)
+            resultado["rotas"][rota] = {"servidor": medir_servidor(cursor, sql, ids[rota], args.warmup)}
+    finally:
+        conn.close()
+
+    settings.DB_ASYNC = args.async_
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        for rota in rotas:
+            _verificar(client, rota, ids[rota][:20])
+            medidas = resultado["rotas"][rota]
+            medidas["api"] = {
+                "sem": medir_api(client, rota, ids[rota], args.warmup, False),
+                "com": medir_api(client, rota, ids[rota], args.warmup, True),
+            }
+
+    print(f"\n{'rota':<20}{'planej. sem':>12}{'planej. com':>12}{'exec. sem':>11}{'exec. com':>11}"
+          f"{'db sem':>9}{'db com':>9}{'req sem':>9}{'req com':>9}   (ms)")
+    for rota, m in resultado["rotas"].items():
+        s, a = m["servidor"], m["api"]
+        print(f"{rota:<20}{s['sem']['planejamento_ms']:>12.3f}{s['com']['planejamento_ms']:>12.3f}"
+              f"{s['sem']['execucao_ms']:>11.3f}{s['com']['execucao_ms']:>11.3f}"
+              f"{a['sem']['db_ms']:>9.3f}{a['com']['db_ms']:>9.3f}{a['sem']['parede_ms']:>9.3f}{a['com']['parede_ms']:>9.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Mede latência, vazão e número de consultas por endpoint.
+
+Com a API rodando (uvicorn main:app) sobre um banco populado por
+benchmarks/seed.py:
+
+    python benchmarks/run.py --concurrency 16 --requests 2000 --output resultado.json
+    python benchmarks/run.py --output novo.json --compare resultado.json
+
+Cada endpoint é exercitado isoladamente, na concorrência pedida, e o
+resultado (p50/p95/p99, req/s, erros e consultas SQL por requisição) é
+impresso e gravado em JSON. A contagem de consultas usa pg_stat_statements;
+sem a extensão o campo fica null.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.db import DB_CONFIG
+
+
+# -----------------------------
+# Cenários
+# -----------------------------
+# Cada cenário devolve (método, caminho, corpo) a partir de um Random próprio
+# da thread e dos ids máximos encontrados no banco.
+def _data(rng):
+    dia = rng.randint(1, 28)
+    mes = rng.randint(1, 12)
+    return dia, mes
+
+
+def _periodo(rng):
+    dia, mes = _data(rng)
+    return f"data_ini={dia:02d}/{mes:02d}/2024&data_fim={dia:02d}/{mes:02d}/2025"
+
+
+def _transacao_nova(rng, ids):
+    dia, mes = _data(rng)
+    return {
+        "conta_id": rng.randint(1, ids["conta"]),
+        "categoria_id": rng.randint(1, ids["categoria"]),
+        "valor": round(rng.uniform(1, 1000), 2),
+        "data": f"2025-{mes:02d}-{dia:02d}T12:00:00",
+        "descricao": "benchmark",
+    }
+
+
+CENARIOS = {
+    "contas.list": lambda rng, ids: ("GET", "/contas/?limit=100", None),
+    "contas.get": lambda rng, ids: ("GET", f"/contas/{rng.randint(1, ids['conta'])}", None),
+    "categorias.list": lambda rng, ids: ("GET", "/categorias/?limit=100", None),
+    "categorias.get": lambda rng, ids: ("GET", f"/categorias/{rng.randint(1, ids['categoria'])}", None),
+    "pessoas.list": lambda rng, ids: ("GET", "/pessoas/?limit=100", None),
+    "pessoas.get": lambda rng, ids: ("GET", f"/pessoas/{rng.randint(1, ids['pessoa'])}", None),
+    "transacoes.list": lambda rng, ids: ("GET", "/transacoes/?limit=100", None),
+    "transacoes.list_conta": lambda rng, ids: (
+        "GET", f"/transacoes/?conta_id={rng.randint(1, ids['conta'])}&ativo=true&limit=100", None),
+    "transacoes.list_periodo": lambda rng, ids: ("GET", f"/transacoes/?{_periodo(rng)}&limit=100", None),
+    "transacoes.list_pagina": lambda rng, ids: (
+        "GET", f"/transacoes/?after_id={rng.randint(1, ids['transacao'])}&limit=100", None),
+    "transacoes.get": lambda rng, ids: ("GET", f"/transacoes/{rng.randint(1, ids['transacao'])}", None),
+    "transacoes.export_conta": lambda rng, ids: (
+        "GET", f"/transacoes/export?conta_id={rng.randint(1, ids['conta'])}", None),
+    "transacoes.create": lambda rng, ids: ("POST", "/transacoes/", _transacao_nova(rng, ids)),
+    "transacoes.update": lambda rng, ids: (
+        "PUT", f"/transacoes/{rng.randint(1, ids['transacao'])}", {"valor": round(rng.uniform(1, 1000), 2)}),
+    "transacoes.bulk_100": lambda rng, ids: (
+        "POST", "/transacoes/bulk", [_transacao_nova(rng, ids) for _ in range(100)]),
+    "pagamentos.list": lambda rng, ids: ("GET", "/pagamentos/?limit=100", None),
+    "pagamentos.list_status": lambda rng, ids: ("GET", "/pagamentos/?status=pendente&limit=100", None),
+    "pagamentos.get": lambda rng, ids: ("GET", f"/pagamentos/{rng.randint(1, ids['pagamento'])}", None),
+    "relatorios.resumo_financeiro": lambda rng, ids: ("GET", f"/relatorios/resumo-financeiro?{_periodo(rng)}", None),
+    "relatorios.resumo_conta": lambda rng, ids: (
+        "GET", f"/relatorios/resumo-financeiro?conta_id={rng.randint(1, ids['conta'])}", None),
+    "relatorios.transacoes_categoria": lambda rng, ids: (
+        "GET", f"/relatorios/transacoes-categoria?{_periodo(rng)}", None),
+    "relatorios.pagamentos_pendentes": lambda rng, ids: ("GET", "/relatorios/pagamentos-pendentes?limit=100", None),
+    "relatorios.contas_saldo": lambda rng, ids: ("GET", f"/relatorios/contas-saldo?{_periodo(rng)}", None),
+}
+
+
+# -----------------------------
+# Banco: ids existentes e contagem de consultas
+# -----------------------------
+def conectar(dsn):
+    conn = psycopg2.connect(dsn) if dsn else psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = True
+    return conn
+
+
+def ids_maximos(conn):
+    ids = {}
+    with conn.cursor() as cursor:
+        for tabela in ("conta", "categoria", "pessoa", "transacao", "pagamento"):
+            cursor.execute(f"SELECT COALESCE(MAX(id), 1) FROM {tabela}")
+            ids[tabela] = cursor.fetchone()[0]
+    return ids
+
+
+def tem_pg_stat_statements(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+        return cursor.fetchone() is not None
+
+
+# Soma das execuções no banco atual, sem contar BEGIN/COMMIT nem a própria consulta
+def total_consultas(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COALESCE(SUM(calls), 0)
+            FROM pg_stat_statements
+            WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                AND query !~* '^\\s*(begin|commit|rollback)'
+                AND query NOT LIKE '%pg_stat_statements%'
+        """)
+        return int(cursor.fetchone()[0])
+
+
+# -----------------------------
+# Execução
+# -----------------------------
+def percentil(valores, p):
+    if not valores:
+        return None
+    k = max(0, min(len(valores) - 1, round(p / 100 * len(valores)) - 1))
+    return valores[k]
+
+
+def executar(base, cenario, ids, total, concorrencia, seed):
+    latencias = []
+    erros = {}
+    restantes = [total]
+    lock = threading.Lock()
+
+    def worker(n):
+        rng = random.Random(f"{seed}-{n}")
+        conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=120)
+        locais = []
+        while True:
+            with lock:
+                if restantes[0] <= 0:
+                    break
+                restantes[0] -= 1
+
+            method, path, body = cenario(rng, ids)
+            headers = {"Accept": "application/json"}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body).encode()
+                headers["Content-Type"] = "application/json"
+
+            inicio = time.perf_counter()
+            try:
+                conn.request(method, base.path.rstrip("/") + path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=120)
+                status = type(e).__name__
+            locais.append(time.perf_counter() - inicio)
+
+            if not isinstance(status, int) or status >= 400:
+                with lock:
+                    erros[str(status)] = erros.get(str(status), 0) + 1
+
+        conn.close()
+        with lock:
+            latencias.extend(locais)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concorrencia)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    ms = [v * 1000 for v in latencias]
+    return {
+        "requests": len(ms),
+        "errors": erros,
+        "duration_s": round(duracao, 3),
+        "throughput_rps": round(len(ms) / duracao, 1) if duracao else None,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 2) if ms else None,
+            "p50": round(percentil(ms, 50), 2) if ms else None,
+            "p95": round(percentil(ms, 95), 2) if ms else None,
+            "p99": round(percentil(ms, 99), 2) if ms else None,
+            "max": round(ms[-1], 2) if ms else None,
+        },
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior):
+    print(f"\n{'endpoint':36} {'p95 antes':>10} {'p95 agora':>10} {'Δ p95':>8} {'req/s antes':>12} {'req/s agora':>12}")
+    for nome, r in atual["endpoints"].items():
+        a = anterior.get("endpoints", {}).get(nome)
+        if not a:
+            continue
+        p95_a, p95_n = a["latency_ms"]["p95"], r["latency_ms"]["p95"]
+        delta = f"{(p95_n - p95_a) / p95_a * 100:+.0f}%" if p95_a else "-"
+        print(f"{nome:36} {p95_a:>10} {p95_n:>10} {delta:>8} {a['throughput_rps']:>12} {r['throughput_rps']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints da API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="Requisições por endpoint")
+    parser.add_argument("--warmup", type=int, default=50, help="Requisições descartadas antes de medir")
+    parser.add_argument("--only", action="append", help="Prefixo dos cenários a executar (pode repetir)")
+    parser.add_argument("--skip-writes", action="store_true", help="Não executa POST/PUT")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dsn", help="String de conexão (padrão: core/settings.py)")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    base = urlsplit(args.base_url)
+    conn = conectar(args.dsn)
+    ids = ids_maximos(conn)
+    contar = tem_pg_stat_statements(conn)
+    if not contar:
+        print("pg_stat_statements não instalado: contagem de consultas desativada")
+
+    resultado = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+            "commit": commit_atual(),
+            "python": platform.python_version(),
+            "ids": ids,
+        },
+        "endpoints": {},
+    }
+
+    escritas = ("transacoes.create", "transacoes.update", "transacoes.bulk_100")
+    for nome, cenario in CENARIOS.items():
+        if args.only and not any(nome.startswith(p) for p in args.only):
+            continue
+        if args.skip_writes and nome in escritas:
+            continue
+
+        if args.warmup:
+            executar(base, cenario, ids, args.warmup, args.concurrency, f"{args.seed}-warmup")
+
+        antes = total_consultas(conn) if contar else None
+        r = executar(base, cenario, ids, args.requests, args.concurrency, args.seed)
+        if contar:
+            r["queries_per_request"] = round((total_consultas(conn) - antes) / max(r["requests"], 1), 2)
+        else:
+            r["queries_per_request"] = None
+
+        resultado["endpoints"][nome] = r
+        lat = r["latency_ms"]
+        print(f"{nome:36} p50={lat['p50']:>8}ms p95={lat['p95']:>8}ms p99={lat['p99']:>8}ms "
+              f"{r['throughput_rps']:>8} req/s  consultas/req={r['queries_per_request']}  erros={r['errors'] or 0}")
+
+    conn.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+        print(f"\nResultado gravado em {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
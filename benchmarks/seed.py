@@ -0,0 +1,176 @@
+"""Popula o banco com dados sintéticos para os benchmarks.
+
+O gerador é determinístico: a mesma --seed e os mesmos volumes produzem
+exatamente os mesmos registros, então duas execuções de benchmark comparam
+o código e não os dados.
+
+    python benchmarks/seed.py --truncate --contas 1000 --transacoes 10000000 --pagamentos 5000000
+
+ATENÇÃO: --truncate apaga todas as contas, categorias, pessoas, transações e
+pagamentos do banco configurado em core/settings.py.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.db import DB_CONFIG
+
+INICIO = datetime(2024, 1, 1)
+LOTE = 100_000
+
+
+# A data de cada transação é função só do id (espalhada pelo período), assim
+# os pagamentos conseguem respeitar data_pagamento >= data da transação sem
+# guardar milhões de datas em memória.
+def data_transacao(id, dias):
+    return INICIO + timedelta(minutes=(id * 7919) % (dias * 1440))
+
+
+def copy_lotes(cursor, tabela, colunas, linhas):
+    sql = f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)"
+    buffer = io.StringIO()
+    total = 0
+
+    for n, linha in enumerate(linhas, start=1):
+        buffer.write(",".join("" if v is None else str(v) for v in linha))
+        buffer.write("\n")
+        if n % LOTE == 0:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            buffer = io.StringIO()
+            print(f"  {tabela}: {n} linhas", flush=True)
+        total = n
+
+    buffer.seek(0)
+    cursor.copy_expert(sql, buffer)
+    cursor.execute(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), GREATEST(%s, 1))", (total,))
+    return total
+
+
+def gerar_contas(rng, n):
+    for id in range(1, n + 1):
+        yield id, f"Conta {id}", round(rng.uniform(0, 10000), 2), True
+
+
+def gerar_categorias(rng, n):
+    for id in range(1, n + 1):
+        tipo = "receita" if id % 2 else "despesa"
+        yield id, f"Categoria {id}", tipo, rng.random() > 0.05
+
+
+def gerar_pessoas(rng, n):
+    for id in range(1, n + 1):
+        yield id, f"Pessoa {id}", rng.choice(("cliente", "fornecedor")), rng.random() > 0.05
+
+
+def gerar_transacoes(rng, n, contas, categorias, pessoas, dias):
+    for id in range(1, n + 1):
+        pessoa_id = rng.randint(1, pessoas) if pessoas and rng.random() < 0.7 else None
+        yield (
+            id,
+            rng.randint(1, contas),
+            rng.randint(1, categorias),
+            pessoa_id,
+            round(rng.uniform(1, 5000), 2),
+            data_transacao(id, dias).isoformat(sep=" "),
+            f"Transacao {id}",
+            rng.random() > 0.02,
+        )
+
+
+def gerar_pagamentos(rng, n, transacoes, dias):
+    for id in range(1, n + 1):
+        transacao_id = rng.randint(1, transacoes)
+        status = rng.choices(("pago", "pendente", "cancelado"), weights=(70, 20, 10))[0]
+        data = data_transacao(transacao_id, dias) + timedelta(days=rng.randint(0, 45))
+        yield id, transacao_id, status, data.isoformat(sep=" "), rng.random() > 0.02
+
+
+def seed(args):
+    rng = random.Random(args.seed)
+    conn = psycopg2.connect(args.dsn) if args.dsn else psycopg2.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    inicio = time.perf_counter()
+
+    if args.truncate:
+        print("Limpando tabelas...")
+        cursor.execute("TRUNCATE pagamento, transacao, pessoa, categoria, conta, saldo_diario RESTART IDENTITY CASCADE")
+    else:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM transacao) OR EXISTS (SELECT 1 FROM conta)")
+        if cursor.fetchone()[0]:
+            sys.exit("O banco já tem dados; use --truncate para recriar (apaga tudo).")
+
+    # saldo_diario é recalculado de uma vez no fim, em vez de pelos triggers a
+    # cada lote (com as tabelas particionadas, pagamento também tem triggers:
+    # os dados gerados já são consistentes)
+    cursor.execute("ALTER TABLE transacao DISABLE TRIGGER USER")
+    cursor.execute("ALTER TABLE pagamento DISABLE TRIGGER USER")
+
+    # Tabelas particionadas (database/particionamento.sql): cria antes as
+    # partições do período gerado, para o COPY não cair na partição default
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = 'transacao'::regclass")
+    particionada = cursor.fetchone()[0]
+    if particionada:
+        cursor.execute(
+            "SELECT transacao_particao_criar(m::date) FROM generate_series(%s::date, %s::date, interval '1 month') m",
+            (INICIO, INICIO + timedelta(days=args.dias)),
+        )
+        cursor.execute(
+            "SELECT pagamento_particao_criar(b) FROM generate_series(0, %s / pagamento_bloco()) b",
+            (args.transacoes,),
+        )
+
+    copy_lotes(cursor, "conta", ("id", "nome", "saldo_inicial", "ativo"),
+               gerar_contas(rng, args.contas))
+    copy_lotes(cursor, "categoria", ("id", "nome", "tipo", "ativo"),
+               gerar_categorias(rng, args.categorias))
+    copy_lotes(cursor, "pessoa", ("id", "nome", "tipo", "ativo"),
+               gerar_pessoas(rng, args.pessoas))
+    copy_lotes(cursor, "transacao",
+               ("id", "conta_id", "categoria_id", "pessoa_id", "valor", "data", "descricao", "ativo"),
+               gerar_transacoes(rng, args.transacoes, args.contas, args.categorias, args.pessoas, args.dias))
+    copy_lotes(cursor, "pagamento", ("id", "transacao_id", "status", "data_pagamento", "ativo"),
+               gerar_pagamentos(rng, args.pagamentos, args.transacoes, args.dias))
+
+    print("Recalculando saldo_diario...")
+    cursor.execute("SELECT saldo_diario_rebuild()")
+    if particionada:
+        # transacao_chave / pagamento_chave também são mantidas por triggers
+        cursor.execute("SELECT chaves_rebuild()")
+    cursor.execute("ALTER TABLE transacao ENABLE TRIGGER USER")
+    cursor.execute("ALTER TABLE pagamento ENABLE TRIGGER USER")
+    conn.commit()
+
+    print("Atualizando estatísticas (VACUUM ANALYZE)...")
+    conn.autocommit = True
+    cursor.execute("VACUUM ANALYZE")
+    cursor.close()
+    conn.close()
+
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos determinísticos para os benchmarks")
+    parser.add_argument("--contas", type=int, default=1000)
+    parser.add_argument("--categorias", type=int, default=50)
+    parser.add_argument("--pessoas", type=int, default=10000)
+    parser.add_argument("--transacoes", type=int, default=1_000_000)
+    parser.add_argument("--pagamentos", type=int, default=500_000)
+    parser.add_argument("--dias", type=int, default=730, help="Período coberto pelas transações a partir de 01/01/2024")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dsn", help="String de conexão (padrão: core/settings.py)")
+    parser.add_argument("--truncate", action="store_true", help="Apaga os dados existentes antes de gerar")
+    seed(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
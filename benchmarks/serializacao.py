@@ -0,0 +1,159 @@
+"""Compara a CPU por requisição dos modos de serialização das listagens.
+
+Roda a aplicação no próprio processo (TestClient, sem rede), sobre o banco de
+core/settings.py populado por benchmarks/seed.py:
+
+    python benchmarks/serializacao.py --requests 200 --limit 1000
+    python benchmarks/serializacao.py --async --only /pagamentos/
+
+Para cada endpoint, os três modos são medidos com as mesmas páginas:
+
+    pydantic  response_model valida e serializa cada linha
+    rapido    FAST_JSON_LISTS: serializador compilado + json.dumps
+    banco     DB_JSON_LISTS: o PostgreSQL monta o JSON e a aplicação repassa
+
+A CPU é a do processo (time.process_time), então inclui o trabalho do driver
+e do TestClient, que é o mesmo nos três modos; o tempo de banco vem do
+Server-Timing. As respostas de cada modo são comparadas (json.loads) antes
+de medir.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import settings
+
+
+MODOS = {
+    "pydantic": {"FAST_JSON_LISTS": False, "DB_JSON_LISTS": False},
+    "rapido": {"FAST_JSON_LISTS": True, "DB_JSON_LISTS": False},
+    "banco": {"FAST_JSON_LISTS": True, "DB_JSON_LISTS": True},
+}
+
+ENDPOINTS = ("/transacoes/", "/pagamentos/")
+
+
+def _modo(nome):
+    for chave, valor in MODOS[nome].items():
+        setattr(settings, chave, valor)
+
+
+def _tempo_db(resposta):
+    # Server-Timing: db;dur=1.23;desc="1 consultas", ...
+    for parte in resposta.headers.get("server-timing", "").split(","):
+        campos = parte.strip().split(";")
+        if campos[0] == "db":
+            for campo in campos[1:]:
+                if campo.startswith("dur="):
+                    return float(campo[4:]) / 1000
+    return 0.0
+
+
+# Cursores das páginas percorridas a partir do início, para que todos os modos
+# leiam as mesmas linhas
+def _cursores(client, endpoint, limit, paginas):
+    cursores = [None]
+    while len(cursores) < paginas:
+        resposta = client.get(endpoint, params=_params(cursores[-1], limit))
+        proximo = resposta.headers.get("x-next-cursor")
+        if not proximo:
+            break
+        cursores.append(proximo)
+    return cursores
+
+
+def _params(cursor, limit):
+    params = {"limit": limit}
+    if cursor is not None:
+        params["cursor"] = cursor
+    return params
+
+
+def _verificar(client, endpoint, limit, cursores):
+    for cursor in cursores:
+        respostas = {}
+        for nome in MODOS:
+            _modo(nome)
+            resposta = client.get(endpoint, params=_params(cursor, limit))
+            resposta.raise_for_status()
+            respostas[nome] = (json.loads(resposta.content), resposta.headers.get("x-next-cursor"))
+        # Comparação dos objetos: o modo banco escreve 100.0 como 100
+        primeira = respostas["pydantic"]
+        if any(r != primeira for r in respostas.values()):
+            raise SystemExit(f"{endpoint} cursor={cursor}: respostas diferentes entre os modos")
+
+
+def medir(client, endpoint, nome, limit, cursores, requisicoes, warmup):
+    _modo(nome)
+    for i in range(warmup):
+        client.get(endpoint, params=_params(cursores[i % len(cursores)], limit))
+
+    cpu = []
+    parede = []
+    db = []
+    tamanho = 0
+    for i in range(requisicoes):
+        params = _params(cursores[i % len(cursores)], limit)
+        inicio_cpu = time.process_time()
+        inicio = time.perf_counter()
+        resposta = client.get(endpoint, params=params)
+        parede.append(time.perf_counter() - inicio)
+        cpu.append(time.process_time() - inicio_cpu)
+        db.append(_tempo_db(resposta))
+        tamanho += len(resposta.content)
+
+    return {
+        "cpu_ms": round(statistics.mean(cpu) * 1000, 3),
+        "parede_ms": round(statistics.mean(parede) * 1000, 3),
+        "p95_ms": round(statistics.quantiles(parede, n=20)[-1] * 1000, 3) if len(parede) > 1 else None,
+        "db_ms": round(statistics.mean(db) * 1000, 3),
+        "bytes": tamanho // requisicoes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU por requisição dos modos de serialização das listagens")
+    parser.add_argument("--requests", type=int, default=200, help="Requisições por endpoint e modo")
+    parser.add_argument("--warmup", type=int, default=20, help="Requisições descartadas antes de medir")
+    parser.add_argument("--limit", type=int, default=1000, help="Itens por página")
+    parser.add_argument("--pages", type=int, default=20, help="Páginas distintas percorridas")
+    parser.add_argument("--only", action="append", help="Endpoint a medir (pode repetir)")
+    parser.add_argument("--async", dest="async_", action="store_true", help="Usa as rotas assíncronas (DB_ASYNC)")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    settings.DB_ASYNC = args.async_
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    resultado = {"async": args.async_, "limit": args.limit, "requests": args.requests, "endpoints": {}}
+
+    with TestClient(app) as client:
+        for endpoint in args.only or ENDPOINTS:
+            cursores = _cursores(client, endpoint, args.limit, args.pages)
+            _verificar(client, endpoint, args.limit, cursores)
+
+            medidas = resultado["endpoints"][endpoint] = {}
+            for nome in MODOS:
+                medidas[nome] = medir(client, endpoint, nome, args.limit, cursores, args.requests, args.warmup)
+
+            base = medidas["pydantic"]["cpu_ms"]
+            print(f"\n{endpoint} (limit={args.limit}, {len(cursores)} páginas)")
+            print(f"  {'modo':<10}{'cpu ms':>10}{'x':>7}{'parede ms':>12}{'p95 ms':>10}{'db ms':>9}{'bytes':>10}")
+            for nome, m in medidas.items():
+                print(f"  {nome:<10}{m['cpu_ms']:>10.2f}{base / m['cpu_ms']:>7.2f}{m['parede_ms']:>12.2f}"
+                      f"{m['p95_ms'] or 0:>10.2f}{m['db_ms']:>9.2f}{m['bytes']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from fastapi.responses import JSONResponse
+
+from core import settings
+from core.requisicao import METODOS_LEITURA
+
+
+# 🔹 Controle de admissão (compartimentos + limite por cliente)
+#
+# Cada requisição cai numa classe — escrita, leitura ou relatório — e só
+# segue para a rota quando há vaga no compartimento da classe. Sem vaga, ela
+# espera numa fila limitada (ADMISSAO_FILA_MAX) por até
+# ADMISSAO_FILA_TIMEOUT segundos; fila cheia ou espera estourada viram 503.
+# Assim um pico de relatórios ocupa no máximo ADMISSAO_LIMITE_RELATORIO
+# conexões e o POST /transacoes continua encontrando vaga no pool.
+#
+# Antes disso, cada cliente (header RATE_LIMIT_HEADER ou IP) tem um balde de
+# fichas: RATE_LIMIT_POR_SEGUNDO fichas por segundo até RATE_LIMIT_RAJADA, e
+# cada requisição gasta 1 (relatórios gastam RATE_LIMIT_CUSTO_RELATORIO).
+# Sem fichas, 429 com Retry-After.
+#
+# Tudo roda no event loop (middleware ASGI), então o estado é mexido sempre
+# pela mesma thread: contadores simples, sem lock.
+
+# Rotas de observação não passam pela admissão: precisam responder justamente
+# quando o resto está saturado
+ISENTAS = ("/metrics", "/sistema/", "/docs", "/redoc", "/openapi.json")
+RELATORIOS = ("/relatorios/", "/transacoes/export")
+
+
+def classificar(scope):
+    path = scope["path"]
+    if path.startswith(ISENTAS):
+        return None
+    if scope["method"] not in METODOS_LEITURA:
+        return "escrita"
+    if path.startswith(RELATORIOS):
+        return "relatorio"
+    return "leitura"
+
+
+class Rejeitada(Exception):
+    def __init__(self, motivo):
+        self.motivo = motivo
+
+
+class Compartimento:
+    def __init__(self, nome, limite, fila_max, timeout):
+        self.nome = nome
+        self.limite = limite
+        self.fila_max = fila_max
+        self.timeout = timeout
+        self.em_uso = 0
+        self.fila = deque()             # futures de quem espera, em ordem de chegada
+        self.admitidas = 0
+        self.enfileiradas = 0
+        self.rejeitadas = {"fila_cheia": 0, "timeout": 0}
+        self.espera_total = 0.0
+
+    async def entrar(self):
+        # Com vaga livre a fila está vazia: sair() passa a vaga direto para o
+        # primeiro da fila
+        if self.em_uso < self.limite:
+            self.em_uso += 1
+            self.admitidas += 1
+            return
+        if len(self.fila) >= self.fila_max:
+            self.rejeitadas["fila_cheia"] += 1
+            raise Rejeitada("fila_cheia")
+
+        vez = asyncio.get_running_loop().create_future()
+        self.fila.append(vez)
+        self.enfileiradas += 1
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(vez), self.timeout)
+        except BaseException as e:
+            # Timeout ou requisição cancelada: se a vaga chegou no mesmo
+            # instante ela é devolvida, senão sai da fila
+            if vez.done() and not vez.cancelled():
+                self.sair()
+            else:
+                vez.cancel()
+                self.fila.remove(vez)
+            # Antes do Python 3.11, asyncio.TimeoutError não é o TimeoutError embutido
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejeitadas["timeout"] += 1
+                raise Rejeitada("timeout") from None
+            raise
+        finally:
+            self.espera_total += time.perf_counter() - inicio
+        self.admitidas += 1
+
+    def sair(self):
+        while self.fila:
+            vez = self.fila.popleft()
+            if not vez.done():
+                vez.set_result(None)
+                return
+        self.em_uso -= 1
+
+    def stats(self):
+        return {
+            "classe": self.nome,
+            "limite": self.limite,
+            "em_uso": self.em_uso,
+            "na_fila": len(self.fila),
+            "fila_max": self.fila_max,
+            "admitidas": self.admitidas,
+            "enfileiradas": self.enfileiradas,
+            "rejeitadas": dict(self.rejeitadas),
+            "espera_total_s": round(self.espera_total, 6),
+        }
+
+
+# -----------------------------
+# Limite por cliente (token bucket)
+# -----------------------------
+class Baldes:
+    def __init__(self, por_segundo, rajada, max_clientes):
+        self.por_segundo = por_segundo
+        self.rajada = rajada
+        self.max_clientes = max_clientes
+        self._baldes = OrderedDict()    # cliente -> [fichas, atualizado_em]
+        self.limitadas = {}             # classe -> requisições recusadas
+
+    # Retorna 0 se a requisição pode seguir, senão os segundos até haver
+    # fichas suficientes
+    def consumir(self, cliente, custo, classe):
+        agora = time.monotonic()
+        balde = self._baldes.get(cliente)
+        if balde is None:
+            balde = self._baldes[cliente] = [float(self.rajada), agora]
+            # Clientes que não aparecem há mais tempo saem primeiro; voltam
+            # com o balde cheio, o mesmo que teriam depois de parados
+            if len(self._baldes) > self.max_clientes:
+                self._baldes.popitem(last=False)
+        else:
+            self._baldes.move_to_end(cliente)
+            balde[0] = min(self.rajada, balde[0] + (agora - balde[1]) * self.por_segundo)
+            balde[1] = agora
+
+        if balde[0] >= custo:
+            balde[0] -= custo
+            return 0
+        self.limitadas[classe] = self.limitadas.get(classe, 0) + 1
+        return (custo - balde[0]) / self.por_segundo
+
+    def stats(self):
+        return {
+            "por_segundo": self.por_segundo,
+            "rajada": self.rajada,
+            "clientes": len(self._baldes),
+            "limitadas": dict(self.limitadas),
+        }
+
+
+_compartimentos = {
+    nome: Compartimento(nome, limite, settings.ADMISSAO_FILA_MAX, settings.ADMISSAO_FILA_TIMEOUT)
+    for nome, limite in (
+        ("escrita", settings.ADMISSAO_LIMITE_ESCRITA),
+        ("leitura", settings.ADMISSAO_LIMITE_LEITURA),
+        ("relatorio", settings.ADMISSAO_LIMITE_RELATORIO),
+    )
+    if limite > 0
+}
+_baldes = (
+    Baldes(settings.RATE_LIMIT_POR_SEGUNDO, max(settings.RATE_LIMIT_RAJADA, settings.RATE_LIMIT_CUSTO_RELATORIO),
+           settings.RATE_LIMIT_MAX_CLIENTES)
+    if settings.RATE_LIMIT_POR_SEGUNDO > 0 else None
+)
+_header_cliente = settings.RATE_LIMIT_HEADER.lower().encode("latin-1")
+
+
+def ativo():
+    return bool(_compartimentos) or _baldes is not None
+
+
+def admissao_stats():
+    return {
+        "compartimentos": [c.stats() for c in _compartimentos.values()],
+        "rate_limit": _baldes.stats() if _baldes is not None else None,
+    }
+
+
+# Valor do header configurado ou, sem ele, o IP (com proxy na frente, rodar o
+# uvicorn com --proxy-headers para o IP ser o do cliente)
+def _cliente(scope):
+    if _header_cliente:
+        for nome, valor in scope["headers"]:
+            if nome == _header_cliente:
+                return "k:" + valor.decode("latin-1")
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "?")
+
+
+def _recusa(status, detalhe, retry_after):
+    return JSONResponse(
+        status_code=status,
+        content={"detail": detalhe},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissaoMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        classe = classificar(scope) if scope["type"] == "http" else None
+        if classe is None:
+            await self.app(scope, receive, send)
+            return
+
+        if _baldes is not None:
+            custo = settings.RATE_LIMIT_CUSTO_RELATORIO if classe == "relatorio" else 1
+            espera = _baldes.consumir(_cliente(scope), custo, classe)
+            if espera:
+                resposta = _recusa(429, "Limite de requisições excedido, tente novamente", espera)
+                await resposta(scope, receive, send)
+                return
+
+        compartimento = _compartimentos.get(classe)
+        if compartimento is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await compartimento.entrar()
+        except Rejeitada:
+            resposta = _recusa(503, "Servidor ocupado, tente novamente", 1)
+            await resposta(scope, receive, send)
+            return
+
+        # A vaga vale até o fim da resposta (inclusive exportações em streaming,
+        # que seguram a conexão com o banco enquanto enviam)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            compartimento.sair()
@@ -0,0 +1,195 @@
+from contextlib import suppress
+
+from fastapi import Depends, Request
+from psycopg import AsyncCursor, OperationalError, pq
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from core import settings
+from core.cancelamento import SQL_TIMEOUT_LOCAL, cancelar_ao_desconectar, valor_timeout
+from core.instrumentacao import InstrumentedAsyncCursor
+from core.pool import parametros_conexao
+from core.replicas import escolher_replica, le_do_primario, replicas
+
+
+# 🔹 Camada assíncrona (psycopg 3), usada quando settings.DB_ASYNC = True
+#
+# As linhas vêm como dict (dict_row), no mesmo formato do RealDictCursor
+# usado pelas rotas síncronas, e o SQL usa o mesmo estilo de parâmetro (%s),
+# então as consultas montadas nos routers servem para as duas camadas.
+DB_CONNINFO = make_conninfo(
+    host=settings.DB_HOST,
+    dbname=settings.DB_NAME,
+    user=settings.DB_USER,
+    password=settings.DB_PASSWORD,
+    port=settings.DB_PORT,
+    **parametros_conexao(),
+)
+
+_pool = None
+_replica_pools = {}     # nome da réplica -> AsyncConnectionPool
+
+
+# Prepared statements nativos do psycopg 3: a consulta executada
+# prepare_threshold vezes na conexão é preparada (fetch_one/fetch_all com
+# prepare=True preparam já na primeira), com LRU de prepared_max por conexão.
+# DB_PREPARED_STATEMENTS = False desliga (prepare_threshold=None)
+async def _configurar(conn):
+    conn.prepared_max = settings.DB_PREPARED_MAX
+
+
+# Mesmo teste do AsyncConnectionPool.check_connection, mas num cursor simples:
+# o da conexão é o instrumentado, e a verificação feita a cada checkout
+# entraria nas consultas / tempo de banco da requisição
+async def _verificar(conn):
+    autocommit = conn.autocommit
+    if not autocommit:
+        await conn.set_autocommit(True)
+    try:
+        async with AsyncCursor(conn) as cursor:
+            await cursor.execute("")
+    finally:
+        if not autocommit:
+            with suppress(Exception):
+                await conn.set_autocommit(False)
+
+
+def _novo_pool(conninfo):
+    return AsyncConnectionPool(
+        conninfo,
+        kwargs={
+            "row_factory": dict_row,
+            "cursor_factory": InstrumentedAsyncCursor,
+            "prepare_threshold": 5 if settings.DB_PREPARED_STATEMENTS else None,
+        },
+        configure=_configurar,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_ASYNC_POOL_MAX_SIZE,
+        timeout=settings.DB_POOL_TIMEOUT,
+        max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+        check=_verificar,
+        open=False,
+    )
+
+
+def get_async_pool():
+    global _pool
+    if _pool is None:
+        _pool = _novo_pool(DB_CONNINFO)
+    return _pool
+
+
+async def open_async_pool():
+    await get_async_pool().open(wait=True)
+    # Réplica fora do ar não impede a subida: o pool dela conecta em segundo
+    # plano e, até lá, a verificação a mantém fora do rodízio
+    for replica in replicas():
+        pool = _replica_pools[replica.nome] = _novo_pool(make_conninfo(**replica.config))
+        await pool.open(wait=False)
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+    for pool in _replica_pools.values():
+        await pool.close()
+    _replica_pools.clear()
+
+
+def async_pool_stats():
+    if _pool is None:
+        return None
+    return _pool.get_stats()
+
+
+def async_replica_pool_stats():
+    return {nome: pool.get_stats() for nome, pool in _replica_pools.items()}
+
+
+# 🔹 Dependência para FastAPI (mesma semântica do get_db: commit explícito,
+# o que ficar pendente é desfeito antes de devolver a conexão ao pool)
+async def get_async_db():
+    pool = get_async_pool()
+    conn = await pool.getconn()
+    try:
+        yield conn
+    finally:
+        await _devolver(pool, conn)
+
+
+# O psycopg 3 esquece as preparadas da conexão a cada ROLLBACK, então a
+# transação de uma leitura (que não escreveu nada) é encerrada com COMMIT;
+# transação com erro ou de escrita não confirmada continua com rollback
+async def _devolver(pool, conn, leitura=False):
+    status = conn.info.transaction_status
+    if leitura and status == pq.TransactionStatus.INTRANS:
+        await conn.commit()
+    elif status in (pq.TransactionStatus.INTRANS, pq.TransactionStatus.INERROR):
+        await conn.rollback()
+    await pool.putconn(conn)
+
+
+# 🔹 Leitura (rotas GET): mesma escolha do get_read_db síncrono. Um pool de
+# réplica sem nenhuma conexão aberta espera no máximo
+# DB_REPLICA_CONNECT_TIMEOUT; se não conseguir, a réplica sai do rodízio e a
+# próxima é tentada. Com conexões abertas, esgotar o pool é 503 como no
+# primário.
+async def _checkout_leitura(request):
+    if not le_do_primario(request.headers.raw):
+        while (replica := escolher_replica()) is not None:
+            pool = _replica_pools.get(replica.nome)
+            if pool is None:
+                break
+            vazio = not pool.get_stats().get("pool_size", 0)
+            try:
+                return replica, pool, await pool.getconn(timeout=settings.DB_REPLICA_CONNECT_TIMEOUT if vazio else None)
+            except PoolTimeout as e:
+                if not vazio:
+                    raise
+                replica.marcar_falha(e)
+    pool = get_async_pool()
+    return None, pool, await pool.getconn()
+
+
+async def get_async_read_db(request: Request):
+    replica, pool, conn = await _checkout_leitura(request)
+    try:
+        yield conn
+    except OperationalError as e:
+        if replica is not None and conn.closed:
+            replica.marcar_falha(e)
+        raise
+    finally:
+        await _devolver(pool, conn, leitura=True)
+
+
+# 🔹 Mesma dependência do limite_consulta síncrono (core/db.py)
+def limite_consulta_async(timeout_ms):
+    async def dependencia(request: Request, db=Depends(get_async_read_db)):
+        await db.execute(SQL_TIMEOUT_LOCAL, (valor_timeout(timeout_ms),))
+        async with cancelar_ao_desconectar(request, db.cancel_safe):
+            yield
+    return dependencia
+
+
+# 🔹 Helpers de cursor
+# prepare=True: consulta quente, preparada na primeira execução. Com
+# DB_PREPARED_STATEMENTS desligado nada é preparado, nem pelo limiar
+def _prepare(prepare):
+    if not settings.DB_PREPARED_STATEMENTS:
+        return False
+    return True if prepare else None
+
+
+async def fetch_all(conn, query, params=None, prepare=False):
+    async with conn.cursor() as cursor:
+        await cursor.execute(query, params, prepare=_prepare(prepare))
+        return await cursor.fetchall()
+
+
+async def fetch_one(conn, query, params=None, prepare=False):
+    async with conn.cursor() as cursor:
+        await cursor.execute(query, params, prepare=_prepare(prepare))
+        return await cursor.fetchone()
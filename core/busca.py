@@ -0,0 +1,9 @@
+# 🔹 Filtros de texto
+#
+# `nome ILIKE '%texto%'` nas listagens de contas, categorias e pessoas usa os
+# índices de trigramas (pg_trgm, database/schema.sql) em vez de ler a tabela
+# inteira; o índice só ajuda a partir de 3 caracteres. O texto vem do usuário,
+# então % e _ são escapados para valerem como caracteres comuns.
+def padrao_contem(texto):
+    texto = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{texto}%"
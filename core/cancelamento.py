@@ -0,0 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+
+# 🔹 Timeout por rota e cancelamento quando o cliente desconecta
+#
+# As rotas pesadas (relatórios, busca) usam uma dependência que, na conexão
+# da requisição, troca o statement_timeout só para a transação corrente
+# (set_config(..., true), desfeito no rollback de quando a conexão volta ao
+# pool) e vigia a desconexão do cliente: se ele for embora no meio da
+# consulta, o PostgreSQL recebe um pedido de cancelamento em vez de seguir
+# calculando uma resposta que ninguém vai ler. Nos dois casos a consulta
+# termina com QueryCanceled, que vira 504 (main.py).
+#
+# A dependência é declarada com scope="function": a vigia termina quando a
+# função da rota termina, antes de a conexão voltar ao pool, então um
+# cancelamento nunca atinge a consulta de outra requisição.
+SQL_TIMEOUT_LOCAL = "SELECT set_config('statement_timeout', %s, true)"
+SQL_OCIOSO_LOCAL = "SELECT set_config('idle_in_transaction_session_timeout', %s, true)"
+
+
+def valor_timeout(timeout_ms):
+    return str(int(timeout_ms))
+
+
+# O corpo das rotas GET não é lido, então a vigia pode consumir as mensagens
+# do receive até chegar o http.disconnect
+async def _vigiar(request, cancelar):
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            await cancelar()
+            return
+
+
+@asynccontextmanager
+async def cancelar_ao_desconectar(request, cancelar):
+    vigia = asyncio.create_task(_vigiar(request, cancelar))
+    try:
+        yield
+    finally:
+        # Espera a vigia parar de fato: um cancelamento em curso termina
+        # antes de a conexão ser devolvida. Falha ao cancelar não muda a
+        # resposta da rota
+        vigia.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await vigia
@@ -1,9 +1,21 @@
+import threading
+from contextlib import contextmanager
+
+import anyio.to_thread
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from fastapi import Depends, Request
+
 from core import settings
+from core.cancelamento import SQL_OCIOSO_LOCAL, SQL_TIMEOUT_LOCAL, cancelar_ao_desconectar, valor_timeout
+from core.instrumentacao import InstrumentedCursor
+from core.pool import ConnectionPool, parametros_conexao
+from core.preparadas import ConexaoPreparada
+from core.replicas import escolher_replica, le_do_primario
 
 
-# 🔹 Configurações do banco (centralizadas nas settings)
+# 🔹 Configurações do banco (centralizadas nas settings). Os scripts de
+# benchmarks/ conectam só com DB_CONFIG; as conexões do pool levam também os
+# timeouts de sessão (parametros_conexao)
 DB_CONFIG = {
     "host": settings.DB_HOST,
     "database": settings.DB_NAME,
@@ -13,26 +25,63 @@ DB_CONFIG = {
 }
 
 
+# 🔹 Pool único por processo, criado na primeira utilização
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    {**DB_CONFIG, **parametros_conexao(), "connection_factory": ConexaoPreparada,
+                     "cursor_factory": InstrumentedCursor},
+                    min_size=settings.DB_POOL_MIN_SIZE,
+                    max_size=settings.DB_POOL_MAX_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                    health_check_after=settings.DB_POOL_HEALTH_CHECK_AFTER,
+                )
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats():
+    if _pool is None:
+        return None
+    return _pool.stats()
+
+
 # 🔹 Classe opcional (pouco usada nas rotas, mas deixada aqui caso queira usar manualmente)
+# manutencao=True: conexão própria, fora do pool e sem statement_timeout /
+# idle_in_transaction_session_timeout (migrações e comandos de create_table.py)
 class DataBase:
-    def __init__(self):
+    def __init__(self, manutencao=False):
 
         self.conn = None
+        self.manutencao = manutencao
 
     def _get_conn(self):
         if self.conn is None or self.conn.closed:
-            self.conn = psycopg2.connect(
-                host=settings.DB_HOST,
-                database=settings.DB_NAME,
-                user=settings.DB_USER,
-                password=settings.DB_PASSWORD,
-                port=settings.DB_PORT
-            )
+            if self.manutencao:
+                self.conn = psycopg2.connect(**DB_CONFIG, **parametros_conexao(sem_timeouts=True),
+                                             cursor_factory=InstrumentedCursor)
+            else:
+                self.conn = get_pool().getconn()
         return self.conn
 
     def execute(self, sql, params=None, many=True):
         conn = self._get_conn()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor(cursor_factory=InstrumentedCursor)
         try:
             cursor.execute(sql, params)
             result = cursor.fetchall() if many else cursor.fetchone()
@@ -49,7 +98,7 @@ class DataBase:
 
     def commit(self, sql, params=None):
         conn = self._get_conn()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor(cursor_factory=InstrumentedCursor)
         try:
             cursor.execute(sql, params)
             conn.commit()
@@ -67,17 +116,96 @@ class DataBase:
         finally:
             cursor.close()
 
+    # Devolve a conexão ao pool (o pool faz rollback do que ficou pendente)
     def close(self):
-        if self.conn and not self.conn.closed:
-            self.conn.close()
+        if self.conn is not None:
+            if self.manutencao:
+                self.conn.close()
+            else:
+                get_pool().putconn(self.conn)
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Rede de segurança para instâncias descartadas sem close()
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
 
 
 # 🔹 Função de dependência para FastAPI (usada com Depends)
 def get_db():
-    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+    pool = get_pool()
+    conn = pool.getconn()
     try:
         yield conn
     finally:
 
-        conn.close()
+        pool.putconn(conn)
+
+
+# 🔹 Conexão de leitura: réplica do rodízio (core/replicas.py) ou, sem réplica
+# disponível / logo depois de uma escrita do cliente, o primário. Réplica que
+# recusa a conexão sai do rodízio e a próxima é tentada; se a conexão cair no
+# meio da requisição, aquela requisição falha, mas a réplica sai do rodízio
+# sem esperar a próxima verificação.
+def _checkout_leitura(request):
+    if not le_do_primario(request.headers.raw):
+        while (replica := escolher_replica()) is not None:
+            pool = replica.pool()
+            try:
+                return replica, pool, pool.getconn()
+            except psycopg2.OperationalError as e:
+                replica.marcar_falha(e)
+    pool = get_pool()
+    return None, pool, pool.getconn()
+
+
+@contextmanager
+def read_connection(request: Request):
+    replica, pool, conn = _checkout_leitura(request)
+    try:
+        yield conn
+    except psycopg2.OperationalError as e:
+        if replica is not None and conn.closed:
+            replica.marcar_falha(e)
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+# Dependência das rotas GET
+def get_read_db(request: Request):
+    with read_connection(request) as conn:
+        yield conn
+
+
+# 🔹 Timeouts só da transação corrente (desfeitos quando ela termina), para
+# rotas que precisam de um orçamento diferente do padrão das conexões:
+# statement_timeout e, se informado, idle_in_transaction_session_timeout
+def definir_timeout(conn, timeout_ms, ocioso_ms=None):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SQL_TIMEOUT_LOCAL, (valor_timeout(timeout_ms),))
+        if ocioso_ms is not None:
+            cursor.execute(SQL_OCIOSO_LOCAL, (valor_timeout(ocioso_ms),))
+    finally:
+        cursor.close()
+
 
+# 🔹 Timeout próprio e cancelamento na desconexão (core/cancelamento.py) para
+# rotas de leitura pesadas; usar com scope="function":
+#   dependencies=[Depends(limite_consulta(5000), scope="function")]
+def limite_consulta(timeout_ms):
+    async def dependencia(request: Request, db=Depends(get_read_db)):
+        await anyio.to_thread.run_sync(definir_timeout, db, timeout_ms)
+        # conn.cancel() do psycopg2 bloqueia até o servidor receber o pedido
+        async with cancelar_ao_desconectar(request, lambda: anyio.to_thread.run_sync(db.cancel)):
+            yield
+    return dependencia
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from psycopg import AsyncCursor
+from psycopg2.extras import RealDictCursor
+from core import settings
+from core.preparadas import executar_preparada
+
+
+# 🔹 Instrumentação das consultas SQL
+#
+# Os cursores abaixo são usados por todas as conexões dos pools (get_db,
+# DataBase e a camada assíncrona). Cada execução soma tempo, quantidade e
+# linhas nas estatísticas da requisição atual (um ContextVar preenchido pelo
+# InstrumentacaoMiddleware) e, acima de SLOW_QUERY_MS, vai para o log de
+# consultas lentas com o SQL normalizado e uma impressão digital estável.
+logger = logging.getLogger("sistema_financeiro.sql")
+
+
+class EstatisticasRequisicao:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.linhas = 0
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.tempo_db * 1000:.2f};desc="{self.consultas} consultas", '
+            f'db-linhas;desc="{self.linhas}", '
+            f"total;dur={total * 1000:.2f}"
+        )
+
+
+_requisicao = ContextVar("estatisticas_sql", default=None)
+
+
+def estatisticas_atuais():
+    return _requisicao.get()
+
+
+# -----------------------------
+# Normalização / impressão digital
+# -----------------------------
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_PARAMETRO = re.compile(r"%\(\w+\)s|%s")
+_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql):
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    sql = _LITERAL_TEXTO.sub("?", sql)
+    sql = _PARAMETRO.sub("?", sql)
+    sql = _NUMERO.sub("?", sql)
+    sql = _LISTA.sub("(?, ...)", sql)
+    return _ESPACOS.sub(" ", sql).strip()
+
+
+def impressao_digital(sql_normalizado):
+    return hashlib.blake2b(sql_normalizado.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def registrar(sql, duracao, linhas):
+    linhas = max(linhas or 0, 0)
+
+    stats = _requisicao.get()
+    if stats is not None:
+        stats.consultas += 1
+        stats.tempo_db += duracao
+        stats.linhas += linhas
+
+    if settings.SLOW_QUERY_MS and duracao * 1000 >= settings.SLOW_QUERY_MS:
+        normalizado = normalizar_sql(sql)
+        logger.warning(json.dumps({
+            "evento": "consulta_lenta",
+            "duracao_ms": round(duracao * 1000, 2),
+            "linhas": linhas,
+            "fingerprint": impressao_digital(normalizado),
+            "sql": normalizado,
+            "rota": f"{stats.method} {stats.path}" if stats is not None else None,
+        }, ensure_ascii=False))
+
+
+# -----------------------------
+# Cursores
+# -----------------------------
+class InstrumentedCursor(RealDictCursor):
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            registrar(query, time.perf_counter() - inicio, self.rowcount)
+
+    # PREPARE/EXECUTE na conexão (core/preparadas.py); o log e as métricas
+    # ficam com o SQL original
+    def execute_prepared(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return executar_preparada(self, super().execute, query, vars)
+        finally:
+            registrar(query, time.perf_counter() - inicio, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            registrar(query, time.perf_counter() - inicio, self.rowcount)
+
+    def copy_expert(self, sql, file, size=8192):
+        inicio = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            registrar(sql, time.perf_counter() - inicio, self.rowcount)
+
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            registrar(query, time.perf_counter() - inicio, self.rowcount)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            registrar(query, time.perf_counter() - inicio, self.rowcount)
+
+    # Como no copy_expert síncrono, o tempo inclui o envio / leitura dos dados
+    @asynccontextmanager
+    async def copy(self, statement, params=None, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            async with super().copy(statement, params, **kwargs) as copy:
+                yield copy
+        finally:
+            registrar(statement, time.perf_counter() - inicio, self.rowcount)
+
+
+# -----------------------------
+# Middleware: uma EstatisticasRequisicao por requisição + Server-Timing
+# -----------------------------
+class InstrumentacaoMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = EstatisticasRequisicao(scope["method"], scope["path"])
+        token = _requisicao.set(stats)
+        inicio = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING:
+                valor = stats.server_timing(time.perf_counter() - inicio)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", valor.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _requisicao.reset(token)
@@ -0,0 +1,311 @@
+import time
+from bisect import bisect_left
+
+import anyio.to_thread
+from starlette.routing import Match
+
+from core import settings
+from core.admissao import admissao_stats
+from core.db import pool_stats
+from core.instrumentacao import estatisticas_atuais
+from core.replicas import replicas
+
+
+# 🔹 Métricas no formato texto do Prometheus (GET /metrics)
+#
+# Tudo é atualizado pelo MetricasMiddleware, que roda no event loop: as
+# requisições do processo são contadas sempre pela mesma thread, então os
+# contadores são ints simples, sem lock. Os conjuntos de labels (uma entrada
+# por rota + método) são criados de uma vez na primeira requisição, e cada
+# requisição só incrementa números já existentes.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SEM_ROTA = "desconhecida"
+
+
+class MetricasRota:
+    __slots__ = ("labels", "buckets", "duracao", "quantidade", "status",
+                 "bytes_requisicao", "bytes_resposta", "tempo_db", "consultas")
+
+    def __init__(self, router, path, method):
+        self.labels = f'router="{router}",path="{path}",method="{method}"'
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.duracao = 0.0
+        self.quantidade = 0
+        self.status = {}
+        self.bytes_requisicao = 0
+        self.bytes_resposta = 0
+        self.tempo_db = 0.0
+        self.consultas = 0
+
+    def observar(self, duracao, status, bytes_requisicao, bytes_resposta, stats):
+        self.buckets[bisect_left(BUCKETS, duracao)] += 1
+        self.duracao += duracao
+        self.quantidade += 1
+        self.status[status] = self.status.get(status, 0) + 1
+        self.bytes_requisicao += bytes_requisicao
+        self.bytes_resposta += bytes_resposta
+        if stats is not None:
+            self.tempo_db += stats.tempo_db
+            self.consultas += stats.consultas
+
+
+_rotas = None
+_em_andamento = 0
+
+
+def _registrar_rotas(app):
+    rotas = {}
+    for route in app.routes:
+        methods = getattr(route, "methods", None)
+        if not methods:
+            continue
+        tags = getattr(route, "tags", None)
+        router = tags[0] if tags else "app"
+        for method in methods:
+            rotas[(route.path, method)] = MetricasRota(router, route.path, method)
+    rotas[(SEM_ROTA, None)] = MetricasRota("app", SEM_ROTA, "")
+    return rotas
+
+
+# Respostas que não passam pelo roteamento (ex.: acerto no cache de
+# relatórios) não trazem scope["route"]; procura a rota pelo caminho
+def _rota_da_requisicao(scope):
+    route = scope.get("route")
+    if route is None:
+        for candidata in scope["app"].routes:
+            match, _ = candidata.matches(scope)
+            if match == Match.FULL:
+                route = candidata
+                break
+    if route is None:
+        return _rotas[(SEM_ROTA, None)]
+    return _rotas.get((route.path, scope["method"])) or _rotas[(SEM_ROTA, None)]
+
+
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _rotas, _em_andamento
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if _rotas is None:
+            _rotas = _registrar_rotas(scope["app"])
+
+        inicio = time.perf_counter()
+        status = 500
+        recebidos = 0
+        enviados = 0
+
+        async def receive_wrapper():
+            nonlocal recebidos
+            message = await receive()
+            if message["type"] == "http.request":
+                recebidos += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, enviados
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                enviados += len(message.get("body", b""))
+            await send(message)
+
+        _em_andamento += 1
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _em_andamento -= 1
+            _rota_da_requisicao(scope).observar(
+                time.perf_counter() - inicio, status, recebidos, enviados, estatisticas_atuais()
+            )
+
+
+# -----------------------------
+# Formato texto
+# -----------------------------
+def _metrica(linhas, nome, tipo, ajuda):
+    linhas.append(f"# HELP {nome} {ajuda}")
+    linhas.append(f"# TYPE {nome} {tipo}")
+
+
+def render():
+    linhas = []
+    rotas = list((_rotas or {}).values())
+
+    _metrica(linhas, "http_requests_total", "counter", "Requisições por rota e status")
+    for r in rotas:
+        for status, n in r.status.items():
+            linhas.append(f'http_requests_total{{{r.labels},status="{status}"}} {n}')
+
+    _metrica(linhas, "http_request_duration_seconds", "histogram", "Duração das requisições")
+    for r in rotas:
+        acumulado = 0
+        for limite, n in zip(BUCKETS, r.buckets):
+            acumulado += n
+            linhas.append(f'http_request_duration_seconds_bucket{{{r.labels},le="{limite}"}} {acumulado}')
+        linhas.append(f'http_request_duration_seconds_bucket{{{r.labels},le="+Inf"}} {r.quantidade}')
+        linhas.append(f"http_request_duration_seconds_sum{{{r.labels}}} {r.duracao}")
+        linhas.append(f"http_request_duration_seconds_count{{{r.labels}}} {r.quantidade}")
+
+    _metrica(linhas, "http_request_size_bytes_total", "counter", "Bytes recebidos no corpo das requisições")
+    for r in rotas:
+        linhas.append(f"http_request_size_bytes_total{{{r.labels}}} {r.bytes_requisicao}")
+
+    _metrica(linhas, "http_response_size_bytes_total", "counter", "Bytes enviados no corpo das respostas")
+    for r in rotas:
+        linhas.append(f"http_response_size_bytes_total{{{r.labels}}} {r.bytes_resposta}")
+
+    _metrica(linhas, "http_request_db_seconds_total", "counter",
+             "Tempo gasto no banco (dividir por http_request_duration_seconds_sum dá a fração)")
+    for r in rotas:
+        linhas.append(f"http_request_db_seconds_total{{{r.labels}}} {r.tempo_db}")
+
+    _metrica(linhas, "http_request_db_queries_total", "counter", "Consultas SQL executadas")
+    for r in rotas:
+        linhas.append(f"http_request_db_queries_total{{{r.labels}}} {r.consultas}")
+
+    _metrica(linhas, "http_requests_in_flight", "gauge", "Requisições em andamento")
+    linhas.append(f"http_requests_in_flight {_em_andamento}")
+
+    # Threadpool do anyio, onde rodam as rotas síncronas
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    estatisticas = limiter.statistics()
+    _metrica(linhas, "threadpool_threads_total", "gauge", "Limite de threads do threadpool")
+    linhas.append(f"threadpool_threads_total {limiter.total_tokens}")
+    _metrica(linhas, "threadpool_threads_busy", "gauge", "Threads ocupadas")
+    linhas.append(f"threadpool_threads_busy {estatisticas.borrowed_tokens}")
+    _metrica(linhas, "threadpool_queue_depth", "gauge", "Tarefas esperando uma thread livre")
+    linhas.append(f"threadpool_queue_depth {estatisticas.tasks_waiting}")
+
+    _pools(linhas)
+    _replicas(linhas)
+    _admissao(linhas)
+
+    return "\n".join(linhas) + "\n"
+
+
+def _pool_sync(stats):
+    return {
+        "size": stats["size"],
+        "max_size": stats["max_size"],
+        "in_use": stats["in_use"],
+        "idle": stats["idle"],
+        "waiting": stats["waiting"],
+        "checkouts": stats["checkouts"],
+        "timeouts": stats["checkout_timeouts"],
+        "wait_total": stats["checkout_wait_total_ms"] / 1000,
+    }
+
+
+# get_stats() do psycopg_pool omite os contadores ainda zerados
+def _pool_async(stats):
+    return {
+        "size": stats.get("pool_size", 0),
+        "max_size": stats.get("pool_max", 0),
+        "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "idle": stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "checkouts": stats.get("requests_num", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "wait_total": stats.get("requests_wait_ms", 0) / 1000,
+    }
+
+
+# Estatísticas dos pools no mesmo formato, com label pool="sync" / "async"
+# (réplicas: "replica-<host:porta>" / "replica-<host:porta>-async")
+def _estatisticas_pools():
+    pools = []
+
+    stats = pool_stats()
+    if stats is not None:
+        pools.append(("sync", _pool_sync(stats)))
+
+    for replica in replicas():
+        stats = replica.stats()["pool"]
+        if stats is not None:
+            pools.append((f"replica-{replica.nome}", _pool_sync(stats)))
+
+    if settings.DB_ASYNC:
+        from core.async_db import async_pool_stats, async_replica_pool_stats
+        stats = async_pool_stats()
+        if stats is not None:
+            pools.append(("async", _pool_async(stats)))
+        for nome, stats in async_replica_pool_stats().items():
+            pools.append((f"replica-{nome}-async", _pool_async(stats)))
+
+    return pools
+
+
+def _replicas(linhas):
+    estados = [replica.stats() for replica in replicas()]
+    if not estados:
+        return
+
+    _metrica(linhas, "db_replica_up", "gauge", "Réplica no rodízio de leitura (1) ou fora (0)")
+    for e in estados:
+        linhas.append(f'db_replica_up{{replica="{e["replica"]}"}} {int(e["saudavel"])}')
+
+    _metrica(linhas, "db_replica_lag_seconds", "gauge", "Atraso de replicação na última verificação")
+    for e in estados:
+        if e["atraso_s"] is not None:
+            linhas.append(f'db_replica_lag_seconds{{replica="{e["replica"]}"}} {e["atraso_s"]}')
+
+    _metrica(linhas, "db_replica_reads_total", "counter", "Leituras encaminhadas para a réplica")
+    for e in estados:
+        linhas.append(f'db_replica_reads_total{{replica="{e["replica"]}"}} {e["leituras"]}')
+
+
+def _admissao(linhas):
+    stats = admissao_stats()
+    compartimentos = stats["compartimentos"]
+
+    if compartimentos:
+        for nome, chave, tipo, ajuda in (
+            ("admission_limit", "limite", "gauge", "Vagas do compartimento"),
+            ("admission_in_flight", "em_uso", "gauge", "Requisições ocupando vaga"),
+            ("admission_queue_depth", "na_fila", "gauge", "Requisições esperando vaga"),
+            ("admission_admitted_total", "admitidas", "counter", "Requisições admitidas"),
+            ("admission_queued_total", "enfileiradas", "counter", "Requisições que esperaram na fila"),
+            ("admission_queue_wait_seconds_total", "espera_total_s", "counter", "Tempo total esperando vaga"),
+        ):
+            _metrica(linhas, nome, tipo, ajuda)
+            for c in compartimentos:
+                linhas.append(f'{nome}{{classe="{c["classe"]}"}} {c[chave]}')
+
+        _metrica(linhas, "admission_rejected_total", "counter", "Requisições recusadas com 503 (fila cheia ou timeout)")
+        for c in compartimentos:
+            for motivo, n in c["rejeitadas"].items():
+                linhas.append(f'admission_rejected_total{{classe="{c["classe"]}",motivo="{motivo}"}} {n}')
+
+    if stats["rate_limit"] is not None:
+        _metrica(linhas, "rate_limited_total", "counter", "Requisições recusadas com 429 pelo limite por cliente")
+        for classe, n in stats["rate_limit"]["limitadas"].items():
+            linhas.append(f'rate_limited_total{{classe="{classe}"}} {n}')
+        _metrica(linhas, "rate_limit_clients", "gauge", "Clientes com balde de fichas")
+        linhas.append(f'rate_limit_clients {stats["rate_limit"]["clientes"]}')
+
+
+def _pools(linhas):
+    pools = _estatisticas_pools()
+    if not pools:
+        return
+
+    for nome, chave, tipo, ajuda in (
+        ("db_pool_size", "size", "gauge", "Conexões abertas"),
+        ("db_pool_max_size", "max_size", "gauge", "Máximo de conexões"),
+        ("db_pool_in_use", "in_use", "gauge", "Conexões emprestadas"),
+        ("db_pool_idle", "idle", "gauge", "Conexões ociosas"),
+        ("db_pool_waiting", "waiting", "gauge", "Requisições esperando uma conexão"),
+        ("db_pool_checkouts_total", "checkouts", "counter", "Conexões entregues"),
+        ("db_pool_checkout_timeouts_total", "timeouts", "counter", "Esperas que estouraram o timeout"),
+        ("db_pool_checkout_wait_seconds_total", "wait_total", "counter", "Tempo total esperando uma conexão"),
+    ):
+        _metrica(linhas, nome, tipo, ajuda)
+        for pool, stats in pools:
+            linhas.append(f'{nome}{{pool="{pool}"}} {stats[chave]}')
@@ -0,0 +1,80 @@
+import base64
+import binascii
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Response
+from core import settings
+
+
+# 🔹 Paginação por keyset (id > último id visto)
+#
+# A listagem é sempre ordenada por id, então o cursor só precisa carregar o
+# último id da página: inserções concorrentes (ids maiores) aparecem no fim,
+# sem duplicar nem pular registros entre páginas. O cursor é opaco para o
+# cliente, que deve apenas repassar o valor recebido em X-Next-Cursor.
+# Listagens com outra ordem (ex.: busca por relevância) guardam no cursor os
+# demais valores da chave, além do id.
+def encode_cursor(last_id, **chave):
+    raw = json.dumps({"id": last_id, **chave}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor_dados(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = data["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+    return data
+
+
+def decode_cursor(cursor):
+    return decode_cursor_dados(cursor)["id"]
+
+
+class Page:
+    def __init__(self, request: Request, after_id: Optional[int], limit: int, chave=None):
+        self.request = request
+        self.after_id = after_id
+        self.limit = limit
+        # Conteúdo do cursor recebido ({} sem cursor)
+        self.chave = chave or {}
+
+    # Busca-se limit + 1 linhas: a sobra indica que existe próxima página
+    @property
+    def fetch_limit(self):
+        return self.limit + 1
+
+    # `chave`: colunas além do id que entram no cursor
+    def finish(self, rows, response: Response, id_key="id", chave=()):
+        if len(rows) <= self.limit:
+            return rows
+
+        rows = rows[:self.limit]
+        self.set_next(rows[-1][id_key], response, **{nome: rows[-1][nome] for nome in chave})
+        return rows
+
+    def set_next(self, last_id, response: Response, **chave):
+        cursor = encode_cursor(last_id, **chave)
+        next_url = self.request.url.remove_query_params(["after_id", "cursor"]).include_query_params(cursor=cursor)
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+
+# 🔹 Dependência com os parâmetros de paginação comuns às listagens
+def page_params(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Cursor opaco devolvido no header X-Next-Cursor"),
+    after_id: Optional[int] = Query(None, description="Retorna apenas registros com id maior que este"),
+    limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.PAGE_MAX_LIMIT,
+                       description="Tamanho da página"),
+) -> Page:
+    chave = None
+    if cursor:
+        chave = decode_cursor_dados(cursor)
+        after_id = chave["id"]
+    return Page(request, after_id, limit, chave)
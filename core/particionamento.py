@@ -0,0 +1,68 @@
+import logging
+
+import psycopg2
+
+from core import settings
+from core.db import get_pool
+from core.pool import PoolTimeout
+
+logger = logging.getLogger("sistema_financeiro.particionamento")
+
+
+# 🔹 Buscas por id com as tabelas particionadas
+#
+# Depois de database/particionamento.sql, as chaves primárias são (id, data)
+# e (id, transacao_id): um filtro só por id passa pelo índice de cada
+# partição. transacao_chave / pagamento_chave (tabelas mantidas por triggers)
+# dão a chave de partição de cada id, e com ela o PostgreSQL lê uma partição
+# só. Sem particionamento (o padrão) as consultas ficam só com o id, sem a
+# ida a mais à chave. A escolha vem de settings.DB_PARTICIONADO, fixada na
+# subida da aplicação.
+SQL_PARTICIONADO = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('transacao')
+    ) AS particionado
+"""
+
+
+# Chamado no lifespan. Com DB_PARTICIONADO=auto, consulta o catálogo uma vez;
+# sem banco na subida fica desligado (só por id funciona nos dois esquemas)
+def iniciar_particionamento():
+    if settings.DB_PARTICIONADO is not None:
+        return
+    try:
+        with get_pool().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_PARTICIONADO)
+            settings.DB_PARTICIONADO = cursor.fetchone()["particionado"]
+            cursor.close()
+            conn.rollback()
+    except (psycopg2.Error, PoolTimeout) as erro:
+        logger.warning("não foi possível verificar o particionamento: %s", str(erro).strip())
+        settings.DB_PARTICIONADO = False
+
+
+# (filtro sobre "transacao t", parâmetros) para um id
+def transacao_por_id(id):
+    if settings.DB_PARTICIONADO:
+        return "t.id = %s AND t.data = (SELECT data FROM transacao_chave WHERE id = %s)", (id, id)
+    return "t.id = %s", (id,)
+
+
+# (filtro sobre "pagamento p", parâmetros) para um id
+def pagamento_por_id(id):
+    if settings.DB_PARTICIONADO:
+        return "p.id = %s AND p.transacao_id = (SELECT transacao_id FROM pagamento_chave WHERE id = %s)", (id, id)
+    return "p.id = %s", (id,)
+
+
+# JOIN de "pagamento p" com a sua "transacao t" para listas de pagamentos
+# escolhidos por id (listagem, status em lote por ids): particionada, a data
+# de transacao_chave leva cada linha só à partição da transação
+def join_transacao(tipo="LEFT"):
+    if settings.DB_PARTICIONADO:
+        return (
+            f"{tipo} JOIN transacao_chave tc ON tc.id = p.transacao_id\n"
+            f"    {tipo} JOIN transacao t ON t.id = tc.id AND t.data = tc.data"
+        )
+    return f"{tipo} JOIN transacao t ON t.id = p.transacao_id"
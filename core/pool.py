@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from core import settings
+
+
+# 🔹 Parâmetros de sessão aplicados na abertura de cada conexão dos pools
+# (argumento "options" do libpq, vale para psycopg2 e psycopg 3): sem ida
+# extra ao servidor e sem depender de ALTER ROLE no banco. Os comandos de
+# manutenção (create_table.py) pedem sem_timeouts=True: DDL, reconstrução de
+# saldo_diario e particionamento levam o tempo que a base pedir
+def opcoes_sessao(sem_timeouts=False):
+    opcoes = {
+        "statement_timeout": settings.DB_STATEMENT_TIMEOUT_MS,
+        "idle_in_transaction_session_timeout": settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS,
+    }
+    if sem_timeouts:
+        opcoes = dict.fromkeys(opcoes, 0)
+    return " ".join(f"-c {nome}={int(valor)}" for nome, valor in opcoes.items())
+
+
+def parametros_conexao(sem_timeouts=False):
+    return {"options": opcoes_sessao(sem_timeouts), "application_name": settings.DB_APPLICATION_NAME}
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão ficou disponível dentro do tempo de checkout."""
+
+
+# 🔹 Pool de conexões compartilhado pelo processo (thread-safe)
+#
+# As rotas síncronas do FastAPI rodam no threadpool, então várias threads
+# disputam o pool ao mesmo tempo. Conexões ociosas ficam numa pilha (LIFO)
+# para reaproveitar sempre as mais "quentes" e deixar as demais expirarem.
+class ConnectionPool:
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, timeout=30.0,
+                 max_lifetime=3600.0, health_check_after=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamanhos de pool inválidos")
+
+        self.connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()          # (conn, criada_em, devolvida_em)
+        self._created_at = {}         # id(conn) -> criada_em
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "checkout_timeouts": 0,
+            "checkout_wait_total_ms": 0.0,
+            "checkout_wait_max_ms": 0.0,
+            "health_check_failures": 0,
+        }
+
+        for _ in range(min_size):
+            self._size += 1
+            conn = self._connect()
+            self._idle.append((conn, self._created_at[id(conn)], time.monotonic()))
+
+    # -----------------------------
+    # Criação / descarte
+    # -----------------------------
+    # A vaga em self._size já deve ter sido reservada por quem chama
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        now = time.monotonic()
+        with self._cond:
+            self._created_at[id(conn)] = now
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            if self._created_at.pop(id(conn), None) is not None:
+                self._size -= 1
+                self._stats["connections_discarded"] += 1
+            self._cond.notify()
+
+    def _expired(self, created_at):
+        return self.max_lifetime and time.monotonic() - created_at > self.max_lifetime
+
+    def _healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        # Só faz round trip se a conexão ficou parada tempo suficiente para
+        # o servidor (ou um firewall no caminho) ter derrubado a sessão
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        # Cursor simples, sem a instrumentação da conexão: a verificação não
+        # entra nas consultas / tempo de banco da requisição
+        try:
+            cursor = conn.cursor(cursor_factory=extensions.cursor)
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # -----------------------------
+    # Checkout / devolução
+    # -----------------------------
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        while True:
+            candidate = None
+            create = False
+
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Pool de conexões fechado")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["checkout_timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Nenhuma conexão disponível após {self.timeout}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    # Reserva a vaga antes de soltar o lock
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                break
+
+            conn, created_at, returned_at = candidate
+            if self._expired(created_at):
+                self._discard(conn)
+                continue
+            if not self._healthy(conn, returned_at):
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                self._discard(conn)
+                continue
+            break
+
+        waited_ms = (time.monotonic() - start) * 1000
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_wait_total_ms"] += waited_ms
+            if waited_ms > self._stats["checkout_wait_max_ms"]:
+                self._stats["checkout_wait_max_ms"] = waited_ms
+        return conn
+
+    def putconn(self, conn):
+        if conn.closed:
+            self._discard(conn)
+            return
+
+        # Reset: nenhuma transação aberta (nem SET LOCAL) vaza para o próximo uso
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            created_at = self._created_at.get(id(conn))
+            if self._closed or created_at is None or self._expired(created_at):
+                discard = True
+            else:
+                discard = False
+                self._idle.append((conn, created_at, time.monotonic()))
+                self._cond.notify()
+
+        if discard:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    # -----------------------------
+    # Estatísticas
+    # -----------------------------
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+            })
+        checkouts = data["checkouts"]
+        data["checkout_wait_avg_ms"] = (
+            data["checkout_wait_total_ms"] / checkouts if checkouts else 0.0
+        )
+        return data
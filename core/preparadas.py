@@ -0,0 +1,83 @@
+import re
+from collections import OrderedDict
+
+import psycopg2
+from psycopg2 import extensions
+
+from core import settings
+
+
+# 🔹 Prepared statements no servidor (psycopg2)
+#
+# O psycopg2 manda o SQL completo, com os parâmetros já interpolados, a cada
+# execução: o PostgreSQL faz parse e planejamento de novo toda vez. Para as
+# consultas quentes (busca por id), cursor.execute_prepared() faz PREPARE na
+# primeira vez em cada conexão e EXECUTE nas seguintes. O parse fica pronto
+# e, depois de cinco execuções, o servidor adota o plano genérico
+# (plan_cache_mode = auto) quando ele custa o mesmo que os específicos, como
+# nas buscas por chave primária: o planejamento deixa de acontecer.
+#
+# As conexões dos pools são criadas com ConexaoPreparada (connection_factory),
+# que guarda SQL -> nome da preparada num LRU de até DB_PREPARED_MAX entradas
+# (a mais antiga leva DEALLOCATE). Conexão nova (reconexão, reciclagem do
+# pool) começa com o cache vazio e prepara de novo no primeiro uso.
+# A camada assíncrona usa o prepare nativo do psycopg 3 (core/async_db.py).
+class ConexaoPreparada(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = OrderedDict()
+        self._sequencia = 0
+
+    def _novo_nome(self):
+        self._sequencia += 1
+        return f"sf_{self._sequencia}"
+
+
+_PLACEHOLDER = re.compile(r"%([%s])")
+
+
+# "%s" -> $1, $2, ... (e "%%" -> "%"), na ordem em que aparecem
+def posicional(sql):
+    contador = iter(range(1, sql.count("%s") + 1))
+    return _PLACEHOLDER.sub(lambda m: "%" if m.group(1) == "%" else f"${next(contador)}", sql)
+
+
+def _executar(conn, execute, sql, params):
+    preparadas = conn.preparadas
+    nome = preparadas.get(sql)
+    if nome is None:
+        nome = conn._novo_nome()
+        execute(f"PREPARE {nome} AS {posicional(sql)}")
+        preparadas[sql] = nome
+        if len(preparadas) > settings.DB_PREPARED_MAX:
+            _, antiga = preparadas.popitem(last=False)
+            execute(f"DEALLOCATE {antiga}")
+    else:
+        preparadas.move_to_end(sql)
+
+    if params:
+        return execute(f"EXECUTE {nome} ({', '.join(['%s'] * len(params))})", params)
+    return execute(f"EXECUTE {nome}")
+
+
+# `execute` é o execute "cru" do cursor (sem instrumentação); quem chama
+# registra a consulta com o SQL original
+def executar_preparada(cursor, execute, sql, params=None):
+    conn = cursor.connection
+    if not settings.DB_PREPARED_STATEMENTS or not isinstance(conn, ConexaoPreparada):
+        return execute(sql, params)
+
+    # PREPARE vale para a sessão e não é desfeito por ROLLBACK, então o cache
+    # só fica errado se alguém der DEALLOCATE / DISCARD ALL na conexão (ou
+    # com um pooler em modo transação na frente). Nesse caso o cache é
+    # descartado e a consulta preparada de novo, desde que a transação tenha
+    # sido aberta por este comando (desfazê-la não perde nada)
+    livre = conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+    try:
+        return _executar(conn, execute, sql, params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        conn.preparadas.clear()
+        if not livre:
+            raise
+        conn.rollback()
+        return _executar(conn, execute, sql, params)
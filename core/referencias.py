@@ -0,0 +1,46 @@
+from core import settings
+from core.cache import TTLCache
+
+
+# 🔹 Cache de conta / categoria / pessoa usado na validação das escritas
+#
+# São tabelas pequenas e que mudam pouco, mas toda escrita de transação
+# confere se as referências existem e estão ativas. O cache guarda id -> ativo
+# (só de registros existentes) e é alimentado pelas próprias escritas: a
+# instrução com os CTEs de validação devolve o ativo de cada referência, e a
+# importação em lote consulta só os ids que faltam. As rotas de update /
+# desativar / delete das entidades chamam invalidar().
+ENTIDADES = ("conta", "categoria", "pessoa")
+
+CACHES = {
+    entidade: TTLCache(maxsize=settings.REFERENCIA_CACHE_MAXSIZE, ttl=settings.REFERENCIA_CACHE_TTL)
+    for entidade in ENTIDADES
+}
+
+
+# True / False se o registro está no cache, None se não está
+def ativo(entidade, id):
+    return CACHES[entidade].get(id)
+
+
+# {id: ativo} dos ids encontrados no cache
+def ativos(entidade, ids):
+    cache = CACHES[entidade]
+    encontrados = {}
+    for id in ids:
+        valor = cache.get(id)
+        if valor is not None:
+            encontrados[id] = valor
+    return encontrados
+
+
+def guardar(entidade, id, ativo):
+    CACHES[entidade].set(id, bool(ativo))
+
+
+def invalidar(entidade, id):
+    CACHES[entidade].invalidate(id)
+
+
+def cache_stats():
+    return {entidade: cache.stats() for entidade, cache in CACHES.items()}
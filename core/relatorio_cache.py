@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from urllib.parse import parse_qsl, urlencode
+
+from core import settings
+from core.cache import TTLCache
+from core.replicas import le_do_primario
+from core.requisicao import METODOS_LEITURA
+
+
+# 🔹 Cache de resposta dos relatórios + ETag / If-None-Match
+#
+# Os dashboards consultam /relatorios/* a cada poucos segundos com os mesmos
+# parâmetros. A resposta fica em cache por rota + query string normalizada +
+# versão dos dados; qualquer escrita bem-sucedida em transações, pagamentos,
+# categorias, contas ou pessoas incrementa a versão e as entradas antigas deixam de ser
+# usadas. A versão é do processo: em outro worker a resposta antiga dura no
+# máximo RELATORIO_CACHE_TTL segundos.
+#
+# Com réplicas de leitura, quem acabou de escrever (cookie de
+# core/replicas.py) não usa o cache: a entrada da versão nova pode ter sido
+# calculada numa réplica que ainda não recebeu a escrita.
+PREFIXO_RELATORIOS = "/relatorios/"
+PREFIXOS_DADOS = ("/transacoes", "/pagamentos", "/categorias", "/contas", "/pessoas")
+
+CACHE = TTLCache(maxsize=settings.RELATORIO_CACHE_MAXSIZE, ttl=settings.RELATORIO_CACHE_TTL)
+
+_versao = 0
+_versao_lock = threading.Lock()
+
+
+def versao_dados():
+    return _versao
+
+
+def incrementar_versao():
+    global _versao
+    with _versao_lock:
+        _versao += 1
+
+
+def chave(path, query_string):
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return (path, urlencode(params), versao_dados())
+
+
+def calcular_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_confere(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for valor in if_none_match.split(","):
+        valor = valor.strip()
+        if valor.startswith("W/"):
+            valor = valor[2:]
+        if valor == "*" or valor == etag:
+            return True
+    return False
+
+
+def cache_stats():
+    return {**CACHE.stats(), "versao": versao_dados()}
+
+
+class RelatorioCacheMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+
+        if method == "GET" and path.startswith(PREFIXO_RELATORIOS):
+            if le_do_primario(scope["headers"]):
+                await self.app(scope, receive, send)
+            else:
+                await self._relatorio(scope, receive, send)
+        elif method not in METODOS_LEITURA and path.startswith(PREFIXOS_DADOS):
+            await self._escrita(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    # -----------------------------
+    # Escritas: incrementa a versão antes de responder ao cliente
+    # -----------------------------
+    async def _escrita(self, scope, receive, send):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                incrementar_versao()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            # não dá para saber se houve commit antes do erro
+            incrementar_versao()
+            raise
+
+    # -----------------------------
+    # Relatórios: serve do cache ou executa a rota e guarda a resposta
+    # -----------------------------
+    async def _relatorio(self, scope, receive, send):
+        key = chave(scope["path"], scope["query_string"])
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        entry = CACHE.get(key)
+        if entry is not None:
+            await self._responder(entry, if_none_match, b"HIT", send)
+            return
+
+        messages = []
+
+        async def send_wrapper(message):
+            messages.append(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        start = messages[0]
+        if start["status"] != 200:
+            for message in messages:
+                await send(message)
+            return
+
+        body = b"".join(m.get("body", b"") for m in messages[1:])
+        headers = [(n, v) for n, v in start["headers"] if n != b"content-length"]
+        entry = (headers, body, calcular_etag(body))
+        CACHE.set(key, entry)
+
+        await self._responder(entry, if_none_match, b"MISS", send)
+
+    async def _responder(self, entry, if_none_match, status_cache, send):
+        headers, body, etag = entry
+        extra = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", b"no-cache"),
+            (b"x-cache", status_cache),
+        ]
+
+        if etag_confere(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": extra})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": headers + extra + [(b"content-length", str(len(body)).encode("latin-1"))],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,264 @@
+import itertools
+import logging
+import threading
+import time
+from http.cookies import SimpleCookie
+
+import psycopg2
+from psycopg2.extensions import parse_dsn
+
+from core import settings
+from core.instrumentacao import InstrumentedCursor
+from core.pool import ConnectionPool, parametros_conexao
+from core.preparadas import ConexaoPreparada
+from core.requisicao import METODOS_LEITURA
+
+
+# 🔹 Réplicas de leitura
+#
+# Com settings.DB_REPLICAS preenchido, as rotas GET (listagens, consultas por
+# id, busca, exportação e relatórios) usam get_read_db, que escolhe uma
+# réplica saudável em rodízio; escritas continuam em get_db (primário). Uma
+# thread verifica cada réplica a cada DB_REPLICA_CHECK_INTERVAL segundos
+# (conexão + atraso de replicação) e tira do rodízio as que falharem ou
+# passarem de DB_REPLICA_MAX_LAG. Sem réplica disponível, a leitura vai para
+# o primário.
+#
+# Leitura das próprias escritas: toda escrita bem-sucedida devolve o cookie
+# COOKIE_PRIMARIO, válido por DB_READ_YOUR_WRITES segundos; enquanto ele
+# existir, as leituras daquele cliente também vão para o primário.
+logger = logging.getLogger("sistema_financeiro.replicas")
+
+COOKIE_PRIMARIO = "sf_primario"
+
+# Réplica conectada ao primário e com tudo o que recebeu já aplicado =
+# atraso 0 (com o primário parado de escrever, o tempo desde a última
+# transação só cresce, sem que a réplica esteja atrasada). Do contrário, o
+# tempo desde a última transação aplicada. Ler o status de
+# pg_stat_wal_receiver exige pg_read_all_stats (ou pg_monitor); sem ele vale
+# sempre a segunda regra. Um servidor fora de recuperação (réplica promovida)
+# conta como atraso 0.
+SQL_ATRASO = """
+    SELECT
+        pg_is_in_recovery() AS em_recuperacao,
+        CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming')
+                 AND pg_last_wal_receive_lsn() <= pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END::float8 AS atraso
+"""
+
+
+def _config(dsn):
+    config = {
+        "host": settings.DB_HOST,
+        "dbname": settings.DB_NAME,
+        "user": settings.DB_USER,
+        "password": settings.DB_PASSWORD,
+        "port": settings.DB_PORT,
+        **parametros_conexao(),
+    }
+    config.update(parse_dsn(dsn))
+    config["connect_timeout"] = settings.DB_REPLICA_CONNECT_TIMEOUT
+    return config
+
+
+class Replica:
+    def __init__(self, dsn):
+        self.config = _config(dsn)
+        self.nome = f"{self.config['host']}:{self.config['port']}"
+        self.saudavel = False           # até a primeira verificação
+        self.em_recuperacao = None
+        self.atraso = None
+        self.erro = None
+        self.verificada_em = None
+        self.falhas = 0
+        self.leituras = 0
+        self._conn = None               # conexão própria da verificação
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    # Pool síncrono criado no primeiro uso; min_size=0 para não conectar (e
+    # falhar) na criação quando a réplica está fora
+    def pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        {**self.config, "connection_factory": ConexaoPreparada, "cursor_factory": InstrumentedCursor},
+                        min_size=0,
+                        max_size=settings.DB_POOL_MAX_SIZE,
+                        timeout=settings.DB_POOL_TIMEOUT,
+                        max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                        health_check_after=settings.DB_POOL_HEALTH_CHECK_AFTER,
+                    )
+        return self._pool
+
+    def verificar(self):
+        try:
+            if self._conn is None or self._conn.closed:
+                self._conn = psycopg2.connect(**self.config)
+                self._conn.autocommit = True
+            cursor = self._conn.cursor()
+            cursor.execute(SQL_ATRASO)
+            self.em_recuperacao, self.atraso = cursor.fetchone()
+            cursor.close()
+        except psycopg2.Error as e:
+            self._fechar_conexao()
+            self.marcar_falha(e)
+            return
+
+        self.verificada_em = time.time()
+        self.erro = None
+        limite = settings.DB_REPLICA_MAX_LAG
+        saudavel = limite is None or (self.atraso is not None and self.atraso <= limite)
+        if saudavel != self.saudavel:
+            logger.warning("réplica %s %s (atraso %.1fs)", self.nome,
+                           "voltou ao rodízio" if saudavel else "fora do rodízio por atraso",
+                           self.atraso if self.atraso is not None else float("nan"))
+        self.saudavel = saudavel
+
+    # Também chamada pelas rotas quando não conseguem conectar: a réplica sai
+    # do rodízio na hora, sem esperar a próxima verificação. O pool é
+    # descartado junto, para que as conexões ociosas (mortas se a réplica
+    # caiu) não sejam entregues quando ela voltar ao rodízio
+    def marcar_falha(self, erro):
+        if self.saudavel or self.verificada_em is None:
+            logger.warning("réplica %s fora do rodízio: %s", self.nome, str(erro).strip())
+        self.saudavel = False
+        self.falhas += 1
+        self.erro = str(erro).strip()
+        self.verificada_em = time.time()
+        self._descartar_pool()
+
+    def _descartar_pool(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def _fechar_conexao(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def fechar(self):
+        self._fechar_conexao()
+        self._descartar_pool()
+
+    def stats(self):
+        return {
+            "replica": self.nome,
+            "saudavel": self.saudavel,
+            "em_recuperacao": self.em_recuperacao,
+            "atraso_s": self.atraso,
+            "erro": self.erro,
+            "verificada_em": self.verificada_em,
+            "falhas": self.falhas,
+            "leituras": self.leituras,
+            "pool": self._pool.stats() if self._pool is not None else None,
+        }
+
+
+_replicas = [Replica(dsn) for dsn in settings.DB_REPLICAS]
+_rodizio = itertools.count()
+_parar = threading.Event()
+_thread = None
+
+
+def replicas():
+    return _replicas
+
+
+# Próxima réplica saudável do rodízio (None = usar o primário)
+def escolher_replica():
+    saudaveis = [r for r in _replicas if r.saudavel]
+    if not saudaveis:
+        return None
+    replica = saudaveis[next(_rodizio) % len(saudaveis)]
+    replica.leituras += 1
+    return replica
+
+
+def verificar_replicas():
+    for replica in _replicas:
+        replica.verificar()
+
+
+def _loop():
+    while not _parar.wait(settings.DB_REPLICA_CHECK_INTERVAL):
+        try:
+            verificar_replicas()
+        except Exception:
+            logger.exception("falha ao verificar as réplicas")
+
+
+# Chamado no lifespan: a primeira verificação acontece antes de a aplicação
+# aceitar requisições, então réplicas boas entram no rodízio desde o início
+def iniciar_replicas():
+    global _thread
+    if not _replicas or _thread is not None:
+        return
+    verificar_replicas()
+    _parar.clear()
+    _thread = threading.Thread(target=_loop, name="verificacao-replicas", daemon=True)
+    _thread.start()
+
+
+def parar_replicas():
+    global _thread
+    _parar.set()
+    if _thread is not None:
+        _thread.join(timeout=settings.DB_REPLICA_CHECK_INTERVAL + settings.DB_REPLICA_CONNECT_TIMEOUT)
+        _thread = None
+    for replica in _replicas:
+        replica.fechar()
+
+
+def replicas_stats():
+    return [replica.stats() for replica in _replicas]
+
+
+# -----------------------------
+# Leitura das próprias escritas
+# -----------------------------
+def le_do_primario(headers):
+    for nome, valor in headers:
+        if nome == b"cookie":
+            cookie = SimpleCookie()
+            try:
+                cookie.load(valor.decode("latin-1"))
+            except Exception:
+                continue
+            if COOKIE_PRIMARIO in cookie:
+                # O valor é o instante (epoch) até quando vale; o Max-Age já
+                # faz o navegador descartar, isto cobre clientes que não fazem
+                try:
+                    return float(cookie[COOKIE_PRIMARIO].value) > time.time()
+                except ValueError:
+                    return False
+    return False
+
+
+class LeituraPrimarioMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in METODOS_LEITURA:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                ate = time.time() + settings.DB_READ_YOUR_WRITES
+                valor = (f"{COOKIE_PRIMARIO}={ate:.0f}; Max-Age={settings.DB_READ_YOUR_WRITES}; "
+                         "Path=/; HttpOnly; SameSite=Lax")
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", valor.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
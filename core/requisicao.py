@@ -0,0 +1,5 @@
+# 🔹 Classificação das requisições compartilhada pelos middlewares (admissão,
+# réplicas de leitura e cache de relatórios)
+
+# Métodos que não alteram dados
+METODOS_LEITURA = ("GET", "HEAD", "OPTIONS")
@@ -0,0 +1,157 @@
+import json
+import types
+from datetime import datetime, timezone
+from typing import Literal, Union, get_args, get_origin
+
+from fastapi import Response
+from pydantic import BaseModel
+from core import settings
+
+
+# 🔹 Serialização rápida das listagens
+#
+# Com response_model, cada linha da listagem vira um dict, é validada pelo
+# schema (com os modelos aninhados) e depois convertida para JSON: três
+# passadas por linha, que dominam a CPU em páginas grandes. Aqui o schema é
+# compilado uma vez numa função que só reordena/converte os campos de cada
+# linha, seguida de um json.dumps da página inteira no mesmo formato do
+# JSONResponse do FastAPI: a saída é idêntica byte a byte à do caminho com
+# response_model (que continua documentando a rota no OpenAPI).
+#
+# Não há validação: os dados vêm do banco já com os tipos das colunas.
+def _datetime(valor):
+    # Mesmo formato do Pydantic: ISO 8601 e "Z" para UTC
+    texto = valor.isoformat()
+    if valor.tzinfo is not None and valor.utcoffset() == timezone.utc.utcoffset(None):
+        texto = texto[:-6] + "Z"
+    return texto
+
+
+def _lista(conversor):
+    def converter(valor):
+        return [None if v is None else conversor(v) for v in valor]
+    return converter
+
+
+# Conversor do valor (já sem None) para o tipo JSON; None = usar como está
+def _conversor(anotacao):
+    origem = get_origin(anotacao)
+
+    if origem in (Union, types.UnionType):
+        tipos = [t for t in get_args(anotacao) if t is not type(None)]
+        if len(tipos) != 1:
+            raise TypeError(f"Tipo sem serialização rápida: {anotacao!r}")
+        return _conversor(tipos[0])
+    if origem is list:
+        conversor = _conversor(get_args(anotacao)[0])
+        return _lista(conversor) if conversor else None
+    if origem is Literal:
+        return None
+    if anotacao is float:
+        return float
+    if anotacao is datetime:
+        return _datetime
+    if isinstance(anotacao, type) and issubclass(anotacao, BaseModel):
+        return compilar(anotacao)
+    if anotacao in (int, str, bool):
+        return None
+    raise TypeError(f"Tipo sem serialização rápida: {anotacao!r}")
+
+
+_compilados = {}
+
+
+# Gera uma função específica para o schema, com um literal de dict na ordem
+# dos campos, por exemplo para Conta:
+#   def serializar(item):
+#       return {'nome': item.get('nome', _p0),
+#               'saldo_inicial': None if (v1 := item.get('saldo_inicial', _p1)) is None else _c1(v1), ...}
+def compilar(model):
+    serializar = _compilados.get(model)
+    if serializar is not None:
+        return serializar
+
+    ambiente = {}
+    campos = []
+    for i, (nome, campo) in enumerate(model.model_fields.items()):
+        ambiente[f"_p{i}"] = None if campo.is_required() else campo.default
+        obter = f"item.get({nome!r}, _p{i})"
+        conversor = _conversor(campo.annotation)
+        if conversor is None:
+            campos.append(f"{nome!r}: {obter}")
+        else:
+            ambiente[f"_c{i}"] = conversor
+            campos.append(f"{nome!r}: None if (v{i} := {obter}) is None else _c{i}(v{i})")
+
+    codigo = "def serializar(item):\n    return {" + ", ".join(campos) + "}\n"
+    exec(compile(codigo, f"<serializar {model.__name__}>", "exec"), ambiente)
+
+    serializar = _compilados[model] = ambiente["serializar"]
+    return serializar
+
+
+def dumps(conteudo):
+    return json.dumps(
+        conteudo,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+# Resposta com o corpo pronto, levando os headers definidos no `response` da
+# rota (X-Next-Cursor / Link da paginação)
+def _resposta(corpo, response):
+    resposta = Response(corpo, media_type="application/json")
+    resposta.raw_headers.extend((n, v) for n, v in response.raw_headers if n != b"content-length")
+    return resposta
+
+
+# Com FAST_JSON_LISTS desligado devolve a lista como antes, para o FastAPI
+# validar pelo response_model
+def lista_json(model, itens, response):
+    if not settings.FAST_JSON_LISTS:
+        return itens
+
+    serializar = compilar(model)
+    return _resposta(dumps([serializar(item) for item in itens]), response)
+
+
+# -----------------------------
+# JSON montado no banco (DB_JSON_LISTS)
+# -----------------------------
+# row_to_json corta os zeros da fração de segundo (".5"), o Pydantic usa
+# sempre seis dígitos (".500000"); as colunas TIMESTAMP passam por aqui para
+# sair no mesmo formato
+def json_timestamp(coluna):
+    return (
+        f"CASE WHEN date_trunc('second', {coluna}) = {coluna}"
+        f" THEN to_char({coluna}, 'YYYY-MM-DD\"T\"HH24:MI:SS')"
+        f" ELSE to_char({coluna}, 'YYYY-MM-DD\"T\"HH24:MI:SS.US') END"
+    )
+
+
+# A consulta da listagem (ORDER BY id LIMIT limit + 1) precisa devolver as
+# colunas `id` e `json`, com o objeto de cada linha já montado por
+# row_to_json (compacto e na ordem do schema). Por fora, string_agg junta a
+# página num texto só e o próprio banco informa se há próxima página e o
+# último id, então a aplicação não olha linha por linha.
+def build_pagina_json_query(query, params, limit):
+    pagina = f"""
+        SELECT
+            '[' || COALESCE(string_agg(json, ',' ORDER BY id) FILTER (WHERE n <= %s), '') || ']' AS corpo,
+            COUNT(*) > %s AS tem_mais,
+            MAX(id) FILTER (WHERE n <= %s) AS ultimo_id
+        FROM (
+            SELECT id, json, row_number() OVER (ORDER BY id) AS n
+            FROM ({query}) linhas
+        ) pagina
+    """
+    return pagina, (limit, limit, limit) + tuple(params or ())
+
+
+def pagina_json(row, page, response):
+    if row["tem_mais"]:
+        page.set_next(row["ultimo_id"], response)
+    return _resposta(row["corpo"].encode("utf-8"), response)
@@ -1,5 +1,198 @@
-DB_HOST = "localhost"
-DB_PORT = 5432
-DB_USER = "postgres"
-DB_PASSWORD = "postgres"
-DB_NAME = "sistema_financeiro_simplificado"
+import os
+
+from dotenv import load_dotenv
+
+
+# 🔹 Configurações
+#
+# Cada constante abaixo pode ser trocada por uma variável de ambiente de
+# mesmo nome (DB_HOST, DB_POOL_MAX_SIZE, ...) ou pelo arquivo .env na raiz do
+# projeto; o ambiente tem prioridade sobre o .env, que tem prioridade sobre o
+# padrão daqui. Os valores são convertidos para o tipo do padrão na carga do
+# módulo, e um valor inválido impede a aplicação de subir.
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+
+def _valor(nome, padrao, converter, esperado):
+    texto = os.environ.get(nome)
+    if texto is None or texto.strip() == "":
+        return padrao
+    try:
+        return converter(texto.strip())
+    except ValueError:
+        raise ValueError(f"{nome}={texto!r}: esperado {esperado}") from None
+
+
+def _str(nome, padrao):
+    return os.environ.get(nome, padrao)
+
+
+def _int(nome, padrao):
+    return _valor(nome, padrao, int, "um inteiro")
+
+
+def _float(nome, padrao):
+    return _valor(nome, padrao, float, "um número")
+
+
+# "none" / "off" = None (desliga o limite)
+def _float_ou_none(nome, padrao):
+    def converter(texto):
+        return None if texto.lower() in ("none", "off") else float(texto)
+    return _valor(nome, padrao, converter, "um número ou none")
+
+
+def _texto_bool(texto):
+    texto = texto.lower()
+    if texto in ("1", "true", "yes", "on", "sim"):
+        return True
+    if texto in ("0", "false", "no", "off", "nao", "não"):
+        return False
+    raise ValueError(texto)
+
+
+def _bool(nome, padrao):
+    return _valor(nome, padrao, _texto_bool, "true ou false")
+
+
+# "auto" = None (decidido na subida da aplicação)
+def _bool_ou_auto(nome, padrao):
+    def converter(texto):
+        return None if texto.lower() == "auto" else _texto_bool(texto)
+    return _valor(nome, padrao, converter, "true, false ou auto")
+
+
+# Itens separados por ";" (DSNs do libpq têm espaços e podem ter vírgulas)
+def _lista(nome, padrao):
+    def converter(texto):
+        return [item.strip() for item in texto.split(";") if item.strip()]
+    return _valor(nome, padrao, converter, "itens separados por ;")
+
+
+DB_HOST = _str("DB_HOST", "localhost")
+DB_PORT = _int("DB_PORT", 5432)
+DB_USER = _str("DB_USER", "postgres")
+DB_PASSWORD = _str("DB_PASSWORD", "postgres")
+DB_NAME = _str("DB_NAME", "sistema_financeiro_simplificado")
+
+# Servidor ao rodar com `python main.py`. Cada worker tem os seus pools,
+# então o PostgreSQL recebe até WORKERS x DB_POOL_MAX_SIZE conexões (mais
+# DB_ASYNC_POOL_MAX_SIZE com DB_ASYNC, e o mesmo em cada réplica)
+API_HOST = _str("API_HOST", "127.0.0.1")
+API_PORT = _int("API_PORT", 8000)
+WORKERS = _int("WORKERS", 1)
+
+# Pool de conexões (compartilhado por get_db e DataBase)
+DB_POOL_MIN_SIZE = _int("DB_POOL_MIN_SIZE", 1)
+DB_POOL_MAX_SIZE = _int("DB_POOL_MAX_SIZE", 10)
+DB_POOL_TIMEOUT = _float("DB_POOL_TIMEOUT", 30.0)  # segundos esperando uma conexão livre
+DB_POOL_MAX_LIFETIME = _float("DB_POOL_MAX_LIFETIME", 3600.0)  # segundos até reciclar a conexão
+DB_POOL_HEALTH_CHECK_AFTER = _float("DB_POOL_HEALTH_CHECK_AFTER", 30.0)  # ociosa há mais que isso -> SELECT 1 no checkout
+
+# Aplicados a cada conexão dos pools (primário e réplicas) via "options" do
+# libpq, em milissegundos; 0 desativa. statement_timeout derruba consultas
+# que passam do limite e idle_in_transaction_session_timeout encerra a sessão
+# que ficou com uma transação aberta sem fazer nada
+DB_STATEMENT_TIMEOUT_MS = _int("DB_STATEMENT_TIMEOUT_MS", 30000)
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = _int("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", 60000)
+DB_APPLICATION_NAME = _str("DB_APPLICATION_NAME", "sistema_financeiro")   # aparece em pg_stat_activity
+
+# Prepared statements no servidor para as consultas quentes (busca por id):
+# PREPARE na primeira execução em cada conexão, até DB_PREPARED_MAX por
+# conexão (LRU). Desligar com um pooler em modo transação (PgBouncer) na frente
+DB_PREPARED_STATEMENTS = _bool("DB_PREPARED_STATEMENTS", True)
+DB_PREPARED_MAX = _int("DB_PREPARED_MAX", 100)
+
+# transacao / pagamento particionadas (database/particionamento.sql): as
+# buscas por id e o JOIN das listagens de pagamentos passam pela chave de
+# partição (core/particionamento.py). "auto" consulta o catálogo na subida
+DB_PARTICIONADO = _bool_ou_auto("DB_PARTICIONADO", None)
+
+# Timeouts próprios (ms) das rotas pesadas, só na transação da requisição; a
+# consulta também é cancelada se o cliente desconectar. Estourou -> 504 com
+# Retry-After de QUERY_TIMEOUT_RETRY_AFTER segundos
+RELATORIO_STATEMENT_TIMEOUT_MS = _int("RELATORIO_STATEMENT_TIMEOUT_MS", 15000)
+BUSCA_STATEMENT_TIMEOUT_MS = _int("BUSCA_STATEMENT_TIMEOUT_MS", 5000)
+QUERY_TIMEOUT_RETRY_AFTER = _int("QUERY_TIMEOUT_RETRY_AFTER", 30)
+
+# Orçamentos (ms) da exportação em streaming e da importação em lote, também
+# só na transação da requisição. Na exportação o statement_timeout vale para
+# cada ida ao servidor (FETCH) e EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS é a
+# pausa tolerada entre lotes enquanto o cliente lê o que já recebeu
+EXPORT_STATEMENT_TIMEOUT_MS = _int("EXPORT_STATEMENT_TIMEOUT_MS", 300000)
+EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS = _int("EXPORT_IDLE_IN_TRANSACTION_TIMEOUT_MS", 600000)
+BULK_STATEMENT_TIMEOUT_MS = _int("BULK_STATEMENT_TIMEOUT_MS", 300000)
+
+# Camada assíncrona (psycopg 3): quando True, as rotas de transações,
+# pagamentos e relatórios rodam no event loop em vez do threadpool
+DB_ASYNC = _bool("DB_ASYNC", False)
+DB_ASYNC_POOL_MAX_SIZE = _int("DB_ASYNC_POOL_MAX_SIZE", 20)
+
+# Réplicas de leitura (streaming replication), como DSNs do libpq; o que não
+# for informado (usuário, senha, banco) vem do primário acima. Com a lista
+# vazia tudo vai para o primário. No ambiente, separadas por ";":
+# DB_REPLICAS="host=replica1 port=5432;host=replica2"
+DB_REPLICAS = _lista("DB_REPLICAS", [])
+DB_REPLICA_CHECK_INTERVAL = _float("DB_REPLICA_CHECK_INTERVAL", 5.0)  # segundos entre verificações de saúde / atraso
+DB_REPLICA_MAX_LAG = _float_ou_none("DB_REPLICA_MAX_LAG", 10.0)  # segundos; réplica mais atrasada sai do rodízio (None desliga)
+DB_REPLICA_CONNECT_TIMEOUT = _int("DB_REPLICA_CONNECT_TIMEOUT", 2)  # segundos para conectar numa réplica
+DB_READ_YOUR_WRITES = _int("DB_READ_YOUR_WRITES", 15)  # segundos lendo do primário depois de uma escrita (cookie)
+
+# Controle de admissão (core/admissao.py): requisições simultâneas por classe
+# de rota em cada worker (0 = sem limite para a classe). Acima disso esperam
+# numa fila de até ADMISSAO_FILA_MAX requisições por no máximo
+# ADMISSAO_FILA_TIMEOUT segundos; fila cheia ou espera estourada -> 503
+ADMISSAO_LIMITE_ESCRITA = _int("ADMISSAO_LIMITE_ESCRITA", 8)
+ADMISSAO_LIMITE_LEITURA = _int("ADMISSAO_LIMITE_LEITURA", 16)
+ADMISSAO_LIMITE_RELATORIO = _int("ADMISSAO_LIMITE_RELATORIO", 3)     # relatórios e exportação
+ADMISSAO_FILA_MAX = _int("ADMISSAO_FILA_MAX", 100)
+ADMISSAO_FILA_TIMEOUT = _float("ADMISSAO_FILA_TIMEOUT", 10.0)
+
+# Limite por cliente (token bucket por worker): RATE_LIMIT_POR_SEGUNDO
+# requisições por segundo, com rajadas de até RATE_LIMIT_RAJADA (0 desliga).
+# O cliente é o valor de RATE_LIMIT_HEADER ou, sem o header, o IP
+RATE_LIMIT_POR_SEGUNDO = _float("RATE_LIMIT_POR_SEGUNDO", 0.0)
+RATE_LIMIT_RAJADA = _int("RATE_LIMIT_RAJADA", 20)
+RATE_LIMIT_CUSTO_RELATORIO = _int("RATE_LIMIT_CUSTO_RELATORIO", 5)   # fichas por relatório / exportação
+RATE_LIMIT_HEADER = _str("RATE_LIMIT_HEADER", "X-API-Key")          # "" = só o IP
+RATE_LIMIT_MAX_CLIENTES = _int("RATE_LIMIT_MAX_CLIENTES", 10000)     # baldes guardados (LRU)
+
+# Paginação das listagens (keyset por id)
+PAGE_DEFAULT_LIMIT = _int("PAGE_DEFAULT_LIMIT", 100)
+PAGE_MAX_LIMIT = _int("PAGE_MAX_LIMIT", 1000)
+
+# Listagens serializadas direto das linhas (core/serializacao.py), sem passar
+# pela validação do response_model; a saída é a mesma
+FAST_JSON_LISTS = _bool("FAST_JSON_LISTS", True)
+
+# Listagens de transações e pagamentos com o JSON montado pelo PostgreSQL
+# (row_to_json); mesmo conteúdo, mas números sem o ".0" do Python (100 em vez
+# de 100.0). Tem prioridade sobre FAST_JSON_LISTS
+DB_JSON_LISTS = _bool("DB_JSON_LISTS", False)
+
+# Exportação de transações: linhas buscadas por ida ao servidor (cursor nomeado)
+EXPORT_ITERSIZE = _int("EXPORT_ITERSIZE", 2000)
+
+# Importação em lote de transações (POST /transacoes/bulk)
+BULK_MAX_ROWS = _int("BULK_MAX_ROWS", 500000)
+# Tamanho médio máximo de cada linha: corpos acima de BULK_MAX_ROWS x
+# BULK_MAX_BYTES_LINHA recebem 413 antes de serem lidos por inteiro
+BULK_MAX_BYTES_LINHA = _int("BULK_MAX_BYTES_LINHA", 1024)
+
+# Alteração de status em lote (POST /pagamentos/batch-status)
+PAGAMENTO_BATCH_MAX = _int("PAGAMENTO_BATCH_MAX", 50000)
+
+# Máximo de pontos (períodos x contas) em /relatorios/fluxo-caixa
+FLUXO_CAIXA_MAX_PONTOS = _int("FLUXO_CAIXA_MAX_PONTOS", 100000)
+
+# Cache em memória de conta / categoria / pessoa usado na validação das escritas
+REFERENCIA_CACHE_TTL = _float("REFERENCIA_CACHE_TTL", 30.0)  # segundos
+REFERENCIA_CACHE_MAXSIZE = _int("REFERENCIA_CACHE_MAXSIZE", 10000)  # registros por entidade
+
+# Cache das respostas de /relatorios (ETag / If-None-Match)
+RELATORIO_CACHE_TTL = _float("RELATORIO_CACHE_TTL", 10.0)  # segundos
+RELATORIO_CACHE_MAXSIZE = _int("RELATORIO_CACHE_MAXSIZE", 1000)  # respostas guardadas
+
+# Instrumentação das consultas SQL
+SLOW_QUERY_MS = _float("SLOW_QUERY_MS", 200.0)  # consultas acima disso vão para o log (0 desativa)
+SERVER_TIMING = _bool("SERVER_TIMING", True)  # cabeçalho Server-Timing com tempo/quantidade de consultas
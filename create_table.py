@@ -70,6 +70,19 @@ BEGIN
     END IF;
 END $$;
 
+-- Vetor da busca textual em descricao (GET /transacoes/search), mantido pelo
+-- próprio PostgreSQL: o rank da busca lê o vetor pronto em vez de rodar
+-- to_tsvector de novo em cada linha encontrada. Em bases já populadas o
+-- ADD COLUMN reescreve a tabela inteira
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='transacao' AND column_name='descricao_busca') THEN
+        ALTER TABLE transacao ADD COLUMN descricao_busca tsvector
+            GENERATED ALWAYS AS (to_tsvector('portuguese', COALESCE(descricao, ''))) STORED;
+    END IF;
+END $$;
+
 
     # 3. Tabela Pessoa
 
@@ -112,13 +125,46 @@ END $$;
     # 5. Índices para melhor performance
 
     -- Índices para melhor performance
-CREATE INDEX IF NOT EXISTS idx_transacao_conta_id ON transacao(conta_id);
-CREATE INDEX IF NOT EXISTS idx_transacao_categoria_id ON transacao(categoria_id);
+-- Os compostos terminam em id, a ordem da paginação (ORDER BY id): o
+-- PostgreSQL percorre só as linhas do filtro e para no LIMIT, sem ordenar.
+CREATE INDEX IF NOT EXISTS idx_transacao_conta_id_id ON transacao(conta_id, id);
+CREATE INDEX IF NOT EXISTS idx_transacao_categoria_id_id ON transacao(categoria_id, id);
 CREATE INDEX IF NOT EXISTS idx_transacao_data ON transacao(data);
-CREATE INDEX IF NOT EXISTS idx_transacao_ativo ON transacao(ativo);
+CREATE INDEX IF NOT EXISTS idx_transacao_conta_data ON transacao(conta_id, data) WHERE ativo;
+CREATE INDEX IF NOT EXISTS idx_transacao_pessoa_id ON transacao(pessoa_id) WHERE pessoa_id IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_pagamento_transacao_id ON pagamento(transacao_id);
-CREATE INDEX IF NOT EXISTS idx_pagamento_status ON pagamento(status);
-CREATE INDEX IF NOT EXISTS idx_pagamento_ativo ON pagamento(ativo);
+CREATE INDEX IF NOT EXISTS idx_pagamento_status_id ON pagamento(status, id);
+CREATE INDEX IF NOT EXISTS idx_pagamento_data_pagamento ON pagamento(data_pagamento);
+-- Relatórios de pagamentos pendentes e aging: só as linhas pendentes e ativas
+CREATE INDEX IF NOT EXISTS idx_pagamento_pendente ON pagamento(id)
+    INCLUDE (transacao_id, data_pagamento)
+    WHERE status = 'pendente' AND ativo;
+
+-- Busca textual em transacao.descricao (GET /transacoes/search)
+CREATE INDEX IF NOT EXISTS idx_transacao_descricao_busca ON transacao USING gin (descricao_busca);
+
+-- Filtros por nome (ILIKE '%texto%') com índices de trigramas. pg_trgm faz
+-- parte do contrib do PostgreSQL; sem ele os filtros continuam funcionando,
+-- só que lendo a tabela inteira
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_conta_nome_trgm ON conta USING gin (nome gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_categoria_nome_trgm ON categoria USING gin (nome gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_pessoa_nome_trgm ON pessoa USING gin (nome gin_trgm_ops);
+    ELSE
+        RAISE NOTICE 'pg_trgm indisponível: filtros por nome sem índice';
+    END IF;
+END $$;
+
+-- Substituídos pelos índices acima; os de ativo (só dois valores, quase
+-- todos TRUE) nunca eram escolhidos pelo planner e só custavam nas escritas
+DROP INDEX IF EXISTS idx_transacao_conta_id;
+DROP INDEX IF EXISTS idx_transacao_categoria_id;
+DROP INDEX IF EXISTS idx_transacao_ativo;
+DROP INDEX IF EXISTS idx_pagamento_status;
+DROP INDEX IF EXISTS idx_pagamento_ativo;
 
 
 SELECT * FROM categoria;
@@ -126,16 +172,139 @@ SELECT * FROM conta;
 SELECT * FROM transacao;
 ALTER TABLE transacao
 ADD COLUMN pessoa_id INTEGER;  -- Ajuste o tipo se necessário
+    """,
+
+    # 6. Saldo diário materializado (relatórios)
+    """
+-- Saldo diário materializado (usado pelos relatórios)
+-- Uma linha por dia/conta/categoria com a soma das transações ativas. O tipo
+-- (receita/despesa) e o status da categoria são lidos na hora da consulta,
+-- então alterar ou desativar uma categoria não exige recalcular nada.
+CREATE TABLE IF NOT EXISTS saldo_diario (
+    conta_id INTEGER NOT NULL,
+    categoria_id INTEGER NOT NULL,
+    dia DATE NOT NULL,
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (conta_id, categoria_id, dia)
+);
+
+-- Filtros por período (todas as contas) e por categoria + período; o INCLUDE
+-- deixa os relatórios somarem direto do índice
+CREATE INDEX IF NOT EXISTS idx_saldo_diario_dia_total ON saldo_diario(dia)
+    INCLUDE (conta_id, categoria_id, total);
+CREATE INDEX IF NOT EXISTS idx_saldo_diario_categoria_dia ON saldo_diario(categoria_id, dia)
+    INCLUDE (total);
+DROP INDEX IF EXISTS idx_saldo_diario_dia;
+
+-- Aplica a diferença de cada comando (INSERT/UPDATE/DELETE) de uma vez,
+-- usando as tabelas de transição: um COPY ou INSERT ... SELECT com milhares
+-- de linhas gera um único upsert agrupado.
+CREATE OR REPLACE FUNCTION saldo_diario_aplicar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO saldo_diario AS s (conta_id, categoria_id, dia, total, quantidade)
+        SELECT conta_id, categoria_id, data::date, SUM(valor), COUNT(*)
+        FROM novas
+        WHERE ativo
+        GROUP BY 1, 2, 3
+        ON CONFLICT (conta_id, categoria_id, dia) DO UPDATE
+        SET total = s.total + EXCLUDED.total,
+            quantidade = s.quantidade + EXCLUDED.quantidade;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO saldo_diario AS s (conta_id, categoria_id, dia, total, quantidade)
+        SELECT conta_id, categoria_id, dia, SUM(total), SUM(quantidade)
+        FROM (
+            SELECT conta_id, categoria_id, data::date AS dia, -valor AS total, -1 AS quantidade
+            FROM antigas
+            WHERE ativo
+            UNION ALL
+            SELECT conta_id, categoria_id, data::date, valor, 1
+            FROM novas
+            WHERE ativo
+        ) d
+        GROUP BY 1, 2, 3
+        HAVING SUM(total) <> 0 OR SUM(quantidade) <> 0
+        ON CONFLICT (conta_id, categoria_id, dia) DO UPDATE
+        SET total = s.total + EXCLUDED.total,
+            quantidade = s.quantidade + EXCLUDED.quantidade;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO saldo_diario AS s (conta_id, categoria_id, dia, total, quantidade)
+        SELECT conta_id, categoria_id, data::date, -SUM(valor), -COUNT(*)
+        FROM antigas
+        WHERE ativo
+        GROUP BY 1, 2, 3
+        ON CONFLICT (conta_id, categoria_id, dia) DO UPDATE
+        SET total = s.total + EXCLUDED.total,
+            quantidade = s.quantidade + EXCLUDED.quantidade;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula tudo a partir de transacao (bloqueia escritas enquanto roda)
+CREATE OR REPLACE FUNCTION saldo_diario_rebuild() RETURNS void AS $$
+BEGIN
+    LOCK TABLE transacao IN SHARE MODE;
+    TRUNCATE saldo_diario;
+    INSERT INTO saldo_diario (conta_id, categoria_id, dia, total, quantidade)
+    SELECT conta_id, categoria_id, data::date, SUM(valor), COUNT(*)
+    FROM transacao
+    WHERE ativo
+    GROUP BY 1, 2, 3;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_saldo_diario_insert ON transacao;
+CREATE TRIGGER trg_saldo_diario_insert
+    AFTER INSERT ON transacao
+    REFERENCING NEW TABLE AS novas
+    FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+
+DROP TRIGGER IF EXISTS trg_saldo_diario_update ON transacao;
+CREATE TRIGGER trg_saldo_diario_update
+    AFTER UPDATE ON transacao
+    REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+    FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+
+DROP TRIGGER IF EXISTS trg_saldo_diario_delete ON transacao;
+CREATE TRIGGER trg_saldo_diario_delete
+    AFTER DELETE ON transacao
+    REFERENCING OLD TABLE AS antigas
+    FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+
+-- Carga inicial quando a tabela acabou de ser criada
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM saldo_diario) THEN
+        PERFORM saldo_diario_rebuild();
+    END IF;
+END $$;
+    """,
+    """
+-- Chave de partição de cada id, usada nas buscas por id das rotas quando as
+-- tabelas são particionadas (core/particionamento.py). Sem particionamento são
+-- views sobre as próprias tabelas; database/particionamento.sql troca por
+-- tabelas mantidas por triggers
+DO $$
+BEGIN
+    IF to_regclass('transacao_chave') IS NULL THEN
+        CREATE VIEW transacao_chave AS SELECT id, data FROM transacao;
+    END IF;
+    IF to_regclass('pagamento_chave') IS NULL THEN
+        CREATE VIEW pagamento_chave AS SELECT id, transacao_id FROM pagamento;
+    END IF;
+END $$;
     """
 ]
 
 def create_tables():
     print("Conectando ao banco de dados...")
     try:
-        # O DataBase.commit fecha a conexão após a execução.
-        # Por isso, criamos uma nova instância para cada comando SQL.
+        # Cada comando usa sua própria conexão de manutenção (sem os timeouts das
+        # conexões da API), fechada no fim.
         for sql_command in SQL_CREATE_TABLES:
-            temp_db = DataBase()
+            temp_db = DataBase(manutencao=True)
             
             # Extrai a primeira linha de comando para exibição
             command_display = sql_command.strip().splitlines()[0].strip()
@@ -143,6 +312,7 @@ def create_tables():
             
             # O método commit é usado para rodar comandos DDL (CREATE TABLE)
             temp_db.commit(sql_command)
+            temp_db.close()
             
         print("Tabelas criadas com sucesso.")
 
@@ -152,5 +322,63 @@ def create_tables():
     except Exception as e:
         print(f"Ocorreu um erro: {e}")
 
+# Recalcula saldo_diario a partir de transacao (ex.: após carga manual com triggers desabilitados)
+def rebuild_saldo_diario():
+    print("Recalculando saldo_diario...")
+    try:
+        with DataBase(manutencao=True) as db:
+            db.commit("SELECT saldo_diario_rebuild()")
+            total = db.execute_one("SELECT COUNT(*) AS linhas FROM saldo_diario")
+        print(f"saldo_diario recalculado: {total['linhas']} linhas.")
+    except psycopg2.OperationalError as e:
+        print(f"Erro de Conexão/Operação: {e}")
+    except Exception as e:
+        print(f"Ocorreu um erro: {e}")
+
+
+# Particionamento opcional de transacao / pagamento (database/particionamento.sql)
+SQL_PARTICIONAMENTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "particionamento.sql")
+
+
+def carregar_particionamento(db):
+    with open(SQL_PARTICIONAMENTO, encoding="utf-8") as f:
+        db.commit(f.read())
+
+
+def particionar():
+    print("Convertendo transacao e pagamento em tabelas particionadas...")
+    try:
+        with DataBase(manutencao=True) as db:
+            carregar_particionamento(db)
+            db.commit("SELECT particionar_tabelas()")
+            total = db.execute_one(
+                "SELECT COUNT(*) AS particoes FROM pg_inherits WHERE inhparent IN ('transacao'::regclass, 'pagamento'::regclass)"
+            )
+        print(f"Tabelas particionadas: {total['particoes']} partições.")
+    except psycopg2.OperationalError as e:
+        print(f"Erro de Conexão/Operação: {e}")
+    except Exception as e:
+        print(f"Ocorreu um erro: {e}")
+
+
+def manter_particoes():
+    try:
+        with DataBase(manutencao=True) as db:
+            carregar_particionamento(db)
+            row = db.commit("SELECT string_agg(nome, ', ') AS criadas FROM particoes_manter() AS nome")
+        print(f"Partições criadas: {row['criadas'] or 'nenhuma'}.")
+    except psycopg2.OperationalError as e:
+        print(f"Erro de Conexão/Operação: {e}")
+    except Exception as e:
+        print(f"Ocorreu um erro: {e}")
+
+
 if __name__ == "__main__":
-    create_tables()
+    if "--rebuild-saldo-diario" in sys.argv:
+        rebuild_saldo_diario()
+    elif "--particionar" in sys.argv:
+        particionar()
+    elif "--manter-particoes" in sys.argv:
+        manter_particoes()
+    else:
+        create_tables()
@@ -0,0 +1,429 @@
+-- Particionamento por intervalo (opcional)
+-- Sistema Financeiro Simplificado
+--
+-- transacao é particionada por mês de `data` (transacao_AAAA_MM) e pagamento
+-- por faixas de transacao_id (pagamento_pNNNN, pagamento_bloco() ids cada). Os
+-- ids de transação crescem com o tempo, então cada faixa de pagamentos
+-- acompanha alguns meses de transações: partições antigas param de receber
+-- escritas e o VACUUM passa a trabalhar só nas recentes.
+--
+-- Aplicar depois do schema.sql:
+--   psql -U postgres -d sistema_financeiro_simplificado -f database/particionamento.sql
+--   psql -U postgres -d sistema_financeiro_simplificado -c "SELECT particionar_tabelas();"
+-- e agendar a manutenção (cria as partições dos próximos meses):
+--   psql -U postgres -d sistema_financeiro_simplificado -c "SELECT * FROM particoes_manter();"
+--
+-- Restrições do PostgreSQL que mudam o esquema:
+-- - a chave primária precisa conter a chave de partição: transacao passa a
+--   ter PRIMARY KEY (id, data) e pagamento PRIMARY KEY (id, transacao_id). A
+--   unicidade de id continua garantida pela sequence; para a busca por id não
+--   consultar todas as partições, transacao_chave e pagamento_chave guardam a
+--   chave de partição de cada id (ver "Chave de partição por id");
+-- - não existe FOREIGN KEY apontando para transacao(id) sozinho, então
+--   pagamento.transacao_id passa a ser verificado por triggers
+--   (pagamento_transacao_verificar / transacao_exclusao_verificar).
+
+CREATE OR REPLACE FUNCTION pagamento_bloco() RETURNS bigint AS $$
+    SELECT 1000000::bigint
+$$ LANGUAGE sql IMMUTABLE;
+
+-- -----------------------------
+-- Criação de partições
+-- -----------------------------
+-- Linhas que caíram na partição default antes de a partição do período
+-- existir são movidas para ela (direto entre partições, sem passar pelos
+-- triggers de transacao, então saldo_diario não muda). A default fica travada
+-- até o fim da transação: sem isso, uma linha do período inserida entre o
+-- DELETE e o CREATE TABLE ficaria na default e faria a criação falhar.
+CREATE OR REPLACE FUNCTION transacao_particao_criar(mes date) RETURNS text AS $$
+DECLARE
+    ini date := date_trunc('month', mes)::date;
+    fim date := (date_trunc('month', mes) + interval '1 month')::date;
+    nome text := 'transacao_' || to_char(ini, 'YYYY_MM');
+BEGIN
+    IF to_regclass(nome) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    LOCK TABLE transacao_default IN ACCESS EXCLUSIVE MODE;
+    CREATE TEMP TABLE particao_movidas (LIKE transacao) ON COMMIT DROP;
+    WITH movidas AS (
+        DELETE FROM transacao_default WHERE data >= ini AND data < fim RETURNING *
+    )
+    INSERT INTO particao_movidas SELECT * FROM movidas;
+
+    EXECUTE format('CREATE TABLE %I PARTITION OF transacao FOR VALUES FROM (%L) TO (%L)', nome, ini, fim);
+    -- descricao_busca é gerada e não aceita valor no INSERT
+    EXECUTE format($sql$
+        INSERT INTO %I (id, conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo)
+        SELECT id, conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo FROM particao_movidas
+    $sql$, nome);
+    DROP TABLE particao_movidas;
+
+    RETURN nome;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pagamento_particao_criar(bloco bigint) RETURNS text AS $$
+DECLARE
+    ini bigint := bloco * pagamento_bloco();
+    fim bigint := (bloco + 1) * pagamento_bloco();
+    nome text := 'pagamento_p' || lpad(bloco::text, 4, '0');
+BEGIN
+    IF to_regclass(nome) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    LOCK TABLE pagamento_default IN ACCESS EXCLUSIVE MODE;
+    CREATE TEMP TABLE particao_movidas (LIKE pagamento) ON COMMIT DROP;
+    WITH movidas AS (
+        DELETE FROM pagamento_default WHERE transacao_id >= ini AND transacao_id < fim RETURNING *
+    )
+    INSERT INTO particao_movidas SELECT * FROM movidas;
+
+    EXECUTE format('CREATE TABLE %I PARTITION OF pagamento FOR VALUES FROM (%s) TO (%s)', nome, ini, fim);
+    EXECUTE format('INSERT INTO %I SELECT * FROM particao_movidas', nome);
+    DROP TABLE particao_movidas;
+
+    RETURN nome;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Garante as partições do mês atual até `meses_adiante` meses à frente e as
+-- faixas de pagamento até a próxima depois do último id de transação, além de
+-- esvaziar a partição default. Pode rodar a qualquer momento (cron diário);
+-- execuções concorrentes esperam umas pelas outras.
+CREATE OR REPLACE FUNCTION particoes_manter(meses_adiante integer DEFAULT 3) RETURNS SETOF text AS $$
+DECLARE
+    mes date;
+    bloco bigint;
+    ultimo_id bigint;
+    nome text;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('particoes_manter'));
+
+    IF (SELECT relkind FROM pg_class WHERE oid = 'transacao'::regclass) <> 'p' THEN
+        RAISE NOTICE 'transacao não é particionada; rode SELECT particionar_tabelas() primeiro';
+        RETURN;
+    END IF;
+
+    FOR mes IN
+        SELECT generate_series(date_trunc('month', now()), date_trunc('month', now()) + make_interval(months => meses_adiante), interval '1 month')::date
+        UNION
+        SELECT DISTINCT date_trunc('month', data)::date FROM transacao_default
+        ORDER BY 1
+    LOOP
+        nome := transacao_particao_criar(mes);
+        IF nome IS NOT NULL THEN
+            RETURN NEXT nome;
+        END IF;
+    END LOOP;
+
+    EXECUTE format('SELECT last_value FROM %s', pg_get_serial_sequence('transacao', 'id')) INTO ultimo_id;
+
+    FOR bloco IN
+        SELECT generate_series(0, ultimo_id / pagamento_bloco() + 1)
+        UNION
+        SELECT DISTINCT transacao_id / pagamento_bloco() FROM pagamento_default
+        ORDER BY 1
+    LOOP
+        nome := pagamento_particao_criar(bloco);
+        IF nome IS NOT NULL THEN
+            RETURN NEXT nome;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -----------------------------
+-- Chave de partição por id
+-- -----------------------------
+-- Uma busca só por id consultaria o índice de cada partição. transacao_chave
+-- (id -> data) e pagamento_chave (id -> transacao_id) funcionam como um índice
+-- global: as rotas leem a chave ali (core/particionamento.py) e o
+-- PostgreSQL descarta as outras partições na execução. No schema.sql, sem
+-- particionamento, as duas são views sobre as próprias tabelas. Os triggers
+-- por comando só escrevem quando a chave muda (inserção, exclusão ou UPDATE
+-- que troca a data / o transacao_id); o id nunca é alterado.
+CREATE OR REPLACE FUNCTION transacao_chave_aplicar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO transacao_chave (id, data) SELECT id, data FROM novas;
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE transacao_chave c SET data = n.data
+        FROM novas n
+        WHERE c.id = n.id AND c.data <> n.data;
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM transacao_chave c USING antigas a WHERE c.id = a.id;
+    ELSE
+        TRUNCATE transacao_chave;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pagamento_chave_aplicar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO pagamento_chave (id, transacao_id) SELECT id, transacao_id FROM novas;
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE pagamento_chave c SET transacao_id = n.transacao_id
+        FROM novas n
+        WHERE c.id = n.id AND c.transacao_id <> n.transacao_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM pagamento_chave c USING antigas a WHERE c.id = a.id;
+    ELSE
+        TRUNCATE pagamento_chave;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula as duas tabelas (ex.: carga com os triggers desabilitados)
+CREATE OR REPLACE FUNCTION chaves_rebuild() RETURNS void AS $$
+BEGIN
+    LOCK TABLE transacao, pagamento IN SHARE MODE;
+    TRUNCATE transacao_chave, pagamento_chave;
+    INSERT INTO transacao_chave (id, data) SELECT id, data FROM transacao;
+    INSERT INTO pagamento_chave (id, transacao_id) SELECT id, transacao_id FROM pagamento;
+    ANALYZE transacao_chave;
+    ANALYZE pagamento_chave;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Troca as views do schema.sql pelas tabelas e cria os triggers. Chamada por
+-- particionar_tabelas() e, para bases particionadas antes de as tabelas
+-- existirem, no fim deste script
+CREATE OR REPLACE FUNCTION chaves_criar() RETURNS void AS $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('transacao_chave')) IS NOT DISTINCT FROM 'r' THEN
+        RETURN;
+    END IF;
+
+    LOCK TABLE transacao, pagamento IN SHARE ROW EXCLUSIVE MODE;
+
+    DROP VIEW IF EXISTS transacao_chave;
+    DROP VIEW IF EXISTS pagamento_chave;
+    CREATE TABLE transacao_chave (id INTEGER PRIMARY KEY, data TIMESTAMP NOT NULL);
+    CREATE TABLE pagamento_chave (id INTEGER PRIMARY KEY, transacao_id INTEGER NOT NULL);
+    PERFORM chaves_rebuild();
+
+    CREATE TRIGGER trg_transacao_chave_insert
+        AFTER INSERT ON transacao
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION transacao_chave_aplicar();
+    CREATE TRIGGER trg_transacao_chave_update
+        AFTER UPDATE ON transacao
+        REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION transacao_chave_aplicar();
+    CREATE TRIGGER trg_transacao_chave_delete
+        AFTER DELETE ON transacao
+        REFERENCING OLD TABLE AS antigas
+        FOR EACH STATEMENT EXECUTE FUNCTION transacao_chave_aplicar();
+    CREATE TRIGGER trg_transacao_chave_truncate
+        AFTER TRUNCATE ON transacao
+        FOR EACH STATEMENT EXECUTE FUNCTION transacao_chave_aplicar();
+
+    CREATE TRIGGER trg_pagamento_chave_insert
+        AFTER INSERT ON pagamento
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION pagamento_chave_aplicar();
+    CREATE TRIGGER trg_pagamento_chave_update
+        AFTER UPDATE ON pagamento
+        REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION pagamento_chave_aplicar();
+    CREATE TRIGGER trg_pagamento_chave_delete
+        AFTER DELETE ON pagamento
+        REFERENCING OLD TABLE AS antigas
+        FOR EACH STATEMENT EXECUTE FUNCTION pagamento_chave_aplicar();
+    CREATE TRIGGER trg_pagamento_chave_truncate
+        AFTER TRUNCATE ON pagamento
+        FOR EACH STATEMENT EXECUTE FUNCTION pagamento_chave_aplicar();
+END;
+$$ LANGUAGE plpgsql;
+
+-- -----------------------------
+-- Integridade pagamento -> transacao (substitui a FOREIGN KEY)
+-- -----------------------------
+-- Triggers por comando: um COPY ou UPDATE em lote verifica todas as linhas
+-- com uma consulta só.
+CREATE OR REPLACE FUNCTION pagamento_transacao_verificar() RETURNS trigger AS $$
+DECLARE
+    faltando integer;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT n.transacao_id INTO faltando
+        FROM novas n
+        WHERE NOT EXISTS (SELECT 1 FROM transacao_chave t WHERE t.id = n.transacao_id)
+        LIMIT 1;
+    ELSE
+        SELECT n.transacao_id INTO faltando
+        FROM novas n
+        INNER JOIN antigas a ON a.id = n.id AND a.transacao_id <> n.transacao_id
+        WHERE NOT EXISTS (SELECT 1 FROM transacao_chave t WHERE t.id = n.transacao_id)
+        LIMIT 1;
+    END IF;
+
+    IF faltando IS NOT NULL THEN
+        RAISE EXCEPTION 'transacao_id % não existe em transacao', faltando
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION transacao_exclusao_verificar() RETURNS trigger AS $$
+DECLARE
+    referenciada integer;
+BEGIN
+    SELECT a.id INTO referenciada
+    FROM antigas a
+    WHERE EXISTS (SELECT 1 FROM pagamento p WHERE p.transacao_id = a.id)
+    LIMIT 1;
+
+    IF referenciada IS NOT NULL THEN
+        RAISE EXCEPTION 'transacao % ainda é referenciada por pagamento', referenciada
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -----------------------------
+-- Migração: recria transacao e pagamento particionadas e copia os dados
+-- -----------------------------
+-- Roda numa transação só, com as duas tabelas bloqueadas: leituras e escritas
+-- esperam até o fim. Os índices são criados depois da cópia, e saldo_diario
+-- não é tocado (os triggers só são recriados depois de copiar os dados).
+CREATE OR REPLACE FUNCTION particionar_tabelas(meses_adiante integer DEFAULT 3) RETURNS void AS $$
+DECLARE
+    seq_transacao text := pg_get_serial_sequence('transacao', 'id');
+    seq_pagamento text := pg_get_serial_sequence('pagamento', 'id');
+    mes date;
+    bloco bigint;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'transacao'::regclass) = 'p' THEN
+        RAISE NOTICE 'transacao já é particionada';
+        RETURN;
+    END IF;
+
+    LOCK TABLE transacao, pagamento IN ACCESS EXCLUSIVE MODE;
+
+    ALTER TABLE pagamento DROP CONSTRAINT IF EXISTS pagamento_transacao_id_fkey;
+    ALTER TABLE transacao RENAME TO transacao_antiga;
+    ALTER TABLE pagamento RENAME TO pagamento_antigo;
+    ALTER INDEX transacao_pkey RENAME TO transacao_antiga_pkey;
+    ALTER INDEX pagamento_pkey RENAME TO pagamento_antigo_pkey;
+
+    EXECUTE format($sql$
+        CREATE TABLE transacao (
+            id INTEGER NOT NULL DEFAULT nextval(%L::regclass),
+            conta_id INTEGER NOT NULL REFERENCES conta(id),
+            categoria_id INTEGER NOT NULL REFERENCES categoria(id),
+            pessoa_id INTEGER REFERENCES pessoa(id),
+            valor DECIMAL(10, 2) NOT NULL CHECK (valor > 0),
+            data TIMESTAMP NOT NULL,
+            descricao TEXT,
+            ativo BOOLEAN NOT NULL DEFAULT TRUE,
+            descricao_busca tsvector
+                GENERATED ALWAYS AS (to_tsvector('portuguese', COALESCE(descricao, ''))) STORED,
+            PRIMARY KEY (id, data)
+        ) PARTITION BY RANGE (data)
+    $sql$, seq_transacao);
+    CREATE TABLE transacao_default PARTITION OF transacao DEFAULT;
+
+    EXECUTE format($sql$
+        CREATE TABLE pagamento (
+            id INTEGER NOT NULL DEFAULT nextval(%L::regclass),
+            transacao_id INTEGER NOT NULL,
+            status VARCHAR(20) NOT NULL CHECK (status IN ('pago', 'pendente', 'cancelado')),
+            data_pagamento TIMESTAMP,
+            ativo BOOLEAN NOT NULL DEFAULT TRUE,
+            PRIMARY KEY (id, transacao_id)
+        ) PARTITION BY RANGE (transacao_id)
+    $sql$, seq_pagamento);
+    CREATE TABLE pagamento_default PARTITION OF pagamento DEFAULT;
+
+    FOR mes IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE((SELECT MIN(data) FROM transacao_antiga), now())),
+            date_trunc('month', GREATEST((SELECT MAX(data) FROM transacao_antiga), now())) + make_interval(months => meses_adiante),
+            interval '1 month'
+        )::date
+    LOOP
+        PERFORM transacao_particao_criar(mes);
+    END LOOP;
+
+    FOR bloco IN
+        SELECT generate_series(0, COALESCE((SELECT MAX(id) FROM transacao_antiga), 0) / pagamento_bloco() + 1)
+    LOOP
+        PERFORM pagamento_particao_criar(bloco);
+    END LOOP;
+
+    INSERT INTO transacao (id, conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo)
+    SELECT id, conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo
+    FROM transacao_antiga;
+
+    INSERT INTO pagamento (id, transacao_id, status, data_pagamento, ativo)
+    SELECT id, transacao_id, status, data_pagamento, ativo
+    FROM pagamento_antigo;
+
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY transacao.id', seq_transacao);
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY pagamento.id', seq_pagamento);
+    -- As views do schema.sql ainda apontam para as tabelas antigas
+    PERFORM chaves_criar();
+    DROP TABLE pagamento_antigo;
+    DROP TABLE transacao_antiga;
+
+    -- Mesmos índices do schema.sql, agora criados em cada partição
+    CREATE INDEX idx_transacao_conta_id_id ON transacao(conta_id, id);
+    CREATE INDEX idx_transacao_categoria_id_id ON transacao(categoria_id, id);
+    CREATE INDEX idx_transacao_data ON transacao(data);
+    CREATE INDEX idx_transacao_conta_data ON transacao(conta_id, data) WHERE ativo;
+    CREATE INDEX idx_transacao_pessoa_id ON transacao(pessoa_id) WHERE pessoa_id IS NOT NULL;
+    CREATE INDEX idx_pagamento_transacao_id ON pagamento(transacao_id);
+    CREATE INDEX idx_pagamento_status_id ON pagamento(status, id);
+    CREATE INDEX idx_pagamento_data_pagamento ON pagamento(data_pagamento);
+    CREATE INDEX idx_pagamento_pendente ON pagamento(id)
+        INCLUDE (transacao_id, data_pagamento)
+        WHERE status = 'pendente' AND ativo;
+    CREATE INDEX idx_transacao_descricao_busca ON transacao USING gin (descricao_busca);
+
+    CREATE TRIGGER trg_saldo_diario_insert
+        AFTER INSERT ON transacao
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+    CREATE TRIGGER trg_saldo_diario_update
+        AFTER UPDATE ON transacao
+        REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+    CREATE TRIGGER trg_saldo_diario_delete
+        AFTER DELETE ON transacao
+        REFERENCING OLD TABLE AS antigas
+        FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+
+    CREATE TRIGGER trg_pagamento_transacao_insert
+        AFTER INSERT ON pagamento
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION pagamento_transacao_verificar();
+    CREATE TRIGGER trg_pagamento_transacao_update
+        AFTER UPDATE ON pagamento
+        REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION pagamento_transacao_verificar();
+    CREATE TRIGGER trg_transacao_exclusao
+        AFTER DELETE ON transacao
+        REFERENCING OLD TABLE AS antigas
+        FOR EACH STATEMENT EXECUTE FUNCTION transacao_exclusao_verificar();
+
+    ANALYZE transacao;
+    ANALYZE pagamento;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bases particionadas antes de transacao_chave / pagamento_chave existirem
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'transacao'::regclass) = 'p' THEN
+        PERFORM chaves_criar();
+    END IF;
+END $$;
@@ -35,6 +35,23 @@ BEGIN
     END IF;
 END $$;
 
+-- Tabela Pessoa
+CREATE TABLE IF NOT EXISTS pessoa (
+    id SERIAL PRIMARY KEY,
+    nome VARCHAR(255) NOT NULL,
+    tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('cliente', 'fornecedor')),
+    ativo BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+-- Adicionar coluna ativo se não existir
+DO $$ 
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
+                   WHERE table_name='pessoa' AND column_name='ativo') THEN
+        ALTER TABLE pessoa ADD COLUMN ativo BOOLEAN NOT NULL DEFAULT TRUE;
+    END IF;
+END $$;
+
 -- Tabela Transacao
 CREATE TABLE IF NOT EXISTS transacao (
     id SERIAL PRIMARY KEY,
@@ -56,20 +73,16 @@ BEGIN
     END IF;
 END $$;
 
--- Tabela Pessoa
-CREATE TABLE IF NOT EXISTS pessoa (
-    id SERIAL PRIMARY KEY,
-    nome VARCHAR(255) NOT NULL,
-    tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('cliente', 'fornecedor')),
-    ativo BOOLEAN NOT NULL DEFAULT TRUE
-);
-
--- Adicionar coluna ativo se não existir
-DO $$ 
+-- Vetor da busca textual em descricao (GET /transacoes/search), mantido pelo
+-- próprio PostgreSQL: o rank da busca lê o vetor pronto em vez de rodar
+-- to_tsvector de novo em cada linha encontrada. Em bases já populadas o
+-- ADD COLUMN reescreve a tabela inteira
+DO $$
 BEGIN
-    IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                   WHERE table_name='pessoa' AND column_name='ativo') THEN
-        ALTER TABLE pessoa ADD COLUMN ativo BOOLEAN NOT NULL DEFAULT TRUE;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='transacao' AND column_name='descricao_busca') THEN
+        ALTER TABLE transacao ADD COLUMN descricao_busca tsvector
+            GENERATED ALWAYS AS (to_tsvector('portuguese', COALESCE(descricao, ''))) STORED;
     END IF;
 END $$;
 
@@ -92,11 +105,162 @@ BEGIN
 END $$;
 
 -- Índices para melhor performance
-CREATE INDEX IF NOT EXISTS idx_transacao_conta_id ON transacao(conta_id);
-CREATE INDEX IF NOT EXISTS idx_transacao_categoria_id ON transacao(categoria_id);
+-- Os compostos terminam em id, a ordem da paginação (ORDER BY id): o
+-- PostgreSQL percorre só as linhas do filtro e para no LIMIT, sem ordenar.
+CREATE INDEX IF NOT EXISTS idx_transacao_conta_id_id ON transacao(conta_id, id);
+CREATE INDEX IF NOT EXISTS idx_transacao_categoria_id_id ON transacao(categoria_id, id);
 CREATE INDEX IF NOT EXISTS idx_transacao_data ON transacao(data);
-CREATE INDEX IF NOT EXISTS idx_transacao_ativo ON transacao(ativo);
+CREATE INDEX IF NOT EXISTS idx_transacao_conta_data ON transacao(conta_id, data) WHERE ativo;
+CREATE INDEX IF NOT EXISTS idx_transacao_pessoa_id ON transacao(pessoa_id) WHERE pessoa_id IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_pagamento_transacao_id ON pagamento(transacao_id);
-CREATE INDEX IF NOT EXISTS idx_pagamento_status ON pagamento(status);
-CREATE INDEX IF NOT EXISTS idx_pagamento_ativo ON pagamento(ativo);
+CREATE INDEX IF NOT EXISTS idx_pagamento_status_id ON pagamento(status, id);
+CREATE INDEX IF NOT EXISTS idx_pagamento_data_pagamento ON pagamento(data_pagamento);
+-- Relatórios de pagamentos pendentes e aging: só as linhas pendentes e ativas
+CREATE INDEX IF NOT EXISTS idx_pagamento_pendente ON pagamento(id)
+    INCLUDE (transacao_id, data_pagamento)
+    WHERE status = 'pendente' AND ativo;
+
+-- Busca textual em transacao.descricao (GET /transacoes/search)
+CREATE INDEX IF NOT EXISTS idx_transacao_descricao_busca ON transacao USING gin (descricao_busca);
+
+-- Filtros por nome (ILIKE '%texto%') com índices de trigramas. pg_trgm faz
+-- parte do contrib do PostgreSQL; sem ele os filtros continuam funcionando,
+-- só que lendo a tabela inteira
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_conta_nome_trgm ON conta USING gin (nome gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_categoria_nome_trgm ON categoria USING gin (nome gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_pessoa_nome_trgm ON pessoa USING gin (nome gin_trgm_ops);
+    ELSE
+        RAISE NOTICE 'pg_trgm indisponível: filtros por nome sem índice';
+    END IF;
+END $$;
+
+-- Substituídos pelos índices acima; os de ativo (só dois valores, quase
+-- todos TRUE) nunca eram escolhidos pelo planner e só custavam nas escritas
+DROP INDEX IF EXISTS idx_transacao_conta_id;
+DROP INDEX IF EXISTS idx_transacao_categoria_id;
+DROP INDEX IF EXISTS idx_transacao_ativo;
+DROP INDEX IF EXISTS idx_pagamento_status;
+DROP INDEX IF EXISTS idx_pagamento_ativo;
+
+-- Saldo diário materializado (usado pelos relatórios)
+-- Uma linha por dia/conta/categoria com a soma das transações ativas. O tipo
+-- (receita/despesa) e o status da categoria são lidos na hora da consulta,
+-- então alterar ou desativar uma categoria não exige recalcular nada.
+CREATE TABLE IF NOT EXISTS saldo_diario (
+    conta_id INTEGER NOT NULL,
+    categoria_id INTEGER NOT NULL,
+    dia DATE NOT NULL,
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (conta_id, categoria_id, dia)
+);
+
+-- Filtros por período (todas as contas) e por categoria + período; o INCLUDE
+-- deixa os relatórios somarem direto do índice
+CREATE INDEX IF NOT EXISTS idx_saldo_diario_dia_total ON saldo_diario(dia)
+    INCLUDE (conta_id, categoria_id, total);
+CREATE INDEX IF NOT EXISTS idx_saldo_diario_categoria_dia ON saldo_diario(categoria_id, dia)
+    INCLUDE (total);
+DROP INDEX IF EXISTS idx_saldo_diario_dia;
+
+-- Aplica a diferença de cada comando (INSERT/UPDATE/DELETE) de uma vez,
+-- usando as tabelas de transição: um COPY ou INSERT ... SELECT com milhares
+-- de linhas gera um único upsert agrupado.
+CREATE OR REPLACE FUNCTION saldo_diario_aplicar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO saldo_diario AS s (conta_id, categoria_id, dia, total, quantidade)
+        SELECT conta_id, categoria_id, data::date, SUM(valor), COUNT(*)
+        FROM novas
+        WHERE ativo
+        GROUP BY 1, 2, 3
+        ON CONFLICT (conta_id, categoria_id, dia) DO UPDATE
+        SET total = s.total + EXCLUDED.total,
+            quantidade = s.quantidade + EXCLUDED.quantidade;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO saldo_diario AS s (conta_id, categoria_id, dia, total, quantidade)
+        SELECT conta_id, categoria_id, dia, SUM(total), SUM(quantidade)
+        FROM (
+            SELECT conta_id, categoria_id, data::date AS dia, -valor AS total, -1 AS quantidade
+            FROM antigas
+            WHERE ativo
+            UNION ALL
+            SELECT conta_id, categoria_id, data::date, valor, 1
+            FROM novas
+            WHERE ativo
+        ) d
+        GROUP BY 1, 2, 3
+        HAVING SUM(total) <> 0 OR SUM(quantidade) <> 0
+        ON CONFLICT (conta_id, categoria_id, dia) DO UPDATE
+        SET total = s.total + EXCLUDED.total,
+            quantidade = s.quantidade + EXCLUDED.quantidade;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO saldo_diario AS s (conta_id, categoria_id, dia, total, quantidade)
+        SELECT conta_id, categoria_id, data::date, -SUM(valor), -COUNT(*)
+        FROM antigas
+        WHERE ativo
+        GROUP BY 1, 2, 3
+        ON CONFLICT (conta_id, categoria_id, dia) DO UPDATE
+        SET total = s.total + EXCLUDED.total,
+            quantidade = s.quantidade + EXCLUDED.quantidade;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
+-- Recalcula tudo a partir de transacao (bloqueia escritas enquanto roda)
+CREATE OR REPLACE FUNCTION saldo_diario_rebuild() RETURNS void AS $$
+BEGIN
+    LOCK TABLE transacao IN SHARE MODE;
+    TRUNCATE saldo_diario;
+    INSERT INTO saldo_diario (conta_id, categoria_id, dia, total, quantidade)
+    SELECT conta_id, categoria_id, data::date, SUM(valor), COUNT(*)
+    FROM transacao
+    WHERE ativo
+    GROUP BY 1, 2, 3;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_saldo_diario_insert ON transacao;
+CREATE TRIGGER trg_saldo_diario_insert
+    AFTER INSERT ON transacao
+    REFERENCING NEW TABLE AS novas
+    FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+
+DROP TRIGGER IF EXISTS trg_saldo_diario_update ON transacao;
+CREATE TRIGGER trg_saldo_diario_update
+    AFTER UPDATE ON transacao
+    REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+    FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+
+DROP TRIGGER IF EXISTS trg_saldo_diario_delete ON transacao;
+CREATE TRIGGER trg_saldo_diario_delete
+    AFTER DELETE ON transacao
+    REFERENCING OLD TABLE AS antigas
+    FOR EACH STATEMENT EXECUTE FUNCTION saldo_diario_aplicar();
+
+-- Carga inicial quando a tabela acabou de ser criada
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM saldo_diario) THEN
+        PERFORM saldo_diario_rebuild();
+    END IF;
+END $$;
+
+-- Chave de partição de cada id, usada nas buscas por id das rotas quando as
+-- tabelas são particionadas (core/particionamento.py). Sem particionamento são
+-- views sobre as próprias tabelas; database/particionamento.sql troca por
+-- tabelas mantidas por triggers
+DO $$
+BEGIN
+    IF to_regclass('transacao_chave') IS NULL THEN
+        CREATE VIEW transacao_chave AS SELECT id, data FROM transacao;
+    END IF;
+    IF to_regclass('pagamento_chave') IS NULL THEN
+        CREATE VIEW pagamento_chave AS SELECT id, transacao_id FROM pagamento;
+    END IF;
+END $$;
@@ -1,4 +1,20 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from psycopg.errors import QueryCanceled as AsyncQueryCanceled
+from psycopg_pool import PoolTimeout as AsyncPoolTimeout
+from psycopg2.errors import QueryCanceled
+from core import settings
+from core.admissao import AdmissaoMiddleware, admissao_stats, ativo as admissao_ativa
+from core.db import close_pool, pool_stats
+from core.instrumentacao import InstrumentacaoMiddleware
+from core.metricas import MetricasMiddleware, render as render_metricas
+from core.particionamento import iniciar_particionamento
+from core.pool import PoolTimeout
+from core.referencias import cache_stats
+from core.relatorio_cache import RelatorioCacheMiddleware, cache_stats as relatorio_cache_stats
+from core.replicas import LeituraPrimarioMiddleware, iniciar_replicas, parar_replicas, replicas_stats
+from app.routers import override_routes
 from app.routers.categoria_routes import router as categoria_routes
 from app.routers.conta_routes import router as conta_routes
 from app.routers.pessoa_routes import router as pessoa_routes
@@ -6,7 +22,56 @@ from app.routers.transacao_routes import router as transacao_routes
 from app.routers.pagamento_routes import router as pagamento_routes
 from app.routers.relatorio_routes import router as relatorio_routes
 
-app = FastAPI(title='Sistema Financeiro Simplificado')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    iniciar_replicas()
+    iniciar_particionamento()
+    if settings.DB_ASYNC:
+        from core.async_db import open_async_pool, close_async_pool
+        await open_async_pool()
+    try:
+        yield
+    finally:
+        if settings.DB_ASYNC:
+            await close_async_pool()
+        parar_replicas()
+        close_pool()
+
+
+app = FastAPI(title='Sistema Financeiro Simplificado', lifespan=lifespan)
+
+# Com réplicas de leitura, o cliente que acabou de escrever lê do primário
+# por alguns segundos (cookie)
+if settings.DB_REPLICAS:
+    app.add_middleware(LeituraPrimarioMiddleware)
+
+# Vagas por classe de rota e limite por cliente; por dentro do cache, então
+# acertos do cache não ocupam vaga
+if admissao_ativa():
+    app.add_middleware(AdmissaoMiddleware)
+
+# Cache das respostas de /relatorios com ETag (invalidado a cada escrita)
+app.add_middleware(RelatorioCacheMiddleware)
+
+# Latência, status e tamanho por rota para o GET /metrics; precisa ficar por
+# dentro da instrumentação para ler o tempo de banco da requisição
+app.add_middleware(MetricasMiddleware)
+
+# Conta consultas / tempo de banco por requisição (Server-Timing e log de
+# consultas lentas); fica por fora do cache para medir também os acertos
+app.add_middleware(InstrumentacaoMiddleware)
+
+# Com DB_ASYNC, transações, pagamentos e relatórios usam as versões assíncronas
+# das rotas; as demais continuam no threadpool com o pool síncrono
+if settings.DB_ASYNC:
+    from app.routers.transacao_async_routes import router as transacao_async_routes
+    from app.routers.pagamento_async_routes import router as pagamento_async_routes
+    from app.routers.relatorio_async_routes import router as relatorio_async_routes
+
+    transacao_routes = override_routes(transacao_routes, transacao_async_routes)
+    pagamento_routes = override_routes(pagamento_routes, pagamento_async_routes)
+    relatorio_routes = override_routes(relatorio_routes, relatorio_async_routes)
 
 app.include_router(conta_routes)
 app.include_router(categoria_routes)
@@ -14,3 +79,63 @@ app.include_router(pessoa_routes)
 app.include_router(transacao_routes)
 app.include_router(pagamento_routes)
 app.include_router(relatorio_routes)
+
+
+# Pool esgotado: melhor pedir para o cliente tentar de novo do que travar
+@app.exception_handler(PoolTimeout)
+@app.exception_handler(AsyncPoolTimeout)
+async def pool_timeout_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Banco de dados ocupado, tente novamente"},
+        headers={"Retry-After": "1"},
+    )
+
+
+# statement_timeout estourado (ou consulta cancelada porque o cliente
+# desconectou, caso em que ninguém recebe a resposta)
+@app.exception_handler(QueryCanceled)
+@app.exception_handler(AsyncQueryCanceled)
+async def query_canceled_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "Consulta excedeu o tempo limite; refine os filtros ou tente novamente"},
+        headers={"Retry-After": str(settings.QUERY_TIMEOUT_RETRY_AFTER)},
+    )
+
+
+@app.get('/sistema/pool', tags=['sistema'])
+def get_pool_stats():
+    stats = pool_stats() or {}
+    if settings.DB_ASYNC:
+        from core.async_db import async_pool_stats
+        stats = {**stats, "async": async_pool_stats() or {}}
+    return stats
+
+
+@app.get('/sistema/replicas', tags=['sistema'])
+def get_replicas_stats():
+    return replicas_stats()
+
+
+@app.get('/sistema/admissao', tags=['sistema'])
+def get_admissao_stats():
+    return admissao_stats()
+
+
+@app.get('/sistema/cache', tags=['sistema'])
+def get_cache_stats():
+    return {**cache_stats(), "relatorios": relatorio_cache_stats()}
+
+
+# Formato texto do Prometheus; async para ler os contadores na thread do event loop
+@app.get('/metrics', include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(render_metricas(), media_type="text/plain; version=0.0.4")
+
+
+# `python main.py`: sobe o uvicorn com host, porta e número de workers das
+# settings (variáveis de ambiente / .env)
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('main:app', host=settings.API_HOST, port=settings.API_PORT, workers=settings.WORKERS)
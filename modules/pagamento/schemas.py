@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Literal, Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 from modules.transacao.schemas import Transacao
 
@@ -33,3 +33,26 @@ class Pagamento(PagamentoCreate):
 
     class Config:
         orm_mode = True
+
+
+# Seleciona os pagamentos ativos pelo status atual e pela data da transação
+class PagamentoBatchFiltro(BaseModel):
+    status: Optional[StatusEnum] = None
+    transacao_data_ini: Optional[datetime] = None
+    transacao_data_fim: Optional[datetime] = None
+
+
+class PagamentoBatchStatus(BaseModel):
+    ids: Optional[List[int]] = None
+    filtro: Optional[PagamentoBatchFiltro] = None
+    status: StatusEnum
+    data_pagamento: Optional[datetime] = None
+
+
+class PagamentoBatchResultado(BaseModel):
+    selecionados: int
+    atualizados: int
+    rejeitados: int
+    ids_atualizados: List[int]
+    erros: Dict[str, List[int]]  # motivo -> ids
+    duracao_ms: float
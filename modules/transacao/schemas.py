@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from modules.categoria.schemas import Categoria
 from modules.pessoa.schemas import Pessoa
 
@@ -32,3 +32,22 @@ class Transacao(TransacaoBase):
 
     class Config:
         from_attributes = True
+
+
+# Resultado de GET /transacoes/search: a transação e a relevância da busca
+class TransacaoBusca(Transacao):
+    rank: float
+
+
+class TransacaoBulkErro(BaseModel):
+    linha: int
+    erros: List[str]
+
+
+class TransacaoBulkResultado(BaseModel):
+    recebidas: int
+    inseridas: int
+    rejeitadas: int
+    erros: List[TransacaoBulkErro]
+    duracao_ms: float
+    linhas_por_segundo: float
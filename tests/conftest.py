@@ -0,0 +1,81 @@
+import importlib
+import os
+
+import psycopg2
+import pytest
+
+# 🔹 Os testes rodam num banco próprio (TEST_DB_NAME), criado na primeira vez
+# e atualizado com database/schema.sql a cada sessão; host, porta e usuário
+# vêm das settings (ambiente / .env). Precisa ser definido antes de importar
+# core.settings. Sem PostgreSQL, os testes que usam o banco são pulados.
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "sistema_financeiro_simplificado_test")
+os.environ["DB_REPLICAS"] = ""
+
+from core import settings  # noqa: E402
+from core.db import DB_CONFIG  # noqa: E402
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "schema.sql")
+TABELAS = "pagamento, transacao, saldo_diario, conta, categoria, pessoa"
+
+
+def _criar_banco():
+    conn = psycopg2.connect(**{**DB_CONFIG, "database": "postgres"})
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (settings.DB_NAME,))
+        if cursor.fetchone() is None:
+            cursor.execute(f'CREATE DATABASE "{settings.DB_NAME}"')
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope="session")
+def banco():
+    try:
+        _criar_banco()
+        conn = psycopg2.connect(**DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+
+    conn.autocommit = True
+    with open(SCHEMA, encoding="utf-8") as f:
+        conn.cursor().execute(f.read())
+    conn.cursor().execute(f"TRUNCATE {TABELAS} RESTART IDENTITY CASCADE")
+    yield conn
+    conn.close()
+
+
+# Cache de referências (core/referencias.py) vazio no início do teste; o
+# valor é a função que limpa de novo
+@pytest.fixture
+def limpar_referencias():
+    from core.referencias import CACHES
+
+    def limpar():
+        for cache in CACHES.values():
+            cache.clear()
+
+    limpar()
+    return limpar
+
+
+# Aplicação nos dois modos (DB_ASYNC): main.py escolhe as rotas na importação
+@pytest.fixture(params=["sync", "async"])
+def client(request, banco):
+    from fastapi.testclient import TestClient
+
+    settings.DB_ASYNC = request.param == "async"
+    import main
+    main = importlib.reload(main)
+    with TestClient(main.app) as client:
+        yield client
+    settings.DB_ASYNC = False
+
+
+@pytest.fixture
+def referencias(client):
+    conta = client.post("/contas/", json={"nome": "Conta teste", "saldo_inicial": 0}).json()
+    categoria = client.post("/categorias/", json={"nome": "Categoria teste", "tipo": "despesa"}).json()
+    pessoa = client.post("/pessoas/", json={"nome": "Pessoa teste", "tipo": "cliente"}).json()
+    return {"conta_id": conta["id"], "categoria_id": categoria["id"], "pessoa_id": pessoa["id"]}
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from core.admissao import Compartimento, Rejeitada
+
+
+# 🔹 Espera na fila do compartimento (core/admissao.py): estourar o timeout
+# vira Rejeitada("timeout") (503), e a fila não guarda quem desistiu
+def test_timeout_na_fila():
+    async def cenario():
+        compartimento = Compartimento("leitura", limite=1, fila_max=1, timeout=0.01)
+        await compartimento.entrar()
+        with pytest.raises(Rejeitada) as erro:
+            await compartimento.entrar()
+        return compartimento, erro.value.motivo
+
+    compartimento, motivo = asyncio.run(cenario())
+
+    assert motivo == "timeout"
+    assert compartimento.rejeitadas["timeout"] == 1
+    assert not compartimento.fila and compartimento.em_uso == 1
+
+
+def test_vaga_passa_para_a_fila():
+    async def cenario():
+        compartimento = Compartimento("escrita", limite=1, fila_max=1, timeout=1)
+        await compartimento.entrar()
+        espera = asyncio.create_task(compartimento.entrar())
+        await asyncio.sleep(0)
+        compartimento.sair()
+        await espera
+        return compartimento
+
+    compartimento = asyncio.run(cenario())
+
+    assert compartimento.admitidas == 2 and compartimento.em_uso == 1
@@ -0,0 +1,71 @@
+import json
+
+from core import settings
+
+
+# 🔹 Importação em lote (POST /transacoes/bulk): o corpo é lido e validado no
+# threadpool, junto com a gravação, e a data chega na transação como foi enviada
+def test_bulk_ndjson(client, referencias):
+    linhas = [
+        {**referencias, "valor": 10, "data": "2025-05-10T10:00:00", "descricao": "Primeira"},
+        {**referencias, "valor": 20.5, "data": "2025-05-10T23:30:00.25", "descricao": "Segunda"},
+        {**referencias, "conta_id": 0, "valor": 5, "data": "2025-05-11T00:00:00", "descricao": "Sem conta"},
+    ]
+    resposta = client.post(
+        "/transacoes/bulk",
+        content="\n".join(json.dumps(linha) for linha in linhas),
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert resposta.status_code == 200
+    resultado = resposta.json()
+    assert (resultado["recebidas"], resultado["inseridas"], resultado["rejeitadas"]) == (3, 2, 1)
+    assert resultado["erros"] == [{"linha": 3, "erros": ["Conta não encontrada"]}]
+
+    listadas = client.get("/transacoes/", params={"conta_id": referencias["conta_id"], "limit": 1000}).json()
+    datas = {t["descricao"]: t["data"] for t in listadas}
+    assert datas["Primeira"] == "2025-05-10T10:00:00"
+    assert datas["Segunda"] == "2025-05-10T23:30:00.250000"
+
+
+def test_bulk_csv_tudo_ou_nada(client, referencias):
+    corpo = (
+        "conta_id,categoria_id,pessoa_id,valor,data,descricao\n"
+        f"{referencias['conta_id']},{referencias['categoria_id']},,10,2025-05-10T10:00:00,CSV\n"
+        f"{referencias['conta_id']},{referencias['categoria_id']},,-1,2025-05-10T10:00:00,Negativa\n"
+    )
+    resposta = client.post("/transacoes/bulk?tudo_ou_nada=true", content=corpo,
+                           headers={"content-type": "text/csv"})
+
+    assert resposta.status_code == 200
+    assert resposta.json()["inseridas"] == 0
+    assert resposta.json()["erros"] == [{"linha": 2, "erros": ["valor deve ser maior que zero"]}]
+
+
+def test_bulk_erros_do_corpo(client, monkeypatch):
+    resposta = client.post("/transacoes/bulk", content="{", headers={"content-type": "application/json"})
+    assert resposta.status_code == 400
+
+    resposta = client.post("/transacoes/bulk", content="x", headers={"content-type": "text/plain"})
+    assert resposta.status_code == 415
+
+    monkeypatch.setattr(settings, "BULK_MAX_ROWS", 1)
+    resposta = client.post("/transacoes/bulk", json=[{}, {}])
+    assert resposta.status_code == 413
+
+
+# Corpo grande demais: 413 antes do parse (o corpo nem é JSON válido)
+def test_bulk_corpo_grande_demais(client, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ROWS", 2)
+    monkeypatch.setattr(settings, "BULK_MAX_BYTES_LINHA", 10)
+    headers = {"content-type": "application/json"}
+
+    resposta = client.post("/transacoes/bulk", content="x" * 21, headers=headers)
+    assert resposta.status_code == 413
+
+    # sem Content-Length (chunked): o limite vale durante a leitura
+    resposta = client.post("/transacoes/bulk", content=iter([b"x" * 15, b"x" * 15]), headers=headers)
+    assert resposta.status_code == 413
+
+    resposta = client.post("/transacoes/bulk", content="x" * 20, headers=headers)
+    assert resposta.status_code == 400
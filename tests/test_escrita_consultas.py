@@ -0,0 +1,150 @@
+import pytest
+
+
+# 🔹 Quantidade de instruções SQL por escrita: criação e alteração
+# de transações e status de pagamentos em lote validam, escrevem e devolvem a
+# linha final numa instrução só. O COMMIT é a segunda ida ao banco e não entra
+# na contagem da instrumentação.
+TRANSACAO = {"valor": 150.25, "data": "2025-05-10T10:00:00", "descricao": "Teste"}
+
+
+# Consultas que a instrumentação (core/instrumentacao.py) contou na
+# requisição, lidas do Server-Timing: db;dur=1.23;desc="2 consultas"
+def consultas(resposta):
+    for parte in resposta.headers["server-timing"].split(","):
+        campos = parte.strip().split(";")
+        if campos[0] == "db":
+            for campo in campos[1:]:
+                if campo.startswith("desc="):
+                    return int(campo[len('desc="'):].split()[0])
+    raise AssertionError("Server-Timing sem a métrica db")
+
+
+def criar(client, referencias, **campos):
+    return client.post("/transacoes/", json={**TRANSACAO, **referencias, **campos})
+
+
+def test_create_sem_cache(client, referencias, limpar_referencias):
+    resposta = criar(client, referencias)
+
+    assert resposta.status_code == 201
+    assert consultas(resposta) == 1
+    assert resposta.json()["categoria"]["nome"] == "Categoria teste"
+    assert resposta.json()["pessoa"]["nome"] == "Pessoa teste"
+
+
+def test_create_com_cache(client, referencias, limpar_referencias):
+    from core.referencias import ativo
+
+    criar(client, referencias)
+    assert ativo("conta", referencias["conta_id"]) is True
+    resposta = criar(client, referencias)
+
+    assert resposta.status_code == 201
+    assert consultas(resposta) == 1
+    assert resposta.json()["categoria"]["nome"] == "Categoria teste"
+
+
+@pytest.mark.parametrize("campo, status, detalhe", [
+    ("conta_id", 404, "Conta não encontrada"),
+    ("categoria_id", 404, "Categoria não encontrada"),
+    ("pessoa_id", 404, "Pessoa não encontrada"),
+])
+def test_create_referencia_inexistente(client, referencias, campo, status, detalhe):
+    resposta = criar(client, referencias, **{campo: 999999999})
+
+    assert resposta.status_code == status
+    assert resposta.json()["detail"] == detalhe
+    assert consultas(resposta) == 1
+
+
+def test_create_conta_desativada(client, referencias):
+    criar(client, referencias)
+    client.patch(f"/contas/{referencias['conta_id']}/desativar")
+    resposta = criar(client, referencias)
+
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == "Conta está desativada"
+    assert consultas(resposta) == 1
+
+
+# Referência excluída por fora das rotas (outro worker) enquanto está no
+# cache: a chave estrangeira recusa e a instrução completa diz qual foi
+def test_create_referencia_excluida_com_cache(client, banco, referencias, limpar_referencias):
+    pessoa = client.post("/pessoas/", json={"nome": "Excluída", "tipo": "cliente"}).json()["id"]
+    criar(client, referencias, pessoa_id=pessoa)
+    cursor = banco.cursor()
+    cursor.execute("DELETE FROM transacao WHERE pessoa_id = %s", (pessoa,))
+    cursor.execute("DELETE FROM pessoa WHERE id = %s", (pessoa,))
+
+    resposta = criar(client, referencias, pessoa_id=pessoa)
+
+    assert resposta.status_code == 404
+    assert resposta.json()["detail"] == "Pessoa não encontrada"
+    assert consultas(resposta) == 2
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_update(client, referencias, limpar_referencias, cache):
+    id = criar(client, referencias).json()["id"]
+    if not cache:
+        limpar_referencias()
+
+    resposta = client.put(f"/transacoes/{id}", json={"valor": 99.5, "categoria_id": referencias["categoria_id"]})
+
+    assert resposta.status_code == 200
+    assert consultas(resposta) == 1
+    assert resposta.json()["valor"] == 99.5
+    assert resposta.json()["categoria"]["nome"] == "Categoria teste"
+
+
+def test_update_inexistente(client, referencias):
+    resposta = client.put("/transacoes/999999999", json={"conta_id": referencias["conta_id"]})
+
+    assert resposta.status_code == 404
+    assert resposta.json()["detail"] == "Transação não encontrada"
+    assert consultas(resposta) == 1
+
+
+def test_update_referencia_inexistente(client, referencias):
+    id = criar(client, referencias).json()["id"]
+    resposta = client.put(f"/transacoes/{id}", json={"pessoa_id": 999999999})
+
+    assert resposta.status_code == 404
+    assert resposta.json()["detail"] == "Pessoa não encontrada"
+    assert consultas(resposta) == 1
+
+
+def test_update_vazio(client, referencias):
+    id = criar(client, referencias).json()["id"]
+    resposta = client.put(f"/transacoes/{id}", json={})
+
+    assert resposta.status_code == 200
+    assert consultas(resposta) == 1
+
+
+@pytest.fixture
+def pagamentos(client, referencias):
+    ids = []
+    for _ in range(3):
+        transacao = criar(client, referencias).json()["id"]
+        pagamento = client.post("/pagamentos/", json={"transacao_id": transacao, "status": "pendente"})
+        ids.append(pagamento.json()["id"])
+    return ids
+
+
+def test_batch_status_ids(client, pagamentos):
+    resposta = client.post("/pagamentos/batch-status", json={"ids": [*pagamentos, 999999999], "status": "pago"})
+
+    assert resposta.status_code == 200
+    assert resposta.json()["atualizados"] == 3
+    assert resposta.json()["erros"] == {"nao_encontrado": [999999999]}
+    assert consultas(resposta) == 1
+
+
+def test_batch_status_filtro(client, pagamentos):
+    resposta = client.post("/pagamentos/batch-status", json={"filtro": {"status": "pendente"}, "status": "cancelado"})
+
+    assert resposta.status_code == 200
+    assert set(pagamentos) <= set(resposta.json()["ids_atualizados"])
+    assert consultas(resposta) == 1
@@ -0,0 +1,99 @@
+from datetime import date, datetime
+
+import psycopg2
+import pytest
+
+from core.db import DB_CONFIG
+from app.routers import relatorio_routes as relatorios
+from app.routers.pagamento_routes import build_list_pagamentos_query
+from app.routers.transacao_routes import build_list_transacoes_query
+
+
+# 🔹 Índices usados pelas listagens e relatórios: EXPLAIN do SQL
+# montado pelas rotas sobre uma base populada com generate_series. A carga e o
+# ANALYZE ficam numa transação desfeita no fim do módulo, então os outros
+# testes continuam com o banco vazio.
+POPULAR = """
+TRUNCATE pagamento, transacao, saldo_diario, conta, categoria, pessoa RESTART IDENTITY CASCADE;
+INSERT INTO conta (nome, saldo_inicial)
+SELECT 'Conta ' || i, 0 FROM generate_series(1, 100) i;
+INSERT INTO categoria (nome, tipo)
+SELECT 'Categoria ' || i, CASE WHEN i % 2 = 0 THEN 'receita' ELSE 'despesa' END FROM generate_series(1, 200) i;
+INSERT INTO pessoa (nome, tipo)
+SELECT 'Pessoa ' || i, 'cliente' FROM generate_series(1, 100) i;
+INSERT INTO transacao (conta_id, categoria_id, pessoa_id, valor, data, descricao, ativo)
+SELECT 1 + i % 100, 1 + i % 200, CASE WHEN i % 3 = 0 THEN 1 + i % 100 END, 1 + i % 5000,
+       timestamp '2023-01-01' + (i * 7919 % (3 * 365 * 1440)) * interval '1 minute',
+       'Transacao ' || i, i % 50 <> 0
+FROM generate_series(1, 50000) i;
+INSERT INTO pagamento (transacao_id, status, data_pagamento, ativo)
+SELECT id,
+       CASE WHEN id % 20 = 0 THEN 'pendente' WHEN id % 50 = 1 THEN 'cancelado' ELSE 'pago' END,
+       data + interval '10 days', id % 50 <> 3
+FROM transacao;
+ANALYZE conta, categoria, pessoa, transacao, pagamento, saldo_diario;
+"""
+
+INI = datetime(2024, 3, 1)
+FIM = datetime(2024, 3, 31)
+
+CONSULTAS = {
+    "transacoes_conta": (build_list_transacoes_query(conta_id=1, limit=51), "idx_transacao_conta_id_id"),
+    "transacoes_categoria": (build_list_transacoes_query(categoria_id=1, limit=51), "idx_transacao_categoria_id_id"),
+    "transacoes_periodo": (
+        build_list_transacoes_query(data_ini="01/03/2024", data_fim="01/03/2024", limit=51),
+        "idx_transacao_data",
+    ),
+    "transacoes_conta_periodo_ativas": (
+        build_list_transacoes_query(conta_id=1, data_ini="01/03/2024", data_fim="31/03/2024", ativo=True, limit=51),
+        "idx_transacao_conta_data",
+    ),
+    "pagamentos_transacao": (build_list_pagamentos_query(transacao_id=1, limit=51), "idx_pagamento_transacao_id"),
+    "pagamentos_status": (build_list_pagamentos_query(status="cancelado", limit=51), "idx_pagamento_status_id"),
+    "pagamentos_periodo": (
+        build_list_pagamentos_query(data_ini="01/03/2024", data_fim="01/03/2024", limit=51),
+        "idx_pagamento_data_pagamento",
+    ),
+    "resumo_financeiro": (relatorios.build_resumo_financeiro_query(INI, FIM, None), "idx_saldo_diario_dia_total"),
+    "transacoes_por_categoria": (
+        relatorios.build_transacoes_categoria_query(1, INI, FIM),
+        "idx_saldo_diario_categoria_dia",
+    ),
+    "pagamentos_pendentes": (relatorios.build_pagamentos_pendentes_query(limit=51), "idx_pagamento_pendente"),
+    "contas_saldo": (relatorios.build_contas_saldo_query(INI, FIM), "idx_saldo_diario_dia_total"),
+    "fluxo_caixa": (relatorios.build_fluxo_caixa_query("dia", INI, FIM), "idx_saldo_diario_dia_total"),
+    "aging_pagamentos": (relatorios.build_aging_pagamentos_query(date(2025, 1, 1)), "idx_pagamento_pendente"),
+    "aging_detalhe": (relatorios.build_aging_detalhe_query(date(2025, 1, 1), limit=51), "idx_pagamento_pendente"),
+}
+
+
+@pytest.fixture(scope="module")
+def base_populada(banco):
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(POPULAR)
+        yield cursor
+    finally:
+        conn.rollback()
+        conn.close()
+        # reltuples / relpages do ANALYZE não voltam com o rollback
+        banco.cursor().execute("ANALYZE conta, categoria, pessoa, transacao, pagamento, saldo_diario")
+
+
+# Nomes dos índices lidos em qualquer nó do plano
+def indices(plano):
+    nomes = {plano["Index Name"]} if "Index Name" in plano else set()
+    for filho in plano.get("Plans", []):
+        nomes |= indices(filho)
+    return nomes
+
+
+@pytest.mark.parametrize("nome", CONSULTAS)
+def test_consulta_usa_indice(base_populada, nome):
+    (sql, params), indice = CONSULTAS[nome]
+
+    base_populada.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plano = base_populada.fetchone()[0][0]["Plan"]
+
+    assert indice in indices(plano)
@@ -0,0 +1,177 @@
+import os
+
+import psycopg2
+import psycopg2.extras
+import pytest
+
+from core import settings
+from core.db import DB_CONFIG
+from core.particionamento import SQL_PARTICIONADO, pagamento_por_id, transacao_por_id
+from app.routers.pagamento_routes import select_pagamento_por_id
+from app.routers.transacao_routes import (
+    SELECT_TRANSACAO,
+    build_update_transacao_query,
+    select_transacao_por_id,
+)
+from modules.transacao.schemas import TransacaoUpdate
+
+from tests.conftest import SCHEMA
+
+PARTICIONAMENTO = os.path.join(os.path.dirname(SCHEMA), "particionamento.sql")
+
+
+# 🔹 Buscas por id com as tabelas particionadas: banco próprio
+# (TEST_DB_NAME + "_particionado"), recriado no módulo com schema.sql,
+# particionamento.sql e particionar_tabelas(), e transações em quatro meses.
+# Com DB_PARTICIONADO ligado, o EXPLAIN ANALYZE do SQL das rotas deve executar
+# uma partição de cada tabela.
+POPULAR = """
+INSERT INTO conta (nome, saldo_inicial) VALUES ('Conta', 0);
+INSERT INTO categoria (nome, tipo) VALUES ('Categoria', 'despesa');
+INSERT INTO transacao (conta_id, categoria_id, valor, data, descricao)
+SELECT 1, 1, 10, date_trunc('month', now()) + make_interval(months => i % 4, days => i % 20), 'Transacao ' || i
+FROM generate_series(1, 40) i;
+INSERT INTO pagamento (transacao_id, status) SELECT id, 'pendente' FROM transacao;
+"""
+
+
+def _admin(comando):
+    conn = psycopg2.connect(**{**DB_CONFIG, "database": "postgres"})
+    conn.autocommit = True
+    try:
+        conn.cursor().execute(comando)
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope="module")
+def particionado(banco):
+    nome = settings.DB_NAME + "_particionado"
+    _admin(f'DROP DATABASE IF EXISTS "{nome}"')
+    _admin(f'CREATE DATABASE "{nome}"')
+
+    conn = psycopg2.connect(**{**DB_CONFIG, "database": nome}, cursor_factory=psycopg2.extras.RealDictCursor)
+    try:
+        cursor = conn.cursor()
+        for arquivo in (SCHEMA, PARTICIONAMENTO):
+            with open(arquivo, encoding="utf-8") as f:
+                cursor.execute(f.read())
+        cursor.execute("SELECT particionar_tabelas()")
+        cursor.execute(POPULAR)
+        conn.commit()
+        yield conn
+    finally:
+        conn.close()
+        _admin(f'DROP DATABASE IF EXISTS "{nome}"')
+
+
+@pytest.fixture(autouse=True)
+def chave_particao(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PARTICIONADO", True)
+
+
+# Partições lidas (Actual Loops > 0) de cada tabela particionada no plano
+def particoes_lidas(plano, lidas=None):
+    lidas = {"transacao": set(), "pagamento": set()} if lidas is None else lidas
+    tabela = plano.get("Relation Name", "")
+    for pai in lidas:
+        if tabela.startswith(pai + "_") and tabela != pai + "_chave" and plano.get("Actual Loops"):
+            lidas[pai].add(tabela)
+    for filho in plano.get("Plans", []):
+        particoes_lidas(filho, lidas)
+    return lidas
+
+
+def _explain(conn, sql, params):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+        return particoes_lidas(cursor.fetchone()["QUERY PLAN"][0]["Plan"])
+    finally:
+        conn.rollback()
+
+
+def _ids(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT max(id) AS transacao FROM transacao")
+    transacao = cursor.fetchone()["transacao"]
+    cursor.execute("SELECT id FROM pagamento WHERE transacao_id = %s", (transacao,))
+    return transacao, cursor.fetchone()["id"]
+
+
+def test_particoes_criadas(particionado):
+    cursor = particionado.cursor()
+    cursor.execute("SELECT count(DISTINCT tableoid) AS particoes FROM transacao")
+    assert cursor.fetchone()["particoes"] == 4
+
+    cursor.execute(SQL_PARTICIONADO)
+    assert cursor.fetchone()["particionado"] is True
+
+
+# Sem particionamento, o filtro fica só com o id
+def test_sem_particionamento_so_id(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PARTICIONADO", False)
+    assert transacao_por_id(7) == ("t.id = %s", (7,))
+    assert pagamento_por_id(7) == ("p.id = %s", (7,))
+    assert "_chave" not in select_pagamento_por_id(7)[0]
+    assert "_chave" not in build_update_transacao_query(7, TransacaoUpdate(descricao="x"), validar=False)[0]
+
+
+@pytest.mark.parametrize("consulta", ["get", "desativar", "update"])
+def test_transacao_por_id(particionado, consulta):
+    id, _ = _ids(particionado)
+    filtro, filtro_params = transacao_por_id(id)
+    sql, params = {
+        "get": select_transacao_por_id(id),
+        "desativar": ("UPDATE transacao t SET ativo = FALSE WHERE " + filtro + " RETURNING id", filtro_params),
+        "update": build_update_transacao_query(id, TransacaoUpdate(descricao="Alterada"), validar=False),
+    }[consulta]
+
+    assert len(_explain(particionado, sql, params)["transacao"]) == 1
+
+
+@pytest.mark.parametrize("consulta", ["get", "desativar"])
+def test_pagamento_por_id(particionado, consulta):
+    _, id = _ids(particionado)
+    filtro, filtro_params = pagamento_por_id(id)
+    sql, params = {
+        "get": select_pagamento_por_id(id),
+        "desativar": ("UPDATE pagamento p SET ativo = FALSE WHERE " + filtro + " RETURNING id", filtro_params),
+    }[consulta]
+
+    lidas = _explain(particionado, sql, params)
+    assert len(lidas["pagamento"]) == 1
+    assert len(lidas["transacao"]) <= 1
+
+
+# Sem a chave, o mesmo id passa por todas as partições (inclusive a default)
+def test_sem_chave_le_todas(particionado):
+    id, _ = _ids(particionado)
+    cursor = particionado.cursor()
+    cursor.execute("SELECT count(*) AS particoes FROM pg_inherits WHERE inhparent = 'transacao'::regclass")
+    particoes = cursor.fetchone()["particoes"]
+
+    lidas = _explain(particionado, SELECT_TRANSACAO + " WHERE t.id = %s", (id,))
+    assert len(lidas["transacao"]) == particoes > 1
+
+
+# A data nova leva a transação para outra partição; transacao_chave acompanha
+def test_chave_acompanha_update(particionado):
+    id, pagamento_id = _ids(particionado)
+    cursor = particionado.cursor()
+    filtro, params = transacao_por_id(id)
+    try:
+        cursor.execute(
+            "UPDATE transacao t SET data = data - interval '2 months' WHERE " + filtro + " RETURNING data",
+            params,
+        )
+        data = cursor.fetchone()["data"]
+        cursor.execute("SELECT data FROM transacao_chave WHERE id = %s", (id,))
+        assert cursor.fetchone()["data"] == data
+
+        cursor.execute(*select_transacao_por_id(id))
+        assert cursor.fetchone()["data"] == data
+        cursor.execute(*select_pagamento_por_id(pagamento_id))
+        assert cursor.fetchone()["transacao_data"] == data
+    finally:
+        particionado.rollback()
@@ -0,0 +1,144 @@
+import json
+import re
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from core import settings
+from core.serializacao import compilar, lista_json
+from app.routers.pagamento_routes import format_pagamento
+from app.routers.transacao_routes import format_transacao
+from modules.categoria.schemas import Categoria
+from modules.conta.schemas import Conta
+from modules.pagamento.schemas import Pagamento
+from modules.pessoa.schemas import Pessoa
+from modules.transacao.schemas import Transacao, TransacaoBusca
+
+
+# 🔹 Serialização rápida das listagens: o corpo montado por
+# core/serializacao.py tem de ser idêntico, byte a byte, ao que o FastAPI gera
+# validando as mesmas linhas pelo response_model
+TRANSACAO = {
+    "id": 7, "conta_id": 1, "pessoa_id": None, "valor": Decimal("100.00"),
+    "data": datetime(2025, 5, 10, 10, 0), "descricao": "Aluguel — maio", "ativo": True,
+    "categoria_id": 2, "categoria_nome": "Moradia", "categoria_tipo": "despesa", "categoria_ativo": True,
+}
+PESSOA = {"pessoa_id": 3, "pessoa_nome": "Fornecedor \"A\"", "pessoa_tipo": "fornecedor", "pessoa_ativo": False}
+
+TRANSACOES = [
+    format_transacao(TRANSACAO),
+    format_transacao({**TRANSACAO, **PESSOA, "id": 8, "valor": Decimal("10.5"),
+                      "data": datetime(2025, 5, 10, 10, 0, 0, 500000)}),
+    format_transacao({**TRANSACAO, "id": 9, "valor": 100.0, "data": datetime(2025, 5, 10, tzinfo=timezone.utc)}),
+]
+
+LINHAS = {
+    "conta": (Conta, [
+        {"id": 1, "nome": "Caixa", "saldo_inicial": Decimal("0.00"), "ativo": True},
+        {"id": 2, "nome": "Banco", "saldo_inicial": Decimal("1500.75"), "ativo": False},
+        {"id": 3, "nome": "Reserva", "saldo_inicial": 100.0},
+    ]),
+    "categoria": (Categoria, [{"id": 1, "nome": "Salário", "tipo": "receita", "ativo": True}]),
+    "pessoa": (Pessoa, [{"id": 1, "nome": "Cliente", "tipo": "cliente", "ativo": False}]),
+    "transacao": (Transacao, TRANSACOES),
+    "busca": (TransacaoBusca, [{**t, "rank": r} for t, r in zip(TRANSACOES, (1.0, 0.25, 0))]),
+    "pagamento": (Pagamento, [
+        format_pagamento({"id": 1, "transacao_id": 7, "status": "pago",
+                          "data_pagamento": datetime(2025, 5, 11, 9, 30), "ativo": True}),
+        format_pagamento({"id": 2, "transacao_id": 8, "status": "pendente", "data_pagamento": None, "ativo": True}),
+    ]),
+}
+
+
+def _app(model, itens):
+    app = FastAPI()
+
+    @app.get("/modelo", response_model=List[model])
+    def modelo():
+        return itens
+
+    @app.get("/rapido", response_model=List[model])
+    def rapido(response: Response):
+        return lista_json(model, itens, response)
+
+    return app
+
+
+@pytest.mark.parametrize("nome", LINHAS)
+def test_lista_json_igual_response_model(monkeypatch, nome):
+    monkeypatch.setattr(settings, "FAST_JSON_LISTS", True)
+    model, itens = LINHAS[nome]
+
+    with TestClient(_app(model, itens)) as client:
+        modelo = client.get("/modelo")
+        rapido = client.get("/rapido")
+
+    assert rapido.status_code == modelo.status_code == 200
+    assert rapido.content == modelo.content
+    assert rapido.headers["content-type"] == modelo.headers["content-type"]
+
+
+def test_formatos_dos_valores():
+    serializar = compilar(Transacao)
+
+    sem_pessoa, com_pessoa, utc = (serializar(t) for t in TRANSACOES)
+
+    assert sem_pessoa["valor"] == 100.0 and isinstance(sem_pessoa["valor"], float)
+    assert sem_pessoa["pessoa"] is None and sem_pessoa["pessoa_id"] is None
+    assert sem_pessoa["data"] == "2025-05-10T10:00:00"
+    assert com_pessoa["data"] == "2025-05-10T10:00:00.500000"
+    assert utc["data"] == "2025-05-10T00:00:00Z"
+
+
+# 🔹 Pelas rotas, com os dados lidos do banco: FAST_JSON_LISTS ligado e
+# desligado devolvem o mesmo corpo; DB_JSON_LISTS muda só os inteiros
+# (100 em vez de 100.0, documentado no README)
+ROTAS = ["/contas/", "/categorias/", "/pessoas/", "/transacoes/", "/pagamentos/"]
+
+
+@pytest.fixture
+def dados(client, referencias):
+    transacoes = [
+        client.post("/transacoes/", json={**referencias, "valor": 100, "data": "2025-05-10T10:00:00",
+                                          "descricao": "Inteiro"}).json(),
+        client.post("/transacoes/", json={**referencias, "pessoa_id": None, "valor": 10.5,
+                                          "data": "2025-05-10T10:00:00.5", "descricao": "Fração"}).json(),
+    ]
+    client.post("/pagamentos/", json={"transacao_id": transacoes[0]["id"], "status": "pendente"})
+    client.post("/pagamentos/", json={"transacao_id": transacoes[1]["id"], "status": "pago",
+                                      "data_pagamento": "2025-05-11T09:30:00"})
+    return transacoes
+
+
+def _corpo(client, monkeypatch, rota, **modo):
+    for nome, valor in modo.items():
+        monkeypatch.setattr(settings, nome, valor)
+    resposta = client.get(rota, params={"limit": 1000})
+    assert resposta.status_code == 200
+    return resposta.content
+
+
+@pytest.mark.parametrize("rota", ROTAS)
+def test_rotas_igual_response_model(client, dados, monkeypatch, rota):
+    modelo = _corpo(client, monkeypatch, rota, FAST_JSON_LISTS=False, DB_JSON_LISTS=False)
+    rapido = _corpo(client, monkeypatch, rota, FAST_JSON_LISTS=True, DB_JSON_LISTS=False)
+
+    assert rapido == modelo
+
+
+@pytest.mark.parametrize("rota", ["/transacoes/", "/pagamentos/"])
+def test_json_do_banco(client, dados, monkeypatch, rota):
+    modelo = _corpo(client, monkeypatch, rota, FAST_JSON_LISTS=False, DB_JSON_LISTS=False)
+    banco = _corpo(client, monkeypatch, rota, DB_JSON_LISTS=True)
+
+    assert json.loads(banco) == json.loads(modelo)
+    if rota == "/transacoes/":
+        assert b'"valor":100.0,' in modelo
+        assert b'"valor":100,' in banco
+        assert re.sub(rb'"valor":(\d+),', rb'"valor":\1.0,', banco) == modelo
+    else:
+        assert banco == modelo